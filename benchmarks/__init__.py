@@ -0,0 +1,12 @@
+"""
+Benchmarks, run from the repository root as modules: python -m benchmarks.<name>.
+The crawler modules import each other by name, as scrapy runspider has them, so crawler/ is put on
+sys.path here, once for every benchmark.
+"""
+import os
+import sys
+
+CRAWLER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'crawler')
+
+if CRAWLER not in sys.path:
+    sys.path.insert(0, CRAWLER)
@@ -0,0 +1,149 @@
+"""
+End-to-end crawl of the three spiders against the local stand-in of the site (benchmarks/stub_site.py):
+pages/sec, CPU per page and peak memory of each spider, and how its items differ from data/scraped.
+
+    python -m benchmarks.crawl_e2e --latency 0.05 -s PARSE_WORKERS=4
+    python -m benchmarks.crawl_e2e --templates pages/ -s CLOSESPIDER_PAGECOUNT=500
+
+CPU includes the parse workers of PARSE_WORKERS. Memory is reported twice: the peak of the summed RSS of
+the spider process and its workers, sampled from /proc (Linux only), and the largest RSS any one of those
+processes reached (ru_maxrss, a maximum over the processes, not a sum). Run from the repository root.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.stub_site import add_arguments, from_args
+from shards import SPIDERS
+
+
+def stat(log: str, name: str) -> int:
+    match = re.search(rf"'{name}': (\d+)", log)
+    return int(match.group(1)) if match else 0
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """bytes resident in a process and all its descendants, None without /proc"""
+    if not os.path.isdir('/proc'):
+        return None
+    children, rss = {}, {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # the fields after the command name: state, ppid, ... rss (in pages) is the 22nd
+                fields = f.read().rpartition(')')[2].split()
+        except OSError:
+            # the process ended meanwhile
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+        rss[int(entry)] = int(fields[21])
+    total, todo = 0, [pid]
+    while todo:
+        current = todo.pop()
+        total += rss.get(current, 0)
+        todo += children.get(current, [])
+    return total * os.sysconf('SC_PAGE_SIZE')
+
+
+def sample_rss(pid: int, done: threading.Event, peak: List[Optional[int]], interval: float = 0.1):
+    """keeps the highest process_tree_rss of pid in peak[0] until done is set, None stays without /proc"""
+    while not done.is_set():
+        rss = process_tree_rss(pid)
+        if rss is None:
+            return
+        peak[0] = max(peak[0] or 0, rss)
+        done.wait(interval)
+
+
+def crawl(spider_file: str, out: str, site_url: str, settings) -> Dict[str, float]:
+    log_file = f'{os.path.splitext(out)[0]}.log'
+    command = [sys.executable, '-m', 'scrapy', 'runspider', spider_file, '-O', out,
+               '--logfile', log_file, '--loglevel=INFO', '-s', f'SITE_URL={site_url}',
+               *[arg for setting in settings for arg in ('-s', setting)]]
+    start = time.perf_counter()
+    process = subprocess.Popen(command)
+    done, peak = threading.Event(), [None]
+    sampler = threading.Thread(target=sample_rss, args=(process.pid, done, peak), daemon=True)
+    sampler.start()
+    # rusage of the spider process and of the parse workers it waited for
+    _, status, usage = os.wait4(process.pid, 0)
+    done.set()
+    sampler.join()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - start
+    with open(log_file) as f:
+        log = f.read()
+    return {
+        'ok': process.returncode == 0,
+        'wall': wall,
+        'cpu': usage.ru_utime + usage.ru_stime,
+        # ru_maxrss is in KB, and the largest of the process and its workers rather than their sum
+        'max_process_rss_mb': usage.ru_maxrss / 1024,
+        'tree_rss_mb': peak[0] / 2 ** 20 if peak[0] is not None else None,
+        'pages': stat(log, 'response_received_count'),
+        'items': stat(log, 'item_scraped_count'),
+        'errors': stat(log, 'log_count/ERROR'),
+    }
+
+
+def diff(out: str, reference: str) -> Optional[Dict[str, int]]:
+    """items missing from the crawl, not in the reference and different, by id"""
+    if not os.path.exists(reference) or not os.path.exists(out):
+        return None
+    items = {}
+    for path in (out, reference):
+        with open(path) as f:
+            items[path] = {item['id']: json.dumps(item, sort_keys=True) for item in json.load(f)}
+    new, old = items[out], items[reference]
+    return {
+        'missing': len(old.keys() - new.keys()),
+        'extra': len(new.keys() - old.keys()),
+        'changed': sum(new[key] != old[key] for key in new.keys() & old.keys()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument('--spiders', nargs='+', choices=list(SPIDERS), default=list(SPIDERS))
+    parser.add_argument('--scraped', default='data/scraped', help='reference items (default: %(default)s)')
+    parser.add_argument('--out', help='keep the items and logs of the crawls in this directory')
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='scrapy setting for every spider')
+    args = parser.parse_args()
+
+    site = from_args(args)
+    server = site.serve()
+    site_url = f'http://127.0.0.1:{server.server_address[1]}'
+    print(f'{len(site.paths)} recorded pages on {site_url}')
+
+    out_dir = args.out or tempfile.mkdtemp(prefix='crawl_e2e-')
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"{'spider':16} {'pages':>6} {'items':>6} {'errors':>6} {'pages/s':>8} {'CPU/page':>10} "
+          f"{'tree RSS':>9} {'max proc':>9}  diff against {args.scraped}")
+    for output in args.spiders:
+        out = os.path.join(out_dir, f'{output}.json')
+        result = crawl(SPIDERS[output], out, site_url, args.set)
+        changes = diff(out, os.path.join(args.scraped, f'{output}.json'))
+        changes = ', '.join(f'{n} {kind}' for kind, n in changes.items()) if changes is not None else 'no reference'
+        pages = max(result['pages'], 1)
+        tree_rss = f"{result['tree_rss_mb']:6.0f} MB" if result['tree_rss_mb'] is not None else f"{'n/a':>9}"
+        print(f"{output:16} {result['pages']:6} {result['items']:6} {result['errors']:6} "
+              f"{result['pages'] / result['wall']:8.1f} {result['cpu'] / pages * 1000:7.1f} ms "
+              f"{tree_rss} {result['max_process_rss_mb']:6.0f} MB  "
+              f"{changes}{'' if result['ok'] else '  (spider failed)'}")
+    print(f'stub: {site.counts}, logs and items in {out_dir}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
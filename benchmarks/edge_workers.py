@@ -0,0 +1,58 @@
+"""
+Throughput of the edge phases against the number of parallel sessions.
+
+Needs a graph whose Course / Program / Specialisation nodes are already loaded
+(python graph_builder.py --batch-size 5000). Before each run the edges and
+requirement nodes are deleted, so every run writes the same rows.
+
+    python -m benchmarks.edge_workers --workers 1 2 4 8 16
+"""
+import argparse
+import json
+
+from py2neo import Graph
+
+import graph_builder as gb
+from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+
+
+def connect() -> Graph:
+    return Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+
+
+def reset(G: Graph):
+    G.run("MATCH (req:Requirement) DETACH DELETE req")
+    G.run("MATCH ()-[r]->() DELETE r")
+    gb.REQUIREMENTS.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    docs = {}
+    for label, path in [('Course', 'data/scraped/classes.json'),
+                        ('Program', 'data/scraped/programs.json'),
+                        ('Specialisation', 'data/scraped/specialisations.json')]:
+        with open(path) as f:
+            docs[label] = json.load(f)
+    for label, cache in [('Course', gb.CLASSES), ('Program', gb.PROGRAMS), ('Specialisation', gb.SPECIAL)]:
+        for doc in docs[label]:
+            cache[doc['id']] = (label, doc['id'])
+
+    G = connect()
+    print(f"{'workers':>8} {'rows':>8} {'secs':>8} {'rows/sec':>10}")
+    for workers in args.workers:
+        reset(G)
+        total_rows, total_secs = 0, 0.0
+        for label in ('Course', 'Program', 'Specialisation'):
+            rows, secs = gb.create_edges_parallel(docs[label], label, connect, workers, args.batch_size)
+            total_rows += rows
+            total_secs += secs
+        print(f'{workers:>8} {total_rows:>8} {total_secs:>8.2f} {total_rows / max(total_secs, 1e-9):>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+name_index against the scans of ALL_SPECIALISATIONS / ALL_PROGRAMS it replaced.
+
+Resolves again every specialisation a program of data/scraped refers to (its specialisations and those in its
+requirements) and every program name left in the prerequisites of data/scraped/classes.json: with the old
+linear scan, with NameIndex.get (has to give the same ids) and with NameIndex.resolve, which adds the trigram
+fallback for near misses. Reports how many stay unresolved each way, the near misses it resolved and
+the time per lookup. Exits with status 1 if get disagrees with the scan.
+
+    python -m benchmarks.name_resolution --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from typing import Callable, List, Optional, Tuple
+
+from benchmarks.nlp_profiles import load
+from name_index import PROGRAMS, SPECIALISATIONS, NameIndex
+from nlp_config import ALL_PROGRAMS, ALL_SPECIALISATIONS
+
+Reference = Tuple[str, Optional[str]]
+
+
+def reference_specialisation(name: str, type_: Optional[str]) -> Optional[str]:
+    """SpiderProgram.fix_specialisation_req before name_index"""
+    for item in ALL_SPECIALISATIONS.values():
+        if name.lower().replace(' ', '') == item['Name'].lower().replace(' ', '') and type_ == item['SubplanType']:
+            return item['SubPlanCode']
+    for item in ALL_SPECIALISATIONS.values():
+        if name.lower().replace(' ', '') == item['Name'].lower().replace(' ', ''):
+            return item['SubPlanCode']
+    return None
+
+
+def reference_program(name: str, type_: Optional[str]) -> Optional[str]:
+    """class_parser.clean_class_doc before name_index"""
+    return ALL_PROGRAMS.get(name)
+
+
+def nodes(value):
+    if isinstance(value, dict):
+        yield value
+        for v in value.values():
+            yield from nodes(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from nodes(v)
+
+
+def best_time(lookup: Callable[[str, Optional[str]], Optional[str]], references: List[Reference], repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name, type_ in references:
+            lookup(name, type_)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compare(label: str, references: List[Reference], reference: Callable, index: NameIndex, args) -> int:
+    print(f'{label}: {len(references)} references, {len(set(references))} distinct, {len(index)} records')
+    if not references:
+        return 0
+
+    wrong = 0
+    unresolved = Counter()
+    near_misses = Counter()
+    for name, type_ in set(references):
+        expected = reference(name, type_)
+        found = index.get(name, type_)
+        if found != expected:
+            wrong += 1
+            if wrong <= 5:
+                print(f'  {name!r} {type_}: scan {expected}, index {found}')
+        resolved = index.resolve(name, type_)
+        n = references.count((name, type_))
+        unresolved['scan'] += n * (expected is None)
+        unresolved['index'] += n * (resolved is None)
+        if resolved and not found:
+            near_misses[name, type_, resolved] = n
+    print(f'  index.get gives the ids of the scan for {len(set(references)) - wrong}/{len(set(references))} names')
+    print(f'  unresolved: scan {unresolved["scan"]} ({unresolved["scan"] / len(references):.1%}), '
+          f'index {unresolved["index"]} ({unresolved["index"] / len(references):.1%})')
+    for (name, type_, resolved), n in near_misses.most_common(args.show):
+        print(f'    {n:3}x {name!r} {type_} -> {resolved}')
+
+    before = best_time(reference, references, args.repeat)
+    get, resolve = best_time(index.get, references, args.repeat), best_time(index.resolve, references, args.repeat)
+    print(f'  scan {before / len(references) * 1e6:8.1f} us/lookup  get {get / len(references) * 1e6:8.2f} us/lookup '
+          f'({before / get:.0f}x)  resolve {resolve / len(references) * 1e6:8.2f} us/lookup')
+    return wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scraped', default='data/scraped')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--show', type=int, default=20, help='near misses to list')
+    args = parser.parse_args()
+
+    specialisations: List[Reference] = []
+    for program in load(os.path.join(args.scraped, 'programs.json')):
+        for node in nodes([program.get('specialisations'), program.get('requirements')]):
+            if node.get('type') in {'MAJ', 'MIN', 'SPC'} and 'name' in node:
+                specialisations += (node['name'], node['type']),
+    programs: List[Reference] = []
+    for course in load(os.path.join(args.scraped, 'classes.json')):
+        for node in nodes(course.get('prerequisites')):
+            programs += [(name, None) for name in node.get('programs') or []]
+
+    wrong = compare('specialisations', specialisations, reference_specialisation, SPECIALISATIONS, args)
+    wrong += compare('programs', programs, reference_program, PROGRAMS, args)
+    sys.exit(1 if wrong else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Accuracy and throughput of the nlp_model profiles against the full spaCy pipeline.
+
+The accuracy check re-parses what the spiders parsed, taken from data/scraped:
+the requisite text of every course (prerequisites_raw) is parsed with the requisites profile
+and has to give the scraped prerequisites, and the same parse as the full pipeline gives, as does
+a requisite-like sentence per program name; the requirement lines of programs and
+specialisations (descriptions and "CODE name" course lines) have to get the same CLASS
+entities with the requirements profile as with the full pipeline, and the scraped course id
+on course lines. Exits with status 1 on any mismatch, and with status 2 if data/scraped has no
+classes.json to check the requisites profile against (--skip-requisites to check the rest).
+
+    python -m benchmarks.nlp_profiles --repeat 3
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from class_parser import parse_requisites
+from nlp_model import get_profile
+
+# profile -> corpus it is used on by the spiders
+CALL_SITES = {
+    'requisites': 'requisites',
+    'requirements': 'requirement lines',
+}
+
+
+def load(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def requirement_lines(items: List[Dict]) -> List[Tuple[str, str]]:
+    """(line, course id or None) for every requirement description and course in a requirement tree"""
+    lines = []
+    for item in items:
+        if type(item) != dict:
+            continue
+        if 'description' in item:
+            lines += (item['description'], None),
+            lines += requirement_lines(item.get('items', []))
+        elif re.fullmatch('[A-Z]{4}[0-9]{4}', item.get('id', '')):
+            lines += (f"{item['id']} {item.get('name', '')}".strip(), item['id']),
+    return lines
+
+
+def requisites_item(doc) -> Dict:
+    """the prerequisites field SpiderClass stores for a parsed requisite text"""
+    requisites = parse_requisites(doc)
+    if len(requisites) > 1:
+        return {"description": "", "operator": {"AND": requisites}}
+    return requisites[0]
+
+
+def class_entities(doc) -> List[Tuple[int, int]]:
+    return [(ent.start, ent.end) for ent in doc.ents if ent.label_ == 'CLASS']
+
+
+def check_requisites(courses: List[Dict]) -> int:
+    nlp = get_profile('requisites')
+    wrong = 0
+    for course in courses:
+        scraped = json.loads(json.dumps(course['prerequisites']))
+        parsed = json.loads(json.dumps(requisites_item(nlp(course['prerequisites_raw']))))
+        if parsed != scraped:
+            wrong += 1
+            if wrong <= 5:
+                print(f"  {course['id']}: {course['prerequisites_raw']!r}")
+    print(f"requisites: {len(courses) - wrong}/{len(courses)} courses match data/scraped")
+    return wrong
+
+
+def check_requisites_against_full(texts: List[str]) -> int:
+    full = get_profile('full')
+    nlp = get_profile('requisites')
+    wrong = 0
+    for text, expected, doc in zip(texts, full.pipe(texts), nlp.pipe(texts)):
+        if json.dumps(parse_requisites(doc)) != json.dumps(parse_requisites(expected)):
+            wrong += 1
+            if wrong <= 5:
+                print(f'  {text!r}')
+    print(f"requisites: {len(texts) - wrong}/{len(texts)} texts parse as with the full pipeline")
+    return wrong
+
+
+def check_requirement_lines(lines: List[Tuple[str, str]], profile: str) -> int:
+    full = get_profile('full')
+    nlp = get_profile(profile)
+    texts = [line for line, _ in lines]
+    wrong = 0
+    for (line, course_id), expected, doc in zip(lines, full.pipe(texts), nlp.pipe(texts)):
+        found = [ent.text for ent in doc.ents if ent.label_ == 'CLASS']
+        if class_entities(doc) != class_entities(expected) or (course_id and found[:1] != [course_id]):
+            wrong += 1
+            if wrong <= 5:
+                print(f'  {line!r}: {found}')
+    print(f"{profile}: {len(lines) - wrong}/{len(lines)} requirement lines match")
+    return wrong
+
+
+def throughput(texts: List[str], profile: str, repeat: int) -> float:
+    nlp = get_profile(profile)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in nlp.pipe(texts):
+            pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(texts) / best if best else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scraped', default='data/scraped')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-check', action='store_true')
+    parser.add_argument('--skip-requisites', action='store_true', help='check without data/scraped/classes.json')
+    args = parser.parse_args()
+
+    courses = [course for course in load(os.path.join(args.scraped, 'classes.json'))
+               if course.get('prerequisites_raw') and course.get('prerequisites')]
+    lines = []
+    for filename in ('programs.json', 'specialisations.json'):
+        for doc in load(os.path.join(args.scraped, filename)):
+            lines += requirement_lines(doc.get('requirements') or [])
+    requisites = [course['prerequisites_raw'] for course in courses]
+    requisites += [f"To enrol in this course you must be studying the {program['name']} and have completed COMP1100."
+                   for program in load(os.path.join(args.scraped, 'programs.json'))]
+    corpora = {
+        'requisites': requisites,
+        'requirement lines': [line for line, _ in lines],
+    }
+    print(f"{len(corpora['requisites'])} requisite texts, {len(corpora['requirement lines'])} requirement lines")
+
+    wrong = 0
+    if not args.skip_check:
+        if courses:
+            wrong += check_requisites(courses)
+        elif not args.skip_requisites:
+            print(f'requisites: no parsed courses in {args.scraped}/classes.json to check the profile against, '
+                  'crawl them first or pass --skip-requisites')
+            sys.exit(2)
+        wrong += check_requisites_against_full(requisites)
+        wrong += check_requirement_lines(lines, 'requirements')
+
+    for profile, corpus in CALL_SITES.items():
+        texts = corpora[corpus]
+        if not texts:
+            continue
+        full = throughput(texts, 'full', args.repeat)
+        slim = throughput(texts, profile, args.repeat)
+        print(f'{corpus:<18} full {full:9.0f} texts/s  {profile:<13} {slim:9.0f} texts/s  ({slim / full:.1f}x)')
+
+    sys.exit(1 if wrong else 0)
+
+
+if __name__ == '__main__':
+    main()
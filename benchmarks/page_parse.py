@@ -0,0 +1,84 @@
+"""
+CPU time per page of the spider callbacks, and of the serialise / BeautifulSoup reparse cycles
+they did before sharing the response's lxml tree (html_tree).
+
+Pages are saved HTML files of course or program pages:
+
+    python -m benchmarks.page_parse --kind program pages/program/*.html
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import Callable, List
+
+from bs4 import BeautifulSoup
+from scrapy.http.response.html import HtmlResponse
+
+from spider_class import SpiderClass
+from spider_program import SpiderProgram
+
+
+def reparse_program(response: HtmlResponse):
+    """what a program page cost on top: two soups of the body and one per table"""
+    for _ in range(2):
+        soup = BeautifulSoup(response.xpath(SpiderProgram.html_path).get(), 'html.parser')
+    for table in soup.find_all('table'):
+        BeautifulSoup(str(table), 'lxml')
+
+
+def reparse_course(response: HtmlResponse):
+    """what a course page cost on top: a soup of the introduction and one of the requisites"""
+    for query in ("div.introduction", "div.requisite"):
+        html = response.css(query).get()
+        if html:
+            BeautifulSoup(html, 'html.parser')
+
+
+def cpu_ms(run: Callable, responses: List[HtmlResponse], repeat: int) -> float:
+    """median CPU milliseconds per page, best of repeat"""
+    best = []
+    for response in responses:
+        times = []
+        for _ in range(repeat):
+            start = time.process_time()
+            run(response)
+            times += time.process_time() - start,
+        best += min(times),
+    return statistics.median(best) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pages', nargs='+')
+    parser.add_argument('--kind', choices=['course', 'program'], default='program')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    responses = []
+    for path in args.pages:
+        with open(path, 'rb') as f:
+            name = os.path.splitext(os.path.basename(path))[0]
+            url = f'https://{SpiderClass.DOMAIN}/{args.kind}/{name}'
+            responses += HtmlResponse(url=url, body=f.read(), encoding='utf-8'),
+
+    if args.kind == 'program':
+        spider = SpiderProgram()
+        callback, reparse = lambda response: list(spider.parse(response)), reparse_program
+    else:
+        spider = SpiderClass()
+        callback, reparse = spider.parse_class, reparse_course
+
+    # first call of each page loads the pipeline and parses the page's selector, keep both out of the timings
+    for response in responses:
+        callback(response)
+
+    total = cpu_ms(callback, responses, args.repeat)
+    removed = cpu_ms(reparse, responses, args.repeat)
+    print(f'{len(responses)} {args.kind} pages, median CPU per page')
+    print(f'  callback                      {total:8.2f} ms')
+    print(f'  serialise + reparse (before)  {removed:8.2f} ms  ({removed / (total + removed):.0%} of the old callback)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+class_parser.parse_requisite_from_sent with its SentenceIndex against the parser it replaced
+(tests/reference_parser.py), which walked the rest of the sentence again for every "and" / "or" it met.
+
+Texts are the requisites of data/scraped (prerequisites_raw) and one requisite-like sentence per
+program name, parsed once with the requisites profile. Checks both parsers give identical expressions
+on every sentence, times them on the corpus and on long texts of several requisites joined into one
+sentence. Exits with status 1 on any mismatch.
+
+    python -m benchmarks.requisite_parser --repeat 5 --joined 1 4 16 64
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+from benchmarks.nlp_profiles import load
+from class_parser import parse_requisite_from_sent
+from nlp_model import get_profile
+from tests.reference_parser import parse_all, reference_parse
+
+
+def best_time(parse: Callable, sents: List, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for sent in sents:
+            try:
+                parse(sent, 0, len(sent))
+            except Exception:
+                pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scraped', default='data/scraped')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--joined', type=int, nargs='*', default=[1, 4, 16, 64],
+                        help='requisites per long text for the scaling runs')
+    args = parser.parse_args()
+
+    texts = [course['prerequisites_raw'] for course in load(os.path.join(args.scraped, 'classes.json'))
+             if course.get('prerequisites_raw')]
+    texts += [f"To enrol in this course you must be studying the {program['name']} and have completed COMP1100."
+              for program in load(os.path.join(args.scraped, 'programs.json'))]
+    nlp = get_profile('requisites')
+    docs = list(nlp.pipe(texts))
+    sents = [sent for doc in docs for sent in doc.sents]
+    print(f'{len(texts)} requisite texts, {len(sents)} sentences')
+
+    wrong = 0
+    for doc in docs:
+        doc_sents = list(doc.sents)
+        expected, found = parse_all(reference_parse, doc_sents), parse_all(parse_requisite_from_sent, doc_sents)
+        if found != expected:
+            wrong += 1
+            if wrong <= 5:
+                print(f'  {doc.text!r}\n    before: {expected[:200]}\n    now:    {found[:200]}')
+    print(f'{len(docs) - wrong}/{len(docs)} texts parse identically')
+
+    before, now = best_time(reference_parse, sents, args.repeat), best_time(parse_requisite_from_sent, sents, args.repeat)
+    print(f'corpus            before {before / len(sents) * 1e6:9.1f} us/sentence  '
+          f'now {now / len(sents) * 1e6:9.1f} us/sentence  ({before / now:.1f}x)')
+
+    # one sentence of n requisites joined by "and", the sentence ends dropped so it stays one sentence
+    rng = random.Random(0)
+    for n in args.joined:
+        joined = [' and '.join(text.replace('.', ';').rstrip('; ') for text in rng.sample(texts, min(n, len(texts))))
+                  for _ in range(20)]
+        long_sents = [next(doc.sents) for doc in nlp.pipe(joined)]
+        tokens = sum(len(sent) for sent in long_sents) / len(long_sents)
+        before = best_time(reference_parse, long_sents, args.repeat)
+        now = best_time(parse_requisite_from_sent, long_sents, args.repeat)
+        print(f'{n:3} joined ({tokens:5.0f} tokens)  before {before / len(long_sents) * 1e3:8.2f} ms  '
+              f'now {now / len(long_sents) * 1e3:8.2f} ms  ({before / now:.1f}x)')
+
+    sys.exit(1 if wrong else 0)
+
+
+if __name__ == '__main__':
+    main()
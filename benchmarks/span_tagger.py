@@ -0,0 +1,80 @@
+"""
+The regex span tagger against the spaCy entity ruler, on the same PATTERNS.
+
+Runs both over the requirement lines of data/scraped and one requisite-like sentence per
+program name, checks they give identical entity spans (start, end, label, id) and times them.
+Exits with status 1 on any mismatch.
+
+    python -m benchmarks.span_tagger --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Callable, List
+
+import spacy
+
+from benchmarks.nlp_profiles import load, requirement_lines
+from nlp_config import PATTERNS
+import span_tagger  # noqa: F401, registers the span_tagger component
+
+
+def corpus(scraped: str) -> List[str]:
+    texts = []
+    for filename in ('programs.json', 'specialisations.json'):
+        for doc in load(os.path.join(scraped, filename)):
+            texts += [line for line, _ in requirement_lines(doc.get('requirements') or [])]
+    for doc in load(os.path.join(scraped, 'programs.json')):
+        texts += f"To enrol in this course you must be studying the {doc['name']} and have completed COMP1100.",
+    return texts
+
+
+def best_of(run: Callable, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times += time.perf_counter() - start,
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scraped', default='data/scraped')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    texts = corpus(args.scraped)
+
+    ruler = spacy.blank('en')
+    ruler.add_pipe('entity_ruler', config={"validate": True}).add_patterns(PATTERNS)
+    tagger = spacy.blank('en')
+    tagger.add_pipe('span_tagger')
+
+    wrong = 0
+    for text, a, b in zip(texts, ruler.pipe(texts), tagger.pipe(texts)):
+        if [(e.start, e.end, e.label_, e.id_) for e in a.ents] != [(e.start, e.end, e.label_, e.id_) for e in b.ents]:
+            wrong += 1
+            if wrong <= 5:
+                print(f'  {text!r}\n    ruler:  {[e.text for e in a.ents]}\n    tagger: {[e.text for e in b.ents]}')
+    entities = sum(len(doc.ents) for doc in ruler.pipe(texts))
+    print(f'{len(texts) - wrong}/{len(texts)} texts with identical spans, {entities} entities')
+
+    component = tagger.get_pipe('span_tagger')
+    words = [[t.text for t in doc] for doc in ruler.tokenizer.pipe(texts)]
+    tokenize = best_of(lambda: list(ruler.tokenizer.pipe(texts)), args.repeat)
+    timings = {
+        'tokenizer + entity_ruler': best_of(lambda: list(ruler.pipe(texts)), args.repeat),
+        'tokenizer + span_tagger': best_of(lambda: list(tagger.pipe(texts)), args.repeat),
+        'SpanTagger.spans on tokens': best_of(lambda: [component.spans(w) for w in words], args.repeat),
+    }
+    print(f'{"tokenizer only":<28} {len(texts) / tokenize:9.0f} texts/s')
+    for name, elapsed in timings.items():
+        print(f'{name:<28} {len(texts) / elapsed:9.0f} texts/s')
+
+    sys.exit(1 if wrong else 0)
+
+
+if __name__ == '__main__':
+    main()
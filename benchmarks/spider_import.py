@@ -0,0 +1,52 @@
+"""
+Startup cost of the spider modules: importing them, and loading the NLP pipeline on first use.
+
+Each measurement runs in a fresh interpreter, so module and model caches of one run
+don't help the next.
+
+    python -m benchmarks.spider_import --repeat 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+from benchmarks import CRAWLER
+
+STAGES = {
+    'import spider modules': """
+import spider_class, spider_program, spider_specialisation
+""",
+    'import + first nlp use': """
+import spider_class, spider_program, spider_specialisation
+spider_class.SpiderClass.nlp('COMP1100')
+""",
+}
+
+TIMER = """
+import sys, time
+sys.path.insert(0, {crawler!r})
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(code: str) -> float:
+    out = subprocess.run([sys.executable, '-c', TIMER.format(crawler=CRAWLER, code=code)],
+                         check=True, capture_output=True, text=True).stdout
+    return float(out.split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, code in STAGES.items():
+        times = [measure(code) for _ in range(args.repeat)]
+        print(f'{name:<24} median {statistics.median(times):.3f}s  min {min(times):.3f}s  ({args.repeat} runs)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Latency of the common graph queries on the SQLite file against the Neo4j database.
+
+Build both first (python graph_builder.py --sqlite graph.db and python graph_builder.py --batch-size 5000),
+the Neo4j half is skipped when config.py is missing or the database is not reachable.
+
+    python -m benchmarks.sqlite_vs_neo4j graph.db --repeat 20
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+import graph_sqlite
+
+CYPHER = {
+    'count nodes': "MATCH (n) RETURN count(n)",
+    'count edges': "MATCH ()-[r]->() RETURN count(r)",
+    'prerequisites': """
+        MATCH (:Course {id: $id})-[:PREREQUISITE*1..20]->(p:Course)
+        RETURN DISTINCT p.id
+    """,
+    'required by': """
+        MATCH (c:Course)-[:PREREQUISITE*1..20]->(:Course {id: $id})
+        RETURN DISTINCT c.id
+    """,
+    'program requirements': """
+        MATCH p = (:Program {id: $id})-[:REQUIREMENT*]->(n)
+        WHERE all(x IN nodes(p)[1..-1] WHERE x:Requirement)
+        RETURN n.id, n.name, n.description, n.units
+    """,
+}
+
+
+def sqlite_queries(conn):
+    return {
+        'count nodes': lambda key: conn.execute("SELECT count(*) FROM nodes").fetchone(),
+        'count edges': lambda key: conn.execute("SELECT count(*) FROM edges").fetchone(),
+        'prerequisites': lambda key: graph_sqlite.prerequisites(conn, key),
+        'required by': lambda key: graph_sqlite.required_by(conn, key),
+        'program requirements': lambda key: graph_sqlite.requirements(conn, key, 'Program'),
+    }
+
+
+def neo4j_queries():
+    try:
+        from py2neo import Graph
+        from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+        G = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+        G.run("RETURN 1").evaluate()
+    except Exception as e:
+        print(f'skipping Neo4j: {e!r}')
+        return {}
+    return {name: (lambda key, query=query: G.run(query, id=key).data()) for name, query in CYPHER.items()}
+
+
+def timed(query: Callable, keys: List[str]) -> float:
+    """mean milliseconds per call"""
+    start = time.perf_counter()
+    for key in keys:
+        query(key)
+    return (time.perf_counter() - start) * 1000 / len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('sqlite')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    conn = graph_sqlite.connect(args.sqlite)
+    courses = [row[0] for row in conn.execute("SELECT id FROM nodes WHERE label = 'Course'")]
+    programs = [row[0] for row in conn.execute("SELECT id FROM nodes WHERE label = 'Program'")]
+    random.seed(0)
+    keys = {
+        'prerequisites': random.choices(courses, k=args.repeat),
+        'required by': random.choices(courses, k=args.repeat),
+        'program requirements': random.choices(programs, k=args.repeat),
+    }
+
+    backends = {'sqlite': sqlite_queries(conn), 'neo4j': neo4j_queries()}
+    print(f"{'query':<22} {'sqlite ms':>10} {'neo4j ms':>10}")
+    for name in CYPHER:
+        sample = keys.get(name, [None] * args.repeat)
+        cells = []
+        for backend in ('sqlite', 'neo4j'):
+            query = backends[backend].get(name)
+            cells += f'{timed(query, sample):>10.2f}' if query else f"{'-':>10}",
+        print(f'{name:<22} {cells[0]} {cells[1]}')
+
+
+if __name__ == '__main__':
+    main()
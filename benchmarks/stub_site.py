@@ -0,0 +1,166 @@
+"""
+Local stand-in of programsandcourses.anu.edu.au for benchmarks and offline test crawls.
+
+Pages come from a crawl recorded with SNAPSHOT_RECORD=1 (crawler/snapshots.py), at the same
+paths the spiders request: /course/<code>, /program/<code>, /<major|minor|specialisation>/<code>.
+Pages the recording does not have are served from --templates DIR/<kind>.html if there is one,
+else redirected to an error page, as the site does for codes it doesn't know.
+
+    python -m benchmarks.stub_site --port 8000 --latency 0.2 --error-rate 0.01
+    scrapy runspider crawler/spider_program.py -s SITE_URL=http://127.0.0.1:8000 -O programs.json
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from snapshots import SnapshotStore
+
+ERROR_PATH = '/Error'
+ERROR_PAGE = b'<html><head><title>Error</title></head><body><h1>Page not found</h1></body></html>'
+
+
+class StubSite:
+    """
+    Answers page paths from recorded snapshots and templates.
+    latency (seconds, +- jitter of it) delays every answer, error_rate of the requests get a 503
+    and missing_rate of them the error page, drawn from a generator seeded with seed.
+    """
+
+    def __init__(self, snapshots: Optional[str] = None, date: str = 'latest', templates: Optional[str] = None,
+                 latency: float = 0., jitter: float = 0., error_rate: float = 0., missing_rate: float = 0.,
+                 seed: int = 0):
+        self.store = SnapshotStore(snapshots) if snapshots else None
+        # path -> manifest entry, or the path it redirects to
+        self.paths: Dict[str, object] = {}
+        if self.store is not None and self.store.dates():
+            for request_url, entry in self.store.manifest(date).items():
+                path, final_path = self._path(request_url), self._path(entry['url'])
+                if final_path != path:
+                    self.paths[path] = final_path
+                self.paths.setdefault(final_path, entry)
+        self.templates = templates
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.missing_rate = missing_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.bodies = {}
+        self.counts = {'pages': 0, 'templates': 0, 'missing': 0, 'errors': 0}
+
+    @staticmethod
+    def _path(url: str) -> str:
+        parts = urlsplit(url)
+        return parts.path + (f'?{parts.query}' if parts.query else '')
+
+    def _body(self, key: str, load) -> bytes:
+        with self.lock:
+            if key not in self.bodies:
+                self.bodies[key] = load()
+            return self.bodies[key]
+
+    def _template(self, path: str) -> Optional[bytes]:
+        if self.templates is None:
+            return None
+        filename = os.path.join(self.templates, f"{path.strip('/').split('/')[0]}.html")
+        if not os.path.exists(filename):
+            return None
+
+        def load():
+            with open(filename, 'rb') as f:
+                return f.read()
+        return self._body(filename, load)
+
+    def respond(self, path: str) -> Tuple[int, Dict[str, str], bytes]:
+        """status, headers and body of a request for path"""
+        with self.lock:
+            delay = self.latency * (1 + self.jitter * (2 * self.random.random() - 1))
+            draw = self.random.random()
+        time.sleep(max(delay, 0.))
+
+        if path.startswith(ERROR_PATH):
+            return 200, {'Content-Type': 'text/html; charset=utf-8'}, ERROR_PAGE
+        if draw < self.error_rate:
+            self.counts['errors'] += 1
+            return 503, {'Content-Type': 'text/plain'}, b'Service Unavailable'
+        entry = self.paths.get(path)
+        if isinstance(entry, str):
+            return 302, {'Location': entry}, b''
+        if draw >= self.error_rate + self.missing_rate:
+            if entry is not None:
+                self.counts['pages'] += 1
+                body = self._body(entry['sha256'], lambda: self.store.get(entry['sha256']))
+                return entry['status'], {'Content-Type': f"text/html; charset={entry['encoding']}"}, body
+            body = self._template(path)
+            if body is not None:
+                self.counts['templates'] += 1
+                return 200, {'Content-Type': 'text/html; charset=utf-8'}, body
+        self.counts['missing'] += 1
+        return 302, {'Location': f'{ERROR_PATH}?aspxerrorpath={quote(path)}'}, b''
+
+    def serve(self, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+        """starts answering on host:port (any free port with 0) in a background thread"""
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, headers, body = site.respond(self.path)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--snapshots', default='data/snapshots', help='recorded crawl (default: %(default)s)')
+    parser.add_argument('--date', default='latest', help='crawl date of the recording (default: %(default)s)')
+    parser.add_argument('--templates', help='DIR with <kind>.html pages for codes not in the recording')
+    parser.add_argument('--latency', type=float, default=0., help='seconds before each answer')
+    parser.add_argument('--jitter', type=float, default=0., help='latency varies by +- this fraction of it')
+    parser.add_argument('--error-rate', type=float, default=0., help='fraction of requests answered 503')
+    parser.add_argument('--missing-rate', type=float, default=0., help='fraction of pages answered with the error page')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def from_args(args: argparse.Namespace) -> StubSite:
+    return StubSite(args.snapshots, args.date, args.templates, args.latency, args.jitter,
+                    args.error_rate, args.missing_rate, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    site = from_args(args)
+    server = site.serve(args.host, args.port)
+    print(f'{len(site.paths)} recorded pages on http://{args.host}:{server.server_address[1]}')
+    try:
+        while True:
+            time.sleep(60)
+            print(site.counts)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
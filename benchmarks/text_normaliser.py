@@ -0,0 +1,71 @@
+"""
+text_normaliser's compiled passes against the chains of replacements they replaced (tests/reference_text_normaliser.py).
+
+Times both on every string of data/scraped (requisite texts, names, descriptions and requirement lines),
+one text at a time and with Normaliser.batch(). tests/test_text_normaliser.py checks they give
+byte-identical output, on that corpus and on random texts.
+
+    python -m benchmarks.text_normaliser --repeat 5
+"""
+import argparse
+import os
+import time
+from typing import Callable, List
+
+from benchmarks.nlp_profiles import load
+from tests.reference_text_normaliser import (reference_requirement_line, reference_requisites,
+                                             reference_specialisation_name)
+from text_normaliser import REQUIREMENT_LINE, REQUISITES, SPECIALISATION_NAME
+
+NORMALISERS = {
+    'requisites': (REQUISITES, reference_requisites),
+    'requirement lines': (REQUIREMENT_LINE, reference_requirement_line),
+    'specialisation names': (SPECIALISATION_NAME, reference_specialisation_name),
+}
+
+
+def strings(value) -> List[str]:
+    """every string in a json value"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [s for v in value.values() for s in strings(v)]
+    if isinstance(value, list):
+        return [s for v in value for s in strings(v)]
+    return []
+
+
+def best_time(normalise: Callable[[List[str]], List[str]], texts: List[str], repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        normalise(texts)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scraped', default='data/scraped')
+    parser.add_argument('--batch', type=int, default=256, help='texts per batch() call in the timings')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = []
+    for name in ('classes.json', 'programs.json', 'specialisations.json'):
+        corpus += strings(load(os.path.join(args.scraped, name)))
+    print(f'{len(corpus)} strings in {args.scraped}, {len(set(corpus))} distinct')
+
+    for name, (normaliser, reference) in NORMALISERS.items():
+        def batched(texts: List[str]) -> List[str]:
+            return [s for i in range(0, len(texts), args.batch) for s in normaliser.batch(texts[i:i + args.batch])]
+
+        before = best_time(lambda texts: [reference(text) for text in texts], corpus, args.repeat)
+        now = best_time(lambda texts: [normaliser(text) for text in texts], corpus, args.repeat)
+        now_batched = best_time(batched, corpus, args.repeat)
+        print(f'{name:21} before {len(corpus) / before:10.0f} texts/s  now {len(corpus) / now:10.0f} texts/s '
+              f'({before / now:.1f}x)  batch {len(corpus) / now_batched:10.0f} texts/s ({before / now_batched:.1f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -1,113 +1,175 @@
+from bisect import bisect_left, bisect_right
 from collections import Counter
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from nlp_config import CONDITION_MAPPING, ALL_PROGRAMS
+from spacy.tokens import Span
+from spacy.util import normalize_slice
+
+from name_index import PROGRAMS
+from nlp_config import CONDITION_MAPPING
 
 Expression = Dict[str, Any]
 
-def split_expression(sent, token, start: int, end: int) -> Expression:
+
+class SentenceIndex:
+    """
+    The token attributes, entities, verbs and "and" / "or" of a sentence by position, built in one pass
+    over its tokens so that parse_requisite_from_sent looks up what is right (or left) of a token
+    instead of walking the sentence again, however often it splits it.
+    Positions are sentence relative, the token lists raise IndexError (and take negative positions)
+    like indexing the sentence, and ranges are clipped like slices of it.
+    """
+
+    def __init__(self, sent):
+        self.n = n = len(sent)
+        self.offset = sent.start if isinstance(sent, Span) else 0
+        self.ents = [(ent.start - self.offset, ent.end - self.offset, ent.label_, ent.text) for ent in sent.ents]
+        self.ent_starts = [start for start, _, _, _ in self.ents]
+        self.ent_ends = [end for _, end, _, _ in self.ents]
+
+        self.tokens = list(sent)
+        self.texts = [token.text for token in self.tokens]
+        self.lowers = [token.lower_ for token in self.tokens]
+        self.ent_types = [token.ent_type_ for token in self.tokens]
+        self.alphas = [token.is_alpha for token in self.tokens]
+        self.puncts = [token.is_punct for token in self.tokens]
+        self.verbs = [token.pos_ == 'VERB' for token in self.tokens]
+
+        # prefix counts of lemmas with 'incompatible' in them, and the last verb at or before each position
+        self.incompatible_counts = [0] * (n + 1)
+        self.last_verb = [-1] * n
+        last_verb = -1
+        for i, token in enumerate(self.tokens):
+            self.incompatible_counts[i + 1] = self.incompatible_counts[i] + ('incompatible' in token.lemma_)
+            if self.verbs[i]:
+                last_verb = i
+            self.last_verb[i] = last_verb
+
+        # from each position to the end: any verb, the "and" / "or" counts and the first of them
+        self.verb_after = [False] * (n + 1)
+        self.conjunctions_after = [(0, 0, None)] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            self.verb_after[i] = self.verbs[i] or self.verb_after[i + 1]
+            ands, ors, first = self.conjunctions_after[i + 1]
+            if self.lowers[i] == "and":
+                ands, first = ands + 1, "and"
+            elif self.lowers[i] == "or":
+                ors, first = ors + 1, "or"
+            self.conjunctions_after[i] = (ands, ors, first)
+
+    def ents_in(self, start: int, end: Optional[int] = None) -> list:
+        """(start, end, label, text) of the entities within sent[start:end]"""
+        start, end = normalize_slice(self.n, start, end)
+        return self.ents[bisect_left(self.ent_starts, start):bisect_right(self.ent_ends, end)]
+
+    def ent_texts(self, label: str, start: int, end: Optional[int] = None) -> List[str]:
+        return [text for _, _, ent_label, text in self.ents_in(start, end) if ent_label == label]
+
+    def has_verb_after(self, start: int) -> bool:
+        start, _ = normalize_slice(self.n, start, None)
+        return self.verb_after[start]
+
+    def operator_after(self, start: int) -> str:
+        """the most common of "and" / "or" in sent[start:], the first of them on a tie, "" without any"""
+        start, _ = normalize_slice(self.n, start, None)
+        ands, ors, first = self.conjunctions_after[start]
+        if ands == ors:
+            return first or ""
+        return "and" if ands > ors else "or"
+
+    def incompatible(self, start: int, end: Optional[int] = None) -> bool:
+        start, end = normalize_slice(self.n, start, end)
+        return self.incompatible_counts[end] > self.incompatible_counts[start]
+
+
+def split_expression(sent, token, start: int, end: int, index: SentenceIndex) -> Expression:
     if end != token.i:
         return {
             'description': str(sent[start:end]),
             'operator': {
                 token.text.upper(): [
-                    parse_requisite_from_sent(sent, start, token.i),
-                    parse_requisite_from_sent(sent, token.i + 1, end)
+                    parse_requisite_from_sent(sent, start, token.i, index),
+                    parse_requisite_from_sent(sent, token.i + 1, end, index)
                 ]
             }
         }
 
 
-def parse_requisite_from_sent(sent, start: int = 0, end=None) -> Dict:
+def parse_requisite_from_sent(sent, start: int = 0, end=None, index: SentenceIndex = None) -> Dict:
+    # token.i below is the position in the doc, not in sent: kept as it is, it decides how later sentences split
+    if index is None:
+        index = SentenceIndex(sent)
     counter = Counter()
 
     raw_txt = sent[start:end].text
-    lemma_txt = " ".join([token.lemma_ for token in sent[start:end]])
     negation = "not" in raw_txt
     verb = None
-    classes = []
-    programs = []
+    named = 0
     semicolon = False
 
     # prioritize semicolons first
     # find and/or following a semicolon where there are named entity and verb on left and right sides
     for idx in range(start, end):
-        token = sent[idx]
-
-        if token.ent_type_ == "CLASS":
-            classes += token.text,
-        if token.is_alpha and token.ent_type_ == "PROGRAM":
-            programs += token.text,
-        if token.pos_ == 'VERB':
-            verb = token
-        if token.text == ';':
+        ent_type = index.ent_types[idx]
+
+        if ent_type == "CLASS" or (ent_type == "PROGRAM" and index.alphas[idx]):
+            named += 1
+        if index.verbs[idx]:
+            verb = idx
+        if index.texts[idx] == ';':
             semicolon = True
 
-        if token.lower_ in {"and", "or"} and semicolon and verb:
+        if index.lowers[idx] in {"and", "or"} and semicolon and verb is not None:
             # different pair of named entity and verb on left and right of the sentence
-            right_ent = sent[token.i + 1:].ents
-            right_verb = [t for t in sent[token.i + 1:] if t.pos_ == 'VERB']
-            if len(programs) + len(classes) > 0 and right_ent and right_verb:
-                return split_expression(sent, token, start, end)
+            token = index.tokens[idx]
+            if named > 0 and index.ents_in(token.i + 1) and index.has_verb_after(token.i + 1):
+                return split_expression(sent, token, start, end, index)
 
     verb = None
-    classes = []
-    programs = []
+    named = 0
 
     for idx in range(start, end):
-        token = sent[idx]
-
-        if token.ent_type_ == "CLASS":
-            classes += token.text,
-        elif token.ent_type_ == "PROGRAM":
-            programs += token.text,
-        elif token.pos_ == 'VERB':
-            verb = token
+        ent_type = index.ent_types[idx]
+
+        if ent_type == "CLASS" or ent_type == "PROGRAM":
+            named += 1
+        elif index.verbs[idx]:
+            verb = idx
         # translate into boolean expressions
-        elif token.lower_ in {"and", "or"}:
-            counter[token.lower_] += 1
+        elif index.lowers[idx] in {"and", "or"}:
+            counter[index.lowers[idx]] += 1
+            token = index.tokens[idx]
 
             try:
                 # preceded or followed by a punctuation, unless that punctuation is part of a named entity
-                left_token = sent[token.i - 1]
-                right_token = sent[token.i + 1]
-                if (left_token.is_punct and not left_token.ent_type_) or (
-                        right_token.is_punct and not right_token.ent_type_):
-                    return split_expression(sent, token, start, end)
+                left_punct = index.puncts[token.i - 1] and not index.ent_types[token.i - 1]
+                right_punct = index.puncts[token.i + 1] and not index.ent_types[token.i + 1]
+                if left_punct or right_punct:
+                    return split_expression(sent, token, start, end, index)
 
                 # different pair of named entity and verb on left and right of the sentence
-                right_ent = sent[token.i + 1:].ents
-                right_verb = [t for t in sent[token.i + 1:] if t.pos_ == 'VERB']
-                if verb and (len(programs) + len(classes) > 0) and right_ent and right_verb:
-                    return split_expression(sent, token, start, end)
+                if verb is not None and named > 0 and index.ents_in(token.i + 1) \
+                        and index.has_verb_after(token.i + 1):
+                    return split_expression(sent, token, start, end, index)
 
                 # if no named entity to the left, mirror the verb
                 # i.e. "you must have completed or be currently enrolled in COMP6710"
                 # will be OR of two expressions on COMP6710, completed OR enrolled
-                if verb and (len(programs) + len(classes) == 0):
-                    right_counter = Counter()
-                    for t in sent[token.i + 1:]:
-                        if t.lower_ in {"and", "or"}:
-                            right_counter[t.lower_] += 1
-                    try:
-                        right_operator, _ = right_counter.most_common(1)[0]
-                    except IndexError:
-                        right_operator = ""
+                if verb is not None and named == 0:
                     return {
                         'description': str(sent[start:end]),
                         'operator': {
                             token.text.upper(): [
                                 {
-                                    "condition": verb.text,
-                                    "operator": right_operator,
+                                    "condition": index.texts[verb],
+                                    "operator": index.operator_after(token.i + 1),
                                     # "negation": negation,
-                                    "programs": [ent.text for ent in sent[token.i + 1:].ents if
-                                                 ent.label_ == 'PROGRAM'],
-                                    "classes": [ent.text for ent in sent[token.i + 1:].ents if ent.label_ == 'CLASS'],
+                                    "programs": index.ent_texts('PROGRAM', token.i + 1),
+                                    "classes": index.ent_texts('CLASS', token.i + 1),
                                     "description": raw_txt
                                 },
-                                parse_requisite_from_sent(sent, token.i + 1, end)
+                                parse_requisite_from_sent(sent, token.i + 1, end, index)
                             ]
                         }
                     }
@@ -119,37 +181,38 @@ def parse_requisite_from_sent(sent, start: int = 0, end=None) -> Dict:
     except IndexError:
         operator = ""
 
-    if 'incompatible' in lemma_txt:
+    if index.incompatible(start, end):
         return {
             "condition": "incompatible",
             # "negation": negation,
-            "programs": [ent.text for ent in sent[start:end].ents if ent.label_ == 'PROGRAM'],
-            "classes": [ent.text for ent in sent[start:end].ents if ent.label_ == 'CLASS'],
+            "programs": index.ent_texts('PROGRAM', start, end),
+            "classes": index.ent_texts('CLASS', start, end),
             "description": raw_txt
         }
-    elif verb:
+    elif verb is not None:
         return {
-            "condition": CONDITION_MAPPING[verb.text],
+            "condition": CONDITION_MAPPING[index.texts[verb]],
             "operator": operator,
             "negation": negation,
-            "programs": [ent.text for ent in sent[start:end].ents if ent.label_ == 'PROGRAM'],
-            "classes": [ent.text for ent in sent[start:end].ents if ent.label_ == 'CLASS'],
+            "programs": index.ent_texts('PROGRAM', start, end),
+            "classes": index.ent_texts('CLASS', start, end),
             "description": raw_txt
         }
     else:
-        for i in range(start, -1, -1):
-            if sent[i].pos_ == 'VERB':
-                return {
-                    "condition": CONDITION_MAPPING[sent[i].text],
-                    "operator": operator,
-                    "programs": [ent.text for ent in sent[start:end].ents if ent.label_ == 'PROGRAM'],
-                    "classes": [ent.text for ent in sent[start:end].ents if ent.label_ == 'CLASS'],
-                    "description": raw_txt
-                }
+        # nearest verb at or before start, IndexError past the end of the sentence as for sent[start]
+        i = index.last_verb[start]
+        if i >= 0:
+            return {
+                "condition": CONDITION_MAPPING[index.texts[i]],
+                "operator": operator,
+                "programs": index.ent_texts('PROGRAM', start, end),
+                "classes": index.ent_texts('CLASS', start, end),
+                "description": raw_txt
+            }
     return {
         "condition": "Unknown",
-        "programs": [ent.text for ent in sent[start:end].ents if ent.label_ == 'PROGRAM'],
-        "classes": [ent.text for ent in sent[start:end].ents if ent.label_ == 'CLASS'],
+        "programs": index.ent_texts('PROGRAM', start, end),
+        "classes": index.ent_texts('CLASS', start, end),
         "description": raw_txt
     }
 
@@ -168,10 +231,7 @@ def clean_class_doc(doc: Dict) -> Dict:
             name_str = doc['programs'][i]
             name_str = name_str.rstrip('(').strip()
 
-            if name_str in ALL_PROGRAMS:
-                name_str = ALL_PROGRAMS[name_str]
-
-            doc['programs'][i] = name_str
+            doc['programs'][i] = PROGRAMS.resolve(name_str) or name_str
     return doc
 
 
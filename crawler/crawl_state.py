@@ -0,0 +1,117 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from itemadapter import ItemAdapter
+from scrapy import Item
+from scrapy.http import Response
+
+import models
+from nlp_cache import pipeline_fingerprint
+from nlp_config import ALL_PROGRAMS, ALL_SPECIALISATIONS
+
+
+def parser_fingerprint() -> str:
+    """changes with any change to the crawler's code"""
+    sha = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(path, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def parse_fingerprint(nlp) -> str:
+    """
+    changes with anything besides the page that what is parsed from it depends on: the crawler's code,
+    the spaCy model, pipeline and entity patterns of nlp, and the programs and specialisations of
+    data/from_api that names resolve against. What was parsed under another fingerprint is parsed again
+    """
+    meta = [pipeline_fingerprint(nlp), parser_fingerprint(), ALL_PROGRAMS, ALL_SPECIALISATIONS]
+    return hashlib.sha1(json.dumps(meta, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def page_url(response: Response) -> str:
+    """the url the spider asked for, before any redirect"""
+    return response.meta.get('redirect_urls', [response.url])[0]
+
+
+class CrawlState:
+    """
+    What the last crawl saw of each page: ETag, Last-Modified, hash of the body and the items parsed from it.
+
+    An incremental crawl sends conditional requests with the validators, and a page that comes back
+    304 Not Modified, or with the same body, gives back its stored items instead of being parsed.
+    Pages parsed under another fingerprint (see parse_fingerprint) are always fetched and parsed again.
+    """
+
+    def __init__(self, fingerprint: str, path: str = 'data/cache/crawl_state.sqlite'):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                sha256 TEXT,
+                fingerprint TEXT,
+                items TEXT,
+                fetched REAL
+            )
+        """)
+        self.fingerprint = fingerprint
+        self.unchanged = 0
+        self.changed = 0
+
+    def _row(self, url: str) -> Optional[tuple]:
+        return self.conn.execute(
+            "SELECT etag, last_modified, sha256, fingerprint, items FROM pages WHERE url = ?", (url,)).fetchone()
+
+    @staticmethod
+    def _validators(response: Response):
+        return tuple(response.headers.get(name, b'').decode('latin-1') or None for name in ('ETag', 'Last-Modified'))
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        row = self._row(url)
+        if row is None or row[3] != self.fingerprint:
+            return {}
+        headers = {}
+        if row[0]:
+            headers['If-None-Match'] = row[0]
+        if row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def stored_items(self, response: Response) -> Optional[List[Item]]:
+        """the items of the last crawl when the page is unchanged since, else None"""
+        row = self._row(page_url(response))
+        if row is None or row[3] != self.fingerprint:
+            return None
+        if response.status != 304:
+            if hashlib.sha256(response.body).hexdigest() != row[2]:
+                return None
+            # same page, the server may still have sent new validators
+            with self.conn:
+                self.conn.execute("UPDATE pages SET etag = ?, last_modified = ?, fetched = ? WHERE url = ?",
+                                  (*self._validators(response), time.time(), page_url(response)))
+        self.unchanged += 1
+        return [getattr(models, entry['type'])(**entry['item']) for entry in json.loads(row[4])]
+
+    def save(self, response: Response, items: List[Item]):
+        self.changed += 1
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)", (
+                page_url(response),
+                *self._validators(response),
+                hashlib.sha256(response.body).hexdigest(),
+                self.fingerprint,
+                json.dumps([{'type': type(item).__name__, 'item': ItemAdapter(item).asdict()} for item in items]),
+                time.time(),
+            ))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,81 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Iterator, List, Tuple
+
+from itemadapter import ItemAdapter
+from scrapy import Item
+
+import models
+
+
+class Frontier:
+    """
+    Durable frontier of one spider's crawl: every page url with the callback that parses it,
+    whether it is still pending, and the items parsed from the pages done so far.
+
+    Items of a page are checkpointed in the same transaction that marks the page done, so a crawl
+    that dies can be started again with the same file: it yields the checkpointed items and
+    requests only the pages still pending. Delete the file to start a new crawl.
+    """
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                callback TEXT NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                seq INTEGER NOT NULL,
+                finished REAL
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                item TEXT NOT NULL,
+                PRIMARY KEY (url, position)
+            );
+        """)
+
+    def is_new(self) -> bool:
+        return self.conn.execute("SELECT count(*) FROM pages").fetchone()[0] == 0
+
+    def add(self, pages: List[Tuple[str, str]]):
+        """(url, callback name) of pages to crawl, in crawl order. pages seen before are kept as they are"""
+        start = self.conn.execute("SELECT coalesce(max(seq), 0) FROM pages").fetchone()[0]
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO pages (url, callback, seq) VALUES (?, ?, ?)",
+                                  [(url, callback, start + i + 1) for i, (url, callback) in enumerate(pages)])
+
+    def pending(self) -> List[Tuple[str, str]]:
+        return self.conn.execute("SELECT url, callback FROM pages WHERE NOT done ORDER BY seq").fetchall()
+
+    def counts(self) -> Tuple[int, int]:
+        """(done, pending) pages"""
+        done, total = self.conn.execute("SELECT coalesce(sum(done), 0), count(*) FROM pages").fetchone()
+        return done, total - done
+
+    def checkpoint(self, url: str, items: List[Item]):
+        """stores the items of a page and marks it done"""
+        with self.conn:
+            self.conn.execute("DELETE FROM items WHERE url = ?", (url,))
+            self.conn.executemany("INSERT INTO items VALUES (?, ?, ?, ?)", [
+                (url, i, type(item).__name__, json.dumps(ItemAdapter(item).asdict())) for i, item in enumerate(items)
+            ])
+            self.conn.execute("UPDATE pages SET done = 1, finished = ? WHERE url = ?", (time.time(), url))
+
+    def items(self) -> Iterator[Item]:
+        """checkpointed items in crawl order"""
+        rows = self.conn.execute("""
+            SELECT i.type, i.item FROM items i JOIN pages p ON p.url = i.url ORDER BY p.seq, i.position
+        """)
+        for item_type, item in rows:
+            yield getattr(models, item_type)(**json.loads(item))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,54 @@
+from typing import List, Optional, Union
+
+from lxml import etree
+from scrapy.http.response.html import HtmlResponse
+
+# a child of an element: an element, a comment, or the text between them
+Node = Union[etree._Element, str]
+
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+
+def _string(s: str) -> str:
+    # like BeautifulSoup, which the extractors were written against:
+    # a string of only whitespace is one newline or space
+    if not s.strip(ASCII_SPACES):
+        return '\n' if '\n' in s else ' '
+    return s
+
+
+def find(response: HtmlResponse, query: str, css: bool = False) -> Optional[etree._Element]:
+    """
+    first element matching an xpath (or css) query in the page.
+    the lxml tree comes from the response's selector, so a page is parsed once whatever extracts from it
+    """
+    selectors = response.css(query) if css else response.xpath(query)
+    return selectors[0].root if selectors else None
+
+
+def contents(elem: etree._Element) -> List[Node]:
+    """children of an element with the text in between, in document order"""
+    nodes = []
+    if elem.text:
+        nodes += _string(elem.text),
+    for child in elem:
+        nodes += child,
+        if child.tail:
+            nodes += _string(child.tail),
+    return nodes
+
+
+def tag(node: Node) -> Optional[str]:
+    """tag name of an element, None for text and comments"""
+    if isinstance(node, str) or not isinstance(node.tag, str):
+        return None
+    return node.tag
+
+
+def text(node: Node) -> str:
+    """all text in a node, comments left out"""
+    if isinstance(node, str):
+        return node
+    if not isinstance(node.tag, str):
+        return ''
+    return ''.join([_string(s) for s in node.itertext()])
@@ -0,0 +1,89 @@
+import re
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+from nlp_config import ALL_PROGRAMS, ALL_SPECIALISATIONS
+
+# least trigram similarity of a near-miss name, "Asia and Pacific Archaeology" -> "Asian and Pacific Archaeology"
+MIN_SIMILARITY = 0.88
+# a near miss is left unresolved if another id comes this close to it, as "Master of X" between
+# "Master of X Studies" and "Master of X Studies (Advanced)"
+MARGIN = 0.03
+
+
+def name_key(name: str) -> str:
+    return name.lower().replace(' ', '')
+
+
+def fuzzy_key(name: str) -> str:
+    """the name without case, punctuation or spaces, & spelled out"""
+    return re.sub('[^a-z0-9]', '', name.lower().replace('&', 'and'))
+
+
+def trigrams(key: str) -> set:
+    key = f'  {key} '
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+class NameIndex:
+    """
+    Ids of specialisations or programs by name, built once from (name, type, id) records.
+
+    get() is the exact lookup the spiders did by scanning the records: same name ignoring case and spaces,
+    of the same type if there is one, else of any type, the first record winning. closest() resolves
+    the names get() misses to the record with the most similar trigrams, if it is similar enough
+    (MIN_SIMILARITY) and no record with another id is about as similar (MARGIN), preferring the same type.
+    """
+
+    def __init__(self, records: Iterable[Tuple[str, Optional[str], str]], min_similarity: float = MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self.by_name_type = {}
+        self.by_name = {}
+        # (type, id, number of trigrams) per record and the records of each trigram
+        self.entries: List[Tuple[Optional[str], str, int]] = []
+        self.postings = {}
+        for name, type_, id_ in records:
+            key = name_key(name)
+            self.by_name_type.setdefault((key, type_), id_)
+            self.by_name.setdefault(key, id_)
+            grams = trigrams(fuzzy_key(name))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(len(self.entries))
+            self.entries += (type_, id_, len(grams)),
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, name: str, type_: Optional[str] = None) -> Optional[str]:
+        key = name_key(name)
+        if (key, type_) in self.by_name_type:
+            return self.by_name_type[key, type_]
+        return self.by_name.get(key)
+
+    def closest(self, name: str, type_: Optional[str] = None) -> Optional[str]:
+        grams = trigrams(fuzzy_key(name))
+        shared = Counter(entry for gram in grams for entry in self.postings.get(gram, ()))
+        candidates = []
+        for entry, count in shared.items():
+            entry_type, id_, size = self.entries[entry]
+            similarity = 2 * count / (len(grams) + size)
+            if similarity >= self.min_similarity:
+                candidates += (similarity, entry_type == type_, id_),
+        if type_ is not None and any(same_type for _, same_type, _ in candidates):
+            candidates = [candidate for candidate in candidates if candidate[1]]
+        if not candidates:
+            return None
+
+        candidates.sort(key=lambda candidate: -candidate[0])
+        best, _, id_ = candidates[0]
+        if any(other_id != id_ and best - similarity <= MARGIN for similarity, _, other_id in candidates[1:]):
+            return None
+        return id_
+
+    def resolve(self, name: str, type_: Optional[str] = None) -> Optional[str]:
+        return self.get(name, type_) or self.closest(name, type_)
+
+
+SPECIALISATIONS = NameIndex((item['Name'], item['SubplanType'], item['SubPlanCode'])
+                            for item in ALL_SPECIALISATIONS.values())
+PROGRAMS = NameIndex((name, None, code) for name, code in ALL_PROGRAMS.items())
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Iterable, Iterator, List
+
+import spacy
+from spacy.language import Language
+from spacy.tokens import Doc
+
+from nlp_config import PATTERNS
+
+
+def pipeline_fingerprint(nlp: Language) -> str:
+    """changes whenever the model, the pipeline or the entity patterns change"""
+    meta = {
+        'spacy': spacy.__version__,
+        'model': f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}",
+        'pipeline': nlp.pipe_names,
+        'patterns': PATTERNS,
+    }
+    return hashlib.sha1(json.dumps(meta, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed Docs, keyed by a hash of the text.
+
+    The same requisite sentences and requirement lines come back on thousands of pages and in every
+    crawl, those are parsed once and read back from a SQLite file afterwards. Entries are evicted least
+    recently used first once the file holds more than max_bytes of Docs, and the whole cache is dropped
+    when the pipeline fingerprint changes. Callers pass text that is already whitespace-normalised.
+    With path=None every call goes straight to the pipeline.
+    """
+
+    def __init__(self, nlp: Language, path: str = 'data/cache/nlp.sqlite', max_bytes: int = 512 * 2 ** 20):
+        self.nlp = nlp
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        self.pid = None
+        if path:
+            self._open()
+
+    def _open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # parse workers of one crawl share the file
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.pid = os.getpid()
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS docs (key TEXT PRIMARY KEY, doc BLOB, size INTEGER, used REAL);
+            CREATE INDEX IF NOT EXISTS docs_by_use ON docs (used);
+        """)
+        fingerprint = pipeline_fingerprint(self.nlp)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if not row or row[0] != fingerprint:
+            with self.conn:
+                self.conn.execute("DELETE FROM docs")
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (fingerprint,))
+        self.size = self.conn.execute("SELECT coalesce(sum(size), 0) FROM docs").fetchone()[0]
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def __call__(self, text: str) -> Doc:
+        return next(self.pipe([text]))
+
+    def pipe(self, texts: Iterable[str]) -> Iterator[Doc]:
+        """like nlp.pipe, texts not in the cache are parsed together in one nlp.pipe call"""
+        texts = list(texts)
+        if self.conn is not None and self.pid != os.getpid():
+            # a connection can't be used across fork, the child opens its own
+            self._open()
+        if self.conn is None:
+            yield from self.nlp.pipe(texts)
+            return
+
+        keys = [self.key(text) for text in texts]
+        cached = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            cached.update(self.conn.execute(
+                f"SELECT key, doc FROM docs WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+
+        missing = list(dict.fromkeys(text for key, text in zip(keys, texts) if key not in cached))
+        parsed = dict(zip([self.key(text) for text in missing], self.nlp.pipe(missing)))
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        self._store(parsed, list(cached))
+
+        for key in keys:
+            if key in parsed:
+                yield parsed[key]
+            else:
+                yield Doc(self.nlp.vocab).from_bytes(cached[key])
+
+    def _store(self, parsed: dict, used: List[str]):
+        now = time.time()
+        rows = []
+        for key, doc in parsed.items():
+            data = doc.to_bytes(exclude=['tensor', 'user_data'])
+            rows += (key, data, len(data), now),
+            self.size += len(data)
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)", rows)
+            self.conn.executemany("UPDATE docs SET used = ? WHERE key = ?", [(now, key) for key in used])
+        if self.size > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """drop least recently used entries until the cache is back under 90% of max_bytes"""
+        excess = self.size - int(self.max_bytes * 0.9)
+        keys = []
+        for key, size in self.conn.execute("SELECT key, size FROM docs ORDER BY used"):
+            if excess <= 0:
+                break
+            keys += key,
+            excess -= size
+            self.size -= size
+        with self.conn:
+            self.conn.executemany("DELETE FROM docs WHERE key = ?", [(key,) for key in keys])
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -94,9 +94,11 @@ if os.path.exists(specialisations_dir):
 
 
 ALL_PROGRAMS = {}
-for file in ['data/from_api/programs_undergrad.json', 'data/from_api/programs_postgrad.json']:
-    if os.path.exists(file):
-        with open(file) as f:
+programs_dir = 'data/from_api/programs'
+if os.path.exists(programs_dir):
+    # programs_undergrad_2022.json, ... oldest year first, so the code of the latest year wins for a renamed program
+    for file in sorted(os.listdir(programs_dir), key=lambda fn: (os.path.splitext(fn)[0][-4:], fn)):
+        with open(os.path.join(programs_dir, file)) as f:
             data = json.load(f)
             for item in data['Items']:
                 ALL_PROGRAMS[item['ProgramName']] = item['AcademicPlanCode']
@@ -0,0 +1,104 @@
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List
+
+from spacy.language import Language
+from spacy.tokens import Doc
+
+import span_tagger  # noqa: F401, registers the span_tagger component
+
+MODEL = 'en_core_web_sm'
+
+# profile -> components that run, every other component of the pipeline is skipped
+PROFILES = {
+    # everything, as the spiders used to run
+    'full': None,
+    # class_parser: pos_ == 'VERB' (tagger, attribute_ruler), lemma_ (lemmatizer), doc.sents (parser)
+    # and the CLASS / PROGRAM entities, tok2vec feeds the tagger and the parser. ner is skipped
+    'requisites': ['tok2vec', 'tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'span_tagger'],
+    # program requirement lines: only which CLASS entities a line has and where
+    'requirements': ['span_tagger'],
+}
+
+_nlp = None
+_profiles = {}
+_lock = threading.Lock()
+
+
+def build_nlp(model: str = MODEL) -> Language:
+    """the spaCy model with the CLASS / PROGRAM span tagger in front of its ner"""
+    import spacy
+    nlp = spacy.load(model)
+    nlp.add_pipe("span_tagger", before="ner")
+    return nlp
+
+
+class NLPProfile:
+    """
+    The shared pipeline with only the components a call site needs.
+
+    Behaves like the Language for calling, piping and the attributes the parse cache
+    reads. Every profile shares the vocab of the full pipeline.
+    """
+
+    def __init__(self, nlp: Language, name: str, components: List[str] = None):
+        self.nlp = nlp
+        self.name = name
+        self.disable = [pipe for pipe in nlp.pipe_names if components is not None and pipe not in components]
+
+    @property
+    def vocab(self):
+        return self.nlp.vocab
+
+    @property
+    def meta(self) -> Dict:
+        return self.nlp.meta
+
+    @property
+    def pipe_names(self) -> List[str]:
+        return [pipe for pipe in self.nlp.pipe_names if pipe not in self.disable]
+
+    def __call__(self, text: str) -> Doc:
+        return self.nlp(text, disable=self.disable)
+
+    def pipe(self, texts: Iterable[str], **kwargs) -> Iterator[Doc]:
+        return self.nlp.pipe(texts, disable=self.disable, **kwargs)
+
+
+def get_profile(name: str) -> NLPProfile:
+    """one of PROFILES on top of get_nlp()"""
+    if name not in _profiles:
+        _profiles[name] = NLPProfile(get_nlp(), name, PROFILES[name])
+    return _profiles[name]
+
+
+def get_nlp() -> Language:
+    """
+    The pipeline shared by every spider in the process, loaded on first use.
+
+    Worker pools that fork inherit an already loaded pipeline copy-on-write,
+    so call this once in the parent before forking to load the model only once.
+    """
+    global _nlp
+    if _nlp is None:
+        with _lock:
+            if _nlp is None:
+                _nlp = build_nlp()
+    return _nlp
+
+
+def _after_fork_in_child():
+    # the lock may have been held by another thread of the parent at fork time
+    global _lock
+    _lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class SharedNLP:
+    """class attribute that resolves to get_nlp(), so spider.nlp keeps working without loading at import"""
+
+    def __get__(self, instance, owner) -> Language:
+        return get_nlp()
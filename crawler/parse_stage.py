@@ -0,0 +1,53 @@
+import importlib
+from concurrent.futures import Future
+from typing import Dict, List
+
+from scrapy import Request
+from scrapy.http.response.html import HtmlResponse
+from scrapy.settings import Settings
+from scrapy.utils.misc import arg_to_iter
+from twisted.internet.defer import Deferred
+
+# state of a worker process: settings the spiders read, one spider per class
+_settings = {}
+_spiders = {}
+
+
+def init_worker(settings: Dict):
+    global _settings
+    _settings = settings
+
+
+def _spider(module: str, class_name: str):
+    key = (module, class_name)
+    if key not in _spiders:
+        spider = getattr(importlib.import_module(module), class_name)()
+        spider.settings = Settings(_settings)
+        _spiders[key] = spider
+    return _spiders[key]
+
+
+def parse_page(module: str, class_name: str, callback: str, url: str, body: bytes, encoding: str) -> List:
+    """
+    runs in a worker process: the items a spider callback gives for a downloaded page.
+    the worker's spider loads its own NLP pipeline on first use
+    """
+    spider = _spider(module, class_name)
+    response = HtmlResponse(url=url, body=body, encoding=encoding)
+    return [item for item in arg_to_iter(getattr(spider, callback)(response)) if not isinstance(item, Request)]
+
+
+def to_deferred(future: Future) -> Deferred:
+    """a Deferred fired on the reactor thread with the result of a concurrent.futures Future"""
+    from twisted.internet import reactor
+
+    d = Deferred()
+
+    def done(f: Future):
+        if f.exception() is not None:
+            reactor.callFromThread(d.errback, f.exception())
+        else:
+            reactor.callFromThread(d.callback, f.result())
+
+    future.add_done_callback(done)
+    return d
@@ -0,0 +1,114 @@
+import os
+import queue
+import sys
+import threading
+from typing import Dict, List
+
+from itemadapter import ItemAdapter
+from scrapy import Spider
+from scrapy.exceptions import NotConfigured
+
+from models import Course, Program, SpecialisationPage
+
+# graph_builder lives in the repository root, next to the crawler directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph_builder as gb  # noqa: E402
+from graph_sinks import BatchedGraph, GraphSink, InMemoryGraph, NullGraph  # noqa: E402
+
+
+class GraphPipeline:
+    """
+    Merges every scraped Course / Program / SpecialisationPage into the graph while the crawl runs.
+
+    Items are handed to a background thread so the crawl never waits on the database.
+    The node of an item is written as soon as it arrives. Its edges are written straight away when
+    every id they reference is known, otherwise they wait until the end of the crawl.
+    Ids listed by the search API (data/from_api) count as known before their page is crawled.
+
+    Enable with
+        scrapy runspider crawler/spider_class.py -s ITEM_PIPELINES='{"pipelines.GraphPipeline": 300}'
+    Settings: GRAPH_SINK (neo4j, memory or null, default neo4j), GRAPH_BATCH_SIZE (default 1000)
+    """
+
+    LABELS = [(Course, 'Course'), (Program, 'Program'), (SpecialisationPage, 'Specialisation')]
+    CACHES = {'Course': gb.CLASSES, 'Program': gb.PROGRAMS, 'Specialisation': gb.SPECIAL}
+
+    def __init__(self, sink: str, batch_size: int):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=10000)
+        self.deferred = []  # (label, doc) whose references were not known on arrival
+        self.G = None
+        self.thread = None
+        self.error = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        sink = crawler.settings.get('GRAPH_SINK', 'neo4j')
+        if sink not in {'neo4j', 'memory', 'null'}:
+            raise NotConfigured(f'unknown GRAPH_SINK {sink}')
+        return cls(sink, crawler.settings.getint('GRAPH_BATCH_SIZE', 1000))
+
+    def _connect(self) -> GraphSink:
+        if self.sink == 'memory':
+            return InMemoryGraph()
+        if self.sink == 'null':
+            return NullGraph()
+        from py2neo import Graph
+        from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+        return BatchedGraph(Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)), self.batch_size, stats=gb.STATS)
+
+    def open_spider(self, spider: Spider):
+        self.G = self._connect()
+        gb.seed_caches()
+        self.thread = threading.Thread(target=self._run, name='graph-writer', daemon=True)
+        self.thread.start()
+
+    def process_item(self, item, spider: Spider):
+        for item_class, label in self.LABELS:
+            if isinstance(item, item_class):
+                self.queue.put((label, ItemAdapter(item).asdict()))
+                break
+        return item
+
+    def close_spider(self, spider: Spider):
+        self.queue.put(None)
+        self.thread.join()
+        try:
+            if self.error:
+                spider.logger.error(f'graph writer failed: {self.error!r}')
+            else:
+                # whatever is still unknown now is not on the site, load it the way graph_builder.main does
+                for label, doc in self.deferred:
+                    gb.create_edges_for_doc(doc, label, self.G)
+        finally:
+            # what was merged before any failure may still be buffered
+            self.G.close()
+        spider.logger.info(f'graph: {self.G.summary()}, deferred {len(self.deferred)} items')
+        gb.STATS.report()
+
+    def _run(self):
+        try:
+            while True:
+                entry = self.queue.get()
+                if entry is None:
+                    return
+                self._merge(*entry)
+        except Exception as e:
+            self.error = e
+            # keep draining so the crawl is not blocked on a full queue
+            while self.queue.get() is not None:
+                pass
+
+    def _merge(self, label: str, doc: Dict):
+        gb.create_node_if_not_exists(self.CACHES[label], doc, self.G, doc['id'], label)
+
+        if label != 'Course' and not self._resolved(doc.get('requirements', [])):
+            self.deferred += (label, doc),
+        else:
+            gb.create_edges_for_doc(doc, label, self.G)
+
+    def _resolved(self, requirements: List[Dict]) -> bool:
+        return all(key in gb.CLASSES or key in gb.PROGRAMS or key in gb.SPECIAL
+                   for key in gb.referenced_ids(requirements))
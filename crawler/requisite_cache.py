@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Callable, Optional
+
+
+class RequisiteCache:
+    """
+    Parsed requisite expressions keyed by the normalised requisite text.
+
+    Incompatibility lists and "must be studying a Master of ..." sentences come back word for word
+    on many courses and in every year's pages, each distinct text is parsed once and the expression
+    tree is kept as JSON, in memory and in a SQLite file that later crawls reuse. Every hit decodes
+    a fresh copy, so callers can change what they get back. The file is emptied when the fingerprint
+    (crawl_state.parse_fingerprint: pipeline, parser code and the names it resolves against) changes.
+    With path=None the cache only lasts the crawl.
+    """
+
+    def __init__(self, fingerprint: str, path: Optional[str] = 'data/cache/requisites.sqlite'):
+        self.fingerprint = fingerprint
+        self.path = path
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        self.pid = None
+        if path:
+            self._open()
+
+    def _open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # parse workers of one crawl share the file
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.pid = os.getpid()
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS expressions (key TEXT PRIMARY KEY, expression TEXT);
+        """)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if not row or row[0] != self.fingerprint:
+            with self.conn:
+                self.conn.execute("DELETE FROM expressions")
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (self.fingerprint,))
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _load(self, key: str) -> Optional[str]:
+        if self.conn is None:
+            return None
+        if self.pid != os.getpid():
+            # a connection can't be used across fork, the child opens its own
+            self._open()
+        row = self.conn.execute("SELECT expression FROM expressions WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, text: str, parse: Callable[[str], Any]) -> Any:
+        """the expression parse(text) gives, parsing it only if no crawl has parsed the same text before"""
+        key = self.key(text)
+        data = self.memo.get(key) or self._load(key)
+        if data is not None:
+            self.hits += 1
+            self.memo[key] = data
+            return json.loads(data)
+
+        self.misses += 1
+        expression = parse(text)
+        data = json.dumps(expression)
+        self.memo[key] = data
+        if self.conn is not None:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO expressions VALUES (?, ?)", (key, data))
+        return expression
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
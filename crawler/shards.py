@@ -0,0 +1,204 @@
+"""
+Sharded crawl: the start pages of each spider are split by a hash of their key into N shards,
+and every (spider, shard) pair is a task in a queue of plain files that any number of workers,
+on this machine or on others sharing the directory, take tasks from.
+
+    python crawler/shards.py run --shards 8 --processes 4     # all of it on this machine
+
+    python crawler/shards.py plan --shards 32                 # once
+    python crawler/shards.py work --processes 4               # on every node
+    python crawler/shards.py merge                            # when all tasks are done
+
+Every task crawls with its own frontier, so a task that died (see requeue) resumes where it stopped.
+Run from the repository root, the spiders read data/from_api from there.
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+# output name in data/scraped -> spider file
+SPIDERS = {
+    'classes': 'crawler/spider_class.py',
+    'programs': 'crawler/spider_program.py',
+    'specialisations': 'crawler/spider_specialisation.py',
+}
+
+STATES = ('pending', 'running', 'done', 'failed')
+
+
+def page_key(url: str) -> str:
+    """the course, program or specialisation code at the end of a page url"""
+    return urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1]
+
+
+def shard_of(key: str, shards: int) -> int:
+    # a stable hash, python's hash() of a str changes between processes
+    return int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], 'big') % shards
+
+
+class ShardQueue:
+    """
+    Tasks are json files that move between tasks/pending, running, done and failed.
+    A worker takes a task by renaming it from pending to running, which only one worker can do.
+    Each task writes its items to items/<task>.json, its log to logs/ and its frontier to frontier/<task>.
+    """
+
+    def __init__(self, root: str = 'data/shards'):
+        self.root = root
+
+    def _path(self, state: str, name: str = '') -> str:
+        return os.path.join(self.root, 'tasks', state, name)
+
+    def tasks(self, state: str) -> List[str]:
+        path = self._path(state)
+        return sorted(fn for fn in os.listdir(path) if fn.endswith('.json')) if os.path.exists(path) else []
+
+    def plan(self, shards: int, outputs: List[str], settings: List[str]):
+        if any(self.tasks(state) for state in STATES):
+            raise SystemExit(f'{self.root} has tasks already, delete it to plan a new crawl')
+        for state in STATES:
+            os.makedirs(self._path(state), exist_ok=True)
+        for output in outputs:
+            for shard in range(shards):
+                name = f'{output}-{shard:03d}-of-{shards:03d}.json'
+                with open(self._path('pending', name), 'w') as f:
+                    json.dump({'output': output, 'shard': shard, 'shards': shards, 'settings': settings}, f)
+
+    def claim(self) -> Optional[str]:
+        for name in self.tasks('pending'):
+            try:
+                os.rename(self._path('pending', name), self._path('running', name))
+            except FileNotFoundError:
+                # another worker took it
+                continue
+            with open(self._path('running', name) + '.owner', 'w') as f:
+                f.write(f'{socket.gethostname()} {os.getpid()} {time.time()}\n')
+            return name
+        return None
+
+    def finish(self, name: str, state: str):
+        os.rename(self._path('running', name), self._path(state, name))
+        if os.path.exists(self._path('running', name) + '.owner'):
+            os.remove(self._path('running', name) + '.owner')
+
+    def requeue(self, state: str = 'running') -> int:
+        """puts tasks of dead workers (or failed ones) back in pending, they resume from their frontier"""
+        names = self.tasks(state)
+        for name in names:
+            if state == 'running':
+                self.finish(name, 'pending')
+            else:
+                os.rename(self._path(state, name), self._path('pending', name))
+        return len(names)
+
+    def items_path(self, name: str) -> str:
+        return os.path.join(self.root, 'items', name)
+
+    def command(self, name: str, task: Dict) -> List[str]:
+        task_name, _ = os.path.splitext(name)
+        return [
+            sys.executable, '-m', 'scrapy', 'runspider', SPIDERS[task['output']],
+            '-O', self.items_path(name),
+            '--logfile', os.path.join(self.root, 'logs', f'{task_name}.log'), '--loglevel=INFO',
+            '-s', f"SHARD={task['shard']}", '-s', f"SHARDS={task['shards']}",
+            '-s', f"FRONTIER_DIR={os.path.join(self.root, 'frontier', task_name)}",
+            *[arg for setting in task['settings'] for arg in ('-s', setting)],
+        ]
+
+    def run(self, name: str) -> bool:
+        with open(self._path('running', name)) as f:
+            task = json.load(f)
+        os.makedirs(os.path.join(self.root, 'items'), exist_ok=True)
+        os.makedirs(os.path.join(self.root, 'logs'), exist_ok=True)
+        start = time.time()
+        ok = subprocess.run(self.command(name, task)).returncode == 0 and os.path.exists(self.items_path(name))
+        self.finish(name, 'done' if ok else 'failed')
+        print(f"{name}: {'done' if ok else 'failed'} in {time.time() - start:.1f}s")
+        return ok
+
+    def work(self, processes: int):
+        """
+        runs tasks, processes at a time, until there are none pending.
+        A worker that raises marks its task failed and stops, the error is raised once the others are done
+        """
+        def worker():
+            while True:
+                name = self.claim()
+                if name is None:
+                    return
+                try:
+                    self.run(name)
+                except BaseException:
+                    if os.path.exists(self._path('running', name)):
+                        self.finish(name, 'failed')
+                    raise
+
+        with ThreadPoolExecutor(processes) as pool:
+            workers = [pool.submit(worker) for _ in range(processes)]
+            errors = [future.exception() for future in as_completed(workers) if future.exception()]
+        for error in errors[1:]:
+            print(f'worker failed: {error!r}', file=sys.stderr)
+        if errors:
+            raise errors[0]
+
+    def merge(self, scraped: str = 'data/scraped') -> Dict[str, int]:
+        """items of the done tasks into scraped/<output>.json, ordered by id"""
+        unfinished = [name for state in ('pending', 'running', 'failed') for name in self.tasks(state)]
+        if unfinished:
+            raise SystemExit(f'{len(unfinished)} tasks are not done: {", ".join(unfinished[:5])}')
+        items = {}
+        for name in self.tasks('done'):
+            with open(self._path('done', name)) as f:
+                output = json.load(f)['output']
+            with open(self.items_path(name)) as f:
+                items.setdefault(output, []).extend(json.load(f))
+        for output, output_items in items.items():
+            output_items.sort(key=lambda item: item['id'])
+            with open(os.path.join(scraped, f'{output}.json'), 'w') as f:
+                json.dump(output_items, f, indent=4)
+                f.write('\n')
+        return {output: len(output_items) for output, output_items in items.items()}
+
+    def status(self) -> Dict[str, int]:
+        return {state: len(self.tasks(state)) for state in STATES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl in shards, on one machine or several sharing the queue')
+    parser.add_argument('command', choices=['plan', 'work', 'merge', 'requeue', 'status', 'run'])
+    parser.add_argument('--queue', default='data/shards',
+                        help='directory of the task queue, shared between the nodes (default: %(default)s)')
+    parser.add_argument('--shards', type=int, default=4, help='shards per spider (default: %(default)s)')
+    parser.add_argument('--spiders', nargs='+', choices=list(SPIDERS), default=list(SPIDERS),
+                        help='outputs to crawl (default: all)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                        help='spider processes this node runs at a time (default: %(default)s)')
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='scrapy setting for every shard, e.g. -s SITE_URL=http://localhost:8000')
+    parser.add_argument('--failed', action='store_true', help='requeue failed tasks instead of running ones')
+    parser.add_argument('--scraped', default='data/scraped', help='where merge writes (default: %(default)s)')
+    args = parser.parse_args()
+
+    queue = ShardQueue(args.queue)
+    if args.command in ('plan', 'run'):
+        queue.plan(args.shards, args.spiders, args.set)
+    if args.command in ('work', 'run'):
+        queue.work(args.processes)
+    if args.command == 'requeue':
+        print(f"requeued {queue.requeue('failed' if args.failed else 'running')} tasks")
+    if args.command in ('merge', 'run'):
+        for output, count in queue.merge(args.scraped).items():
+            print(f'{output}: {count} items')
+    print(queue.status())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from scrapy import Request, Spider, signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import HtmlResponse, Response
+
+
+class SnapshotStore:
+    """
+    Every fetched page, gzipped and stored once per distinct content under objects/<sha256 of the body>.
+
+    Each crawl date has a manifest (manifests/<YYYY-MM-DD>.jsonl) with one line per fetched url:
+    the url requested, the url of the final response (after redirects), status, encoding and body hash.
+    Later lines for the same url win, so a crawl can be recorded in several runs.
+    """
+
+    def __init__(self, root: str = 'data/snapshots'):
+        self.root = root
+        self.manifest_file = None
+
+    def _object_path(self, sha: str) -> str:
+        return os.path.join(self.root, 'objects', sha[:2], f'{sha}.gz')
+
+    def _manifest_path(self, date: str) -> str:
+        return os.path.join(self.root, 'manifests', f'{date}.jsonl')
+
+    def dates(self):
+        path = os.path.join(self.root, 'manifests')
+        if not os.path.exists(path):
+            return []
+        return sorted(os.path.splitext(fn)[0] for fn in os.listdir(path) if fn.endswith('.jsonl'))
+
+    def put(self, body: bytes) -> str:
+        """stores a body unless it is there already, returns its hash"""
+        sha = hashlib.sha256(body).hexdigest()
+        path = self._object_path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        return sha
+
+    def get(self, sha: str) -> bytes:
+        with gzip.open(self._object_path(sha), 'rb') as f:
+            return f.read()
+
+    def record(self, date: str, entry: Dict):
+        if self.manifest_file is None:
+            os.makedirs(os.path.join(self.root, 'manifests'), exist_ok=True)
+            self.manifest_file = open(self._manifest_path(date), 'a')
+        self.manifest_file.write(json.dumps(entry, sort_keys=True) + '\n')
+        self.manifest_file.flush()
+
+    def manifest(self, date: str = 'latest') -> Dict[str, Dict]:
+        """url requested -> manifest entry of a crawl date"""
+        if date == 'latest':
+            dates = self.dates()
+            if not dates:
+                return {}
+            date = dates[-1]
+        entries = {}
+        with open(self._manifest_path(date)) as f:
+            for line in f:
+                entry = json.loads(line)
+                entries[entry['request_url']] = entry
+        return entries
+
+    def close(self):
+        if self.manifest_file is not None:
+            self.manifest_file.close()
+            self.manifest_file = None
+
+
+class SnapshotMiddleware:
+    """
+    Downloader middleware that records fetched pages into a SnapshotStore or replays them from it.
+
+    SNAPSHOT_RECORD=1 saves every downloaded page under the manifest of today's date (UTC).
+    SNAPSHOT_REPLAY=<YYYY-MM-DD or latest> answers every request from that manifest without
+    touching the network, requests not in the manifest are dropped.
+    SNAPSHOT_DIR is the store, data/snapshots by default.
+    """
+
+    def __init__(self, store: SnapshotStore, record: bool, replay: Optional[str]):
+        self.store = store
+        self.record = record
+        self.date = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d')
+        self.entries = store.manifest(replay) if replay else None
+        self.replayed = 0
+        self.missing = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        record = crawler.settings.getbool('SNAPSHOT_RECORD')
+        replay = crawler.settings.get('SNAPSHOT_REPLAY')
+        if not record and not replay:
+            raise NotConfigured
+        if record and replay:
+            raise NotConfigured('SNAPSHOT_RECORD and SNAPSHOT_REPLAY are exclusive')
+        middleware = cls(SnapshotStore(crawler.settings.get('SNAPSHOT_DIR', 'data/snapshots')), record, replay)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def process_request(self, request: Request, spider: Spider) -> Optional[Response]:
+        if self.entries is None:
+            return None
+        entry = self.entries.get(request.url)
+        if entry is None:
+            self.missing += 1
+            raise IgnoreRequest(f'{request.url} is not in the snapshot')
+        self.replayed += 1
+        if entry['url'] != entry['request_url']:
+            # as RedirectMiddleware leaves it, so page_url() gives the url asked for and not where it ended up
+            request.meta['redirect_urls'] = [entry['request_url']]
+        return HtmlResponse(
+            url=entry['url'],
+            status=entry['status'],
+            body=self.store.get(entry['sha256']),
+            encoding=entry['encoding'],
+            request=request,
+        )
+
+    def process_response(self, request: Request, response: Response, spider: Spider) -> Response:
+        if self.record and hasattr(response, 'encoding'):
+            # the first url of a redirect chain is the one the spider asked for
+            request_url = request.meta.get('redirect_urls', [request.url])[0]
+            self.store.record(self.date, {
+                'request_url': request_url,
+                'url': response.url,
+                'status': response.status,
+                'encoding': response.encoding,
+                'sha256': self.store.put(response.body),
+            })
+        return response
+
+    def spider_closed(self, spider: Spider):
+        self.store.close()
+        if self.entries is not None:
+            spider.logger.info(f'snapshot replay: {self.replayed} pages, {self.missing} not in the snapshot')
+
@@ -0,0 +1,181 @@
+import re
+from typing import Dict, List, Tuple
+
+from spacy.language import Language
+from spacy.tokens import Doc, Span
+
+from nlp_config import PATTERNS
+
+# (start token, end token, label, pattern id)
+Match = Tuple[int, int, str, str]
+
+
+def _predicates(spec: Dict) -> List[Tuple]:
+    """the token tests of one entry of a token pattern, as hashable (attribute, kind, value) tuples"""
+    predicates = []
+    for attr, value in spec.items():
+        if attr == 'OP':
+            continue
+        if attr == 'IS_TITLE':
+            predicates += (attr, 'is', bool(value)),
+        elif attr not in ('TEXT', 'LOWER'):
+            raise ValueError(f'unsupported token attribute {attr}')
+        elif type(value) == str:
+            predicates += (attr, 'in', (value,)),
+        elif 'IN' in value:
+            predicates += (attr, 'in', tuple(value['IN'])),
+        elif 'REGEX' in value:
+            predicates += (attr, 'regex', value['REGEX']),
+        else:
+            raise ValueError(f'unsupported token pattern {value}')
+    return predicates
+
+
+class SpanTagger:
+    """
+    Tags the token patterns of nlp_config.PATTERNS with compiled regular expressions,
+    giving the same entity spans as an entity_ruler with those patterns.
+
+    Every token is turned into a fixed width string of 0 / 1, one for each distinct test
+    the patterns make on a token (memoised per token text), and every token pattern into a
+    regular expression over those strings. A page is then scanned once per pattern by the re
+    engine instead of running the Matcher, and overlapping matches are resolved like the ruler
+    does: longest first, then the earliest.
+
+    Use it on a token list (spans), a raw string (entities, with the spaCy English tokenizer)
+    or as the "span_tagger" pipeline component in place of the entity ruler.
+    """
+
+    def __init__(self, patterns: List[Dict] = PATTERNS, max_memo: int = 100000):
+        self.predicates = []
+        for pattern in patterns:
+            for spec in pattern['pattern']:
+                for predicate in _predicates(spec):
+                    if predicate not in self.predicates:
+                        self.predicates += predicate,
+        self.width = len(self.predicates)
+
+        # LOWER / TEXT values -> indices of the predicates they satisfy, the rest is evaluated per token
+        self.lower_values = {}
+        self.text_values = {}
+        self.regexes = []
+        self.title = []
+        for i, (attr, kind, value) in enumerate(self.predicates):
+            if kind == 'in':
+                values = self.lower_values if attr == 'LOWER' else self.text_values
+                for v in value:
+                    values.setdefault(v, []).append(i)
+            elif kind == 'regex':
+                self.regexes += (i, attr, re.compile(value).search),
+            else:
+                self.title += (i, value),
+
+        self.patterns = []
+        for pattern in patterns:
+            parts = []
+            min_len, max_len = 0, 0
+            for spec in pattern['pattern']:
+                required = {self.predicates.index(p) for p in _predicates(spec)}
+                token = ''.join('1' if i in required else '.' for i in range(self.width))
+                op = spec.get('OP')
+                if op is None:
+                    parts += token,
+                    min_len, max_len = min_len + 1, max_len + 1
+                elif op in ('?', '+', '*'):
+                    parts += f'(?:{token}){op}',
+                    min_len += op == '+'
+                    max_len = max_len + 1 if op == '?' else float('inf')
+                else:
+                    raise ValueError(f'unsupported operator {op}')
+            regex = ''.join(parts)
+            self.patterns += {
+                'label': pattern['label'],
+                'id': pattern.get('id', ''),
+                'starts': re.compile(f'(?=(?:{regex}))', re.DOTALL),
+                'match': re.compile(regex, re.DOTALL),
+                'min_len': min_len,
+                'fixed': min_len == max_len,
+            },
+
+        self.max_memo = max_memo
+        self.memo = {}
+        self.tokenizer = None
+
+    def encode(self, text: str) -> str:
+        """the 0 / 1 string of a token"""
+        code = self.memo.get(text)
+        if code is None:
+            flags = ['0'] * self.width
+            for i in self.lower_values.get(text.lower(), ()):
+                flags[i] = '1'
+            for i in self.text_values.get(text, ()):
+                flags[i] = '1'
+            for i, attr, search in self.regexes:
+                if search(text if attr == 'TEXT' else text.lower()):
+                    flags[i] = '1'
+            for i, value in self.title:
+                if text.istitle() == value:
+                    flags[i] = '1'
+            code = ''.join(flags)
+            if len(self.memo) >= self.max_memo:
+                self.memo.clear()
+            self.memo[text] = code
+        return code
+
+    def matches(self, words: List[str]) -> List[Match]:
+        """every match of every pattern, overlapping ones included, like the Matcher returns them"""
+        encoded = ''.join([self.encode(word) for word in words])
+        n, width = len(words), self.width
+        matches = set()
+        for pattern in self.patterns:
+            for m in pattern['starts'].finditer(encoded):
+                if m.start() % width:
+                    continue
+                start = m.start() // width
+                if pattern['fixed']:
+                    ends = [start + pattern['min_len']]
+                else:
+                    ends = [end for end in range(start + max(pattern['min_len'], 1), n + 1)
+                            if pattern['match'].fullmatch(encoded, start * width, end * width)]
+                for end in ends:
+                    if end > start:
+                        matches.add((start, end, pattern['label'], pattern['id']))
+        return sorted(matches)
+
+    def spans(self, words: List[str], taken: List[Tuple[int, int]] = ()) -> List[Match]:
+        """
+        non-overlapping matches in a list of token texts, longest first then the earliest,
+        skipping tokens covered by the (start, end) ranges in taken
+        """
+        seen = set()
+        for start, end in taken:
+            seen.update(range(start, end))
+        spans = []
+        for match in sorted(self.matches(words), key=lambda m: (m[1] - m[0], -m[0]), reverse=True):
+            start, end = match[0], match[1]
+            if all(i not in seen for i in range(start, end)):
+                spans += match,
+                seen.update(range(start, end))
+        return sorted(spans)
+
+    def entities(self, text: str) -> List[Tuple[str, str]]:
+        """(label, text) of the entities in a raw string, tokenized like the spaCy English pipeline"""
+        if self.tokenizer is None:
+            import spacy
+            self.tokenizer = spacy.blank('en').tokenizer
+        doc = self.tokenizer(text)
+        return [(label, doc[start:end].text) for start, end, label, _ in self.spans([t.text for t in doc])]
+
+    def __call__(self, doc: Doc) -> Doc:
+        """pipeline component: adds the matches to doc.ents, keeping entities already set"""
+        existing = list(doc.ents)
+        new = [Span(doc, start, end, label=label, span_id=span_id)
+               for start, end, label, span_id in self.spans([t.text for t in doc],
+                                                            [(e.start, e.end) for e in existing])]
+        doc.ents = sorted(existing + new)
+        return doc
+
+
+@Language.factory("span_tagger")
+def make_span_tagger(nlp: Language, name: str) -> SpanTagger:
+    return SpanTagger()
@@ -1,21 +1,191 @@
-from abc import ABC
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import sys
+from typing import Optional
 
 import html2text
-import spacy
+import scrapy
 from scrapy.http.response.html import HtmlResponse
 from scrapy.spiders import CrawlSpider
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.misc import arg_to_iter
 
-from nlp_config import PATTERNS
+from crawl_state import CrawlState, page_url, parse_fingerprint
+from frontier import Frontier
+from nlp_cache import ParseCache
+from nlp_model import SharedNLP, get_profile
+import parse_stage
+from shards import page_key, shard_of
+import snapshots  # noqa: F401, loaded by name from custom_settings
 
+# settings handed to the parse workers
+WORKER_SETTINGS = ('NLP_CACHE_PATH', 'NLP_CACHE_MAX_MB', 'REQUISITE_CACHE_PATH')
 
-class SpiderANU(ABC, CrawlSpider):
+
+class SpiderANU(CrawlSpider):
     DOMAIN = 'programsandcourses.anu.edu.au'
     converter = html2text.HTML2Text()
     converter.ignore_links = True
 
-    nlp = spacy.load("en_core_web_sm")
-    ruler = nlp.add_pipe("entity_ruler", config={"validate": True}, before="ner")
-    ruler.add_patterns(PATTERNS)
+    # inactive unless SNAPSHOT_RECORD or SNAPSHOT_REPLAY is set
+    custom_settings = {
+        'DOWNLOADER_MIDDLEWARES': {'snapshots.SnapshotMiddleware': 580},
+    }
+
+    nlp = SharedNLP()
+    # nlp_model.PROFILES entry the spider parses text with
+    nlp_profile = 'full'
+
+    _parse_cache = None
+    _parse_pool = None
+    _crawl_state = None
+    _frontier = None
+
+    @property
+    def parse_cache(self) -> ParseCache:
+        """
+        the spider's nlp profile with an on-disk cache of parses, one file per profile,
+        configured by the NLP_CACHE_PATH (empty to disable) and NLP_CACHE_MAX_MB settings
+        """
+        if self._parse_cache is None:
+            nlp = get_profile(self.nlp_profile)
+            settings = getattr(self, 'settings', None)
+            path = settings.get('NLP_CACHE_PATH', 'data/cache/nlp.sqlite') if settings is not None else None
+            if path:
+                base, ext = os.path.splitext(path)
+                path = f'{base}-{self.nlp_profile}{ext}'
+                self._parse_cache = ParseCache(nlp, path, max_bytes=settings.getint('NLP_CACHE_MAX_MB', 512) * 2 ** 20)
+            else:
+                self._parse_cache = ParseCache(nlp, path=None)
+        return self._parse_cache
+
+    @property
+    def parse_pool(self) -> Optional[ProcessPoolExecutor]:
+        """
+        PARSE_WORKERS processes that parse the downloaded pages, each with its own NLP pipeline.
+        None with the default of 0 workers, the pages are then parsed in the spider's callbacks
+        """
+        settings = getattr(self, 'settings', None)
+        if self._parse_pool is None and settings is not None and settings.getint('PARSE_WORKERS', 0) > 0:
+            # workers import the spider modules by name, scrapy runspider only has them on the path while loading
+            crawler_dir = os.path.dirname(os.path.abspath(__file__))
+            if crawler_dir not in sys.path:
+                sys.path.append(crawler_dir)
+            self._parse_pool = ProcessPoolExecutor(
+                settings.getint('PARSE_WORKERS'),
+                # the crawl runs threads, start clean interpreters rather than forking it
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=parse_stage.init_worker,
+                initargs=({key: settings[key] for key in WORKER_SETTINGS if settings[key] is not None},)
+            )
+        return self._parse_pool
+
+    @property
+    def crawl_state(self) -> Optional[CrawlState]:
+        """what the last crawl saw of each page, when INCREMENTAL is set (stored at CRAWL_STATE_PATH)"""
+        settings = getattr(self, 'settings', None)
+        if self._crawl_state is None and settings is not None and settings.getbool('INCREMENTAL'):
+            self._crawl_state = CrawlState(parse_fingerprint(self.parse_cache.nlp),
+                                           settings.get('CRAWL_STATE_PATH', 'data/cache/crawl_state.sqlite'))
+        return self._crawl_state
+
+    @property
+    def site_url(self) -> str:
+        """the site the start requests go to, SITE_URL to crawl a local stand-in for it"""
+        settings = getattr(self, 'settings', None)
+        site_url = settings.get('SITE_URL') if settings is not None else None
+        return site_url.rstrip('/') if site_url else f'https://{self.DOMAIN}'
+
+    def shard_requests(self):
+        """the start requests, only those of shard SHARD out of SHARDS (see shards.py) in a sharded crawl"""
+        shards = self.settings.getint('SHARDS', 1)
+        shard = self.settings.getint('SHARD', 0)
+        for request in self.start_requests():
+            if shards == 1 or shard_of(page_key(request.url), shards) == shard:
+                yield request
+
+    @property
+    def frontier(self) -> Optional[Frontier]:
+        """the pages and checkpointed items of a resumable crawl, when FRONTIER_DIR is set (one file per spider)"""
+        settings = getattr(self, 'settings', None)
+        if self._frontier is None and settings is not None and settings.get('FRONTIER_DIR'):
+            self._frontier = Frontier(os.path.join(settings['FRONTIER_DIR'], f'{self.name}.sqlite'))
+        return self._frontier
+
+    async def start(self):
+        """
+        the requests of shard_requests. with a frontier, these are recorded by the first run of the crawl,
+        and a crawl started again yields the items checkpointed so far and requests only the pages still pending.
+
+        The spiders list their pages in start_requests(), which Scrapy before 2.13 calls instead of start(),
+        without shards or frontier, and whose results the default start() of 2.13 passes on. Later releases
+        dropped that fallback, so only this start() reaches start_requests() there
+        """
+        if self.frontier is None:
+            for request in self.shard_requests():
+                yield request
+            return
+        if self.frontier.is_new():
+            self.frontier.add([(request.url, request.cb_kwargs['callback']) for request in self.shard_requests()])
+        done, pending = self.frontier.counts()
+        self.logger.info(f'frontier: {done} pages done, {pending} pending')
+        for item in self.frontier.items():
+            yield item
+        for url, callback in self.frontier.pending():
+            yield self.page_request(url, getattr(self, callback))
+
+    def page_request(self, url: str, callback) -> scrapy.Request:
+        """
+        request for a page parsed by callback, in the parse pool if there is one,
+        conditional on the page having changed in an incremental crawl
+        """
+        if self.parse_pool is None and self.crawl_state is None and self.frontier is None:
+            return scrapy.Request(url, callback)
+        headers, meta = {}, {}
+        if self.crawl_state is not None:
+            headers = self.crawl_state.conditional_headers(url)
+            meta['handle_httpstatus_list'] = [304]
+        return scrapy.Request(url, self.parse_page, headers=headers, meta=meta,
+                              cb_kwargs={'callback': callback.__name__})
+
+    async def parse_page(self, response: HtmlResponse, callback: str):
+        """
+        yields the items of an unchanged page from the crawl state,
+        else parses the page, handing it to a parse worker if there is a pool so downloads carry on meanwhile.
+        the items are checkpointed in the frontier before they are yielded
+        """
+        items = self.crawl_state.stored_items(response) if self.crawl_state is not None else None
+        if items is None:
+            if self.parse_pool is not None:
+                future = self.parse_pool.submit(parse_stage.parse_page, type(self).__module__, type(self).__name__,
+                                                callback, response.url, response.body, response.encoding)
+                items = await maybe_deferred_to_future(parse_stage.to_deferred(future))
+            else:
+                items = [item for item in arg_to_iter(getattr(self, callback)(response))
+                         if not isinstance(item, scrapy.Request)]
+            if self.crawl_state is not None:
+                self.crawl_state.save(response, items)
+
+        if self.frontier is not None:
+            self.frontier.checkpoint(page_url(response), items)
+        for item in items:
+            yield item
+
+    def closed(self, reason: str):
+        if self._parse_cache is not None:
+            self.logger.info(f'nlp cache: {self._parse_cache.hits} hits, {self._parse_cache.misses} misses')
+            self._parse_cache.close()
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+        if self._crawl_state is not None:
+            self.logger.info(f'incremental crawl: {self._crawl_state.changed} pages parsed, '
+                             f'{self._crawl_state.unchanged} unchanged')
+            self._crawl_state.close()
+        if self._frontier is not None:
+            done, pending = self._frontier.counts()
+            self.logger.info(f'frontier: {done} pages done, {pending} pending')
+            self._frontier.close()
 
     def parse_unit(self, response: HtmlResponse) -> int:
         """
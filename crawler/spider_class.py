@@ -1,16 +1,16 @@
 import json
 import os
-import re
 
-from bs4 import BeautifulSoup
-from bs4.element import NavigableString
-import scrapy
 from scrapy.http.response.html import HtmlResponse
 
 from class_parser import parse_requisites
+from crawl_state import parse_fingerprint
+import html_tree
 from models import Program, Requirement, Specialisation, Course
 from nlp_config import TARGET, ALL_SPECIALISATIONS, ALL_PROGRAMS
+from requisite_cache import RequisiteCache
 from spider_anu import SpiderANU
+from text_normaliser import REQUISITES
 
 
 class SpiderClass(SpiderANU):
@@ -18,6 +18,28 @@ class SpiderClass(SpiderANU):
 
     name = 'SpiderClass'
     id_attribute_name = 'CourseCode'
+    nlp_profile = 'requisites'
+
+    _requisite_cache = None
+
+    @property
+    def requisite_cache(self) -> RequisiteCache:
+        """
+        parsed requisites by normalised text, shared by every course and kept across crawls
+        at REQUISITE_CACHE_PATH (empty to keep them for one crawl only)
+        """
+        if self._requisite_cache is None:
+            settings = getattr(self, 'settings', None)
+            path = settings.get('REQUISITE_CACHE_PATH', 'data/cache/requisites.sqlite') if settings is not None else None
+            self._requisite_cache = RequisiteCache(parse_fingerprint(self.parse_cache.nlp), path or None)
+        return self._requisite_cache
+
+    def closed(self, reason: str):
+        if self._requisite_cache is not None:
+            self.logger.info(f'requisite cache: {self._requisite_cache.hits} hits, '
+                             f'{self._requisite_cache.misses} misses')
+            self._requisite_cache.close()
+        super().closed(reason)
 
     def start_requests(self):
         all_items = {}
@@ -29,7 +51,7 @@ class SpiderClass(SpiderANU):
                     for item in data['Items']:
                         all_items[item[self.id_attribute_name]] = item
         for key in sorted(all_items.keys()):
-            yield scrapy.Request(f"https://{self.DOMAIN}/course/{key}", self.parse_class)
+            yield self.page_request(f"{self.site_url}/course/{key}", self.parse_class)
 
     def parse(self, response: HtmlResponse, **kwargs) -> Course:
         return self.parse_class(response)
@@ -40,34 +62,18 @@ class SpiderClass(SpiderANU):
             return
 
         def get_intro_text(response: HtmlResponse):
-            soup = BeautifulSoup(response.css("div.introduction").get(), 'html.parser')
-
-            arr = []
-            for child in soup.children:
-                arr += child,
-                break
-
-            elements = [elem.text for elem in arr[0].contents]
+            intro = html_tree.find(response, "div.introduction", css=True)
+            elements = [html_tree.text(elem) for elem in html_tree.contents(intro)]
             return "\n".join(elements)
 
         def get_requisites_text(response: HtmlResponse):
-            html = response.css("div.requisite").get()
-            if not html:
+            requisite = html_tree.find(response, "div.requisite", css=True)
+            if requisite is None:
                 return
 
-            soup = BeautifulSoup(html, 'html.parser')
-
-            arr = []
-            for child in soup.children:
-                arr += child,
-                break
-
             txt = ''
-            for item in arr[0].contents:
-                if type(item) == str:
-                    txt += f' {item}'
-                else:
-                    txt += f' {item.text}'
+            for item in html_tree.contents(requisite):
+                txt += f' {html_tree.text(item)}'
             return txt.replace('\n', ' ').replace('\\', '').strip()
 
         attrs = self.parse_class_info(response)
@@ -94,46 +100,24 @@ class SpiderClass(SpiderANU):
         requisites_txt = get_requisites_text(response)
 
         if requisites_txt:
-            requisites_txt = requisites_txt.replace('R&D', 'Research and Development')
-
-            # if class code is not followed by a space, insert space
-            requisites_txt = re.sub('([A-Z]{4}[0-9]{4})([a-z]+)', '\\1 \\2', requisites_txt)
-
-            # remove everything in a pair of parenthesis if it only contains upper-case characters
-            # "Master of Laws (MLLM)" -> "Master of Laws"
-            requisites_txt = re.sub('\([A-Z]+\)', '', requisites_txt)
-
-            # apply parenthesis to Advanced / Honours, if it doesn't come after "of"
-            requisites_txt = requisites_txt.replace(' Advanced ', ' (Advanced) ').replace(' Honours ', ' (Honours) ')
-            requisites_txt = requisites_txt.replace('of (Advanced)', 'of Advanced')
+            requisites_txt = REQUISITES(requisites_txt)
 
-            requisites_txt = requisites_txt.replace('&', 'and')
+            course['prerequisites_raw'], course['prerequisites'] = self.requisite_cache.get(
+                requisites_txt, self.parse_requisite_text)
 
-            # insert space if parenthesis and word are not space-separated
-            requisites_txt = re.sub('([A-Za-z])\(', '\\1 (', requisites_txt)
-
-            # strip inner gap between parenthesis and character
-            requisites_txt = re.sub('\(\s+', '(', requisites_txt)
-            requisites_txt = re.sub('\s+\)', ')', requisites_txt)
-
-            # remove empty parenthesis
-            requisites_txt = re.sub('\(\s?\)', '', requisites_txt)
-
-            # remove leading spaces
-            requisites_txt = re.sub('\s+', ' ', requisites_txt)
-
-            doc = self.nlp(requisites_txt)
-            course['prerequisites_raw'] = doc.text
+        return course
 
-            requisites = parse_requisites(doc)
-            if len(requisites) > 1:
-                course['prerequisites'] = {
-                    "description": "",
-                    "operator": {
-                        "AND": requisites
-                    }
+    def parse_requisite_text(self, requisites_txt: str):
+        """prerequisites_raw and prerequisites of a normalised requisite text"""
+        doc = self.parse_cache(requisites_txt)
+        requisites = parse_requisites(doc)
+        if len(requisites) > 1:
+            prerequisites = {
+                "description": "",
+                "operator": {
+                    "AND": requisites
                 }
-            else:
-                course['prerequisites'] = requisites[0]
-
-        return course
+            }
+        else:
+            prerequisites = requisites[0]
+        return doc.text, prerequisites
@@ -2,22 +2,25 @@ from collections import Counter, OrderedDict
 import json
 import os
 import re
-from typing import List, Tuple, Union, Dict
+from typing import List, Tuple, Union
 
-from bs4 import BeautifulSoup
-from bs4.element import NavigableString
-import scrapy
+from lxml import etree
 from scrapy.http.response.html import HtmlResponse
+from spacy.tokens import Span
 
+import html_tree
+from name_index import NameIndex, SPECIALISATIONS
 from nlp_config import SPEC_MAPPER, ALL_SPECIALISATIONS
 from models import Program, Requirement, Specialisation, Course
 from spider_anu import SpiderANU
+from text_normaliser import REQUIREMENT_LINE, SPECIALISATION_NAME
 
 
 class SpiderProgram(SpiderANU):
     """This class is for scraping ANU programs - Master, Bachelor, Diploma, etc"""
     name = 'SpiderProgram'
     id_attribute_name = 'AcademicPlanCode'
+    nlp_profile = 'requirements'
     html_path = '//div[has-class("body", "transition")]' \
                 '/div[@id="study"]' \
                 '/div[has-class("body__inner", "w-doublewide", "copy")]'
@@ -31,7 +34,7 @@ class SpiderProgram(SpiderANU):
                 for item in data['Items']:
                     all_items[item[self.id_attribute_name]] = item
         for key in sorted(all_items.keys()):
-            yield scrapy.Request(f"https://{self.DOMAIN}/program/{key}", self.parse)
+            yield self.page_request(f"{self.site_url}/program/{key}", self.parse)
 
     def parse(self, response: HtmlResponse, **kwargs):
         program_id = response.url.split('/')[-1]
@@ -46,11 +49,12 @@ class SpiderProgram(SpiderANU):
             p['units'] = self.parse_unit(response)
             p['specialisations'] = self.extract_specialisations(response)
             p['requirements'] = self.parse_requirements(response)
+            records = NameIndex((spec['name'], spec['type'], spec['id']) for spec in p['specialisations'])
             for i in range(len(p['requirements'])):
-                p['requirements'][i] = self.fix_requirement(p['requirements'][i], p['specialisations'])
+                p['requirements'][i] = self.fix_requirement(p['requirements'][i], records)
             yield p
 
-    def fix_requirement(self, req: Union[Requirement, Specialisation], records: List[Specialisation]) -> Union[Requirement, Specialisation]:
+    def fix_requirement(self, req: Union[Requirement, Specialisation], records: NameIndex) -> Union[Requirement, Specialisation]:
         if 'items' in req and req['items']:
             for i in range(len(req['items'])):
                 req['items'][i] = self.fix_requirement(req['items'][i], records)
@@ -58,34 +62,18 @@ class SpiderProgram(SpiderANU):
             if 'name' in req:
                 req['name'] = self.fix_specialisation_name(req['name'])
             if 'id' not in req:
-                for item in records:
-                    if item['name'] == req['name'] and item['type'] == req['type']:
-                        req['id'] = item['id']
-                        return req
-            if 'id' not in req:
-                for item in records:
-                    if item['name'] == req['name']:
-                        req['id'] = item['id']
-                        return req
+                id_ = records.resolve(req['name'], req.get('type'))
+                if id_:
+                    req['id'] = id_
+                    return req
         if type(req) == list:
             return [self.fix_requirement(item, records) for item in req]
         return req
 
     def fix_specialisation_name(self, s: str):
-        # clean up name
-        for keyword in ['Minor', 'minor', 'Major', 'major', 'Specialisation', 'specialisation']:
-            if s.endswith(keyword):
-                s = s.rstrip(keyword).strip()
-
-        s = re.sub('[A-Z]{3,5}-[A-Z]{3,4}', '', s).strip()
-        # s = re.sub('[A-Z]+-[A-Z]+', '', s).strip()
-
-        # remove everything in a pair of parenthesis if it only contains upper-case characters
-        # "Master of Laws (MLLM)" -> "Master of Laws"
-        s = re.sub('\([A-Z]+\)', '', s).strip()
-        return s
+        return SPECIALISATION_NAME(s)
 
-    def fix_specialisation_req(self, spec: Specialisation, records: Dict[str, Specialisation]) -> Specialisation:
+    def fix_specialisation_req(self, spec: Specialisation, records: NameIndex) -> Specialisation:
         spec['name'] = self.fix_specialisation_name(spec['name'])
 
         # remap specialisation type
@@ -93,72 +81,61 @@ class SpiderProgram(SpiderANU):
             if spec['type'].lower() in SPEC_MAPPER:
                 spec['type'] = SPEC_MAPPER[spec['type'].lower()]
 
-        # find matching specialisation
-        for item in records.values():
-            if spec['name'].lower().replace(' ', '') == item['Name'].lower().replace(' ', '') and spec['type'] == item['SubplanType']:
-                spec['id'] = item['SubPlanCode']
-                return spec
-        for item in records.values():
-            if spec['name'].lower().replace(' ', '') == item['Name'].lower().replace(' ', ''):
-                spec['id'] = item['SubPlanCode']
-                return spec
+        # find matching specialisation, a near miss only for a specialisation without an id
+        id_ = records.get(spec['name'], spec.get('type'))
+        if not id_ and not spec.get('id'):
+            id_ = records.closest(spec['name'], spec.get('type'))
+        if id_:
+            spec['id'] = id_
         return spec
 
     def extract_specialisations(self, response: HtmlResponse) -> List[Specialisation]:
-        html = response.xpath(self.html_path).get()
-        soup = BeautifulSoup(html, 'html.parser')
+        body = html_tree.find(response, self.html_path)
         spec_headings = {'Majors', 'Minors', 'Specialisations'}
 
-        arr = []
-        for child in soup.children:
-            arr += child,
-
-        elements = arr[0].contents[::-1]
-        elements = [elem for elem in elements if type(elem) != NavigableString]
+        elements = [elem for elem in html_tree.contents(body) if not isinstance(elem, str)][::-1]
         specialisations = []
 
         while elements:
             elem = elements.pop()
-            if elem.name == 'h2' and elem.text in spec_headings:
+            if html_tree.tag(elem) == 'h2' and html_tree.text(elem) in spec_headings:
                 next_elem = elements.pop()
-                if next_elem.name == 'div' and 'body__inner__columns' in next_elem.attrs['class']:
-                    children = next_elem.find_all('a')
+                if html_tree.tag(next_elem) == 'div' and 'body__inner__columns' in next_elem.get('class', '').split():
+                    children = next_elem.iter('a')
                     for child in children:
-                        spec_name = child.text
+                        spec_name = html_tree.text(child)
                         if spec_name.endswith('Minor'):
                             spec_name = spec_name.replace('Minor', '').strip()
 
-                        _, spec_type, spec_id = child.attrs['href'].split('/')
+                        _, spec_type, spec_id = child.get('href').split('/')
                         spec_type = spec_type
 
                         spec = Specialisation()
                         spec['id'] = spec_id
                         spec['name'] = spec_name
                         spec['type'] = spec_type
-                        specialisations += self.fix_specialisation_req(spec, ALL_SPECIALISATIONS),
+                        specialisations += self.fix_specialisation_req(spec, SPECIALISATIONS),
         return specialisations
 
-    def convert_response_for_requirements_to_str(self, response: HtmlResponse) -> List[Tuple[str, int]]:
+    def convert_response_for_requirements_to_str(self, response: HtmlResponse) -> List[Tuple[str, int, Span]]:
         """
-        parse the response and extract requirements as a list of string and indentation level
+        parse the response and extract requirements as a list of string, indentation level and parsed text.
+        all text of the page goes through the nlp pipeline once, in a single nlp.pipe call for what is not cached
         """
-        html = response.xpath(self.html_path).get()
-        soup = BeautifulSoup(html, 'html.parser')
+        body = html_tree.find(response, self.html_path)
         req_headings = {'Program Requirements', 'Requirements', "Major Requirements", "Specialisation Requirements",
                         "Honours"}
 
-        arr = []
-        for child in soup.children:
-            arr += child,
-
-        elements = arr[0].contents
-        elements_with_padding = []
+        # (text, padding, whether to split the text into one line per class)
+        texts_with_padding = []
+        elements = html_tree.contents(body)
         for elem in elements:
-            if elem.name == 'h2' and elem.text not in req_headings:
+            name = html_tree.tag(elem)
+            if name == 'h2' and html_tree.text(elem) not in req_headings:
                 break
 
             try:
-                attributes = dict([prop.split(':') for prop in elem.attrs['style'].split(';') if prop])
+                attributes = dict([prop.split(':') for prop in elem.get('style').split(';') if prop])
                 if 'padding-left' in attributes:
                     padding = int(float(attributes['padding-left'].replace('px', '').replace('pt', '').strip()))
                 elif 'margin-left' in attributes:
@@ -168,41 +145,38 @@ class SpiderProgram(SpiderANU):
             except Exception:
                 padding = 0
 
-            if elem.name and elem.name == 'ul':
-                padding = elements_with_padding[-1][1] + 1
-                for c in elem.children:
-                    elements_with_padding += (c.text, padding),
-            elif elem.name and elem.name == 'table':
+            if name == 'ul':
+                padding = texts_with_padding[-1][1] + 1
+                for c in html_tree.contents(elem):
+                    texts_with_padding += (html_tree.text(c).replace('\u00a0', ' ').strip(), padding, False),
+            elif name == 'table':
                 classes = self.parse_table(elem)
                 for c in classes:
                     class_name = " ".join([s for s in c if len(s) > 2])
-                    elements_with_padding += (class_name, padding + 20),
+                    texts_with_padding += (class_name.replace('\u00a0', ' ').strip(), padding + 20, False),
             else:
-                txt = elem.text
-                p = re.compile(r"([A-Z]{4}[0-9]{4})")
-                txt = p.sub(r' \1 ', txt)
-                txt = txt.replace('\n', '').replace('\xa0', '').replace('  ', ' ').strip()
+                txt = REQUIREMENT_LINE(html_tree.text(elem))
                 if txt:
-                    doc = self.nlp(txt)
-                    classes = [ent.text for ent in doc.ents if ent.label_ == 'CLASS']
-                    if len(classes) > 1:
-                        s = ''
-                        for token in doc:
-                            if token.ent_type_ == 'CLASS':
-                                if s != '':
-                                    elements_with_padding += (s, padding),
-                                s = token.text
-                            else:
-                                s += ' ' + token.text
-                        if s != '':
-                            elements_with_padding += (s, padding),
-                            s = ''
-                    else:
-                        elements_with_padding += (txt, padding),
+                    texts_with_padding += (txt, padding, True),
 
-        def convert_padding_to_rank(elements: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+        docs = self.parse_cache.pipe([txt for txt, _, _ in texts_with_padding])
+        elements_with_padding = []
+        for (txt, padding, split), doc in zip(texts_with_padding, docs):
+            boundaries = [token.i for token in doc if token.ent_type_ == 'CLASS']
+            if split and len([ent for ent in doc.ents if ent.label_ == 'CLASS']) > 1:
+                # one line per class, from the class code up to the next one
+                if boundaries[0] > 0:
+                    boundaries.insert(0, 0)
+                for start, end in zip(boundaries, boundaries[1:] + [len(doc)]):
+                    span = doc[start:end]
+                    line = " ".join([token.text for token in span])
+                    elements_with_padding += (line.replace('\u00a0', ' ').strip(), padding, span),
+            else:
+                elements_with_padding += (txt, padding, doc[:]),
+
+        def convert_padding_to_rank(elements: List[Tuple[str, int, Span]]) -> List[Tuple[str, int, Span]]:
             # use OrderedDict to preserve order
-            counter = Counter([padding for line, padding in elements])
+            counter = Counter([padding for line, padding, _ in elements])
             val_to_freq = OrderedDict(sorted([list(item) for item in counter.items()]))
             rank = 0
             val_to_rank = {}
@@ -219,16 +193,12 @@ class SpiderProgram(SpiderANU):
 
             # convert padding / margin to rank and store in list
             ret = []
-            for line, padding in elements:
+            for line, padding, doc in elements:
                 if line != 'Program Requirements':
-                    line = line.replace('\u00a0', ' ').strip()
-                    ret += [line, val_to_rank[padding]],
+                    ret += [line, val_to_rank[padding], doc],
 
             # fix inconsistent indentations
-            is_class = [0] * len(ret)
-            for i in range(len(ret)):
-                doc = self.nlp(ret[i][0])
-                is_class[i] = any([ent for ent in doc.ents if ent.label_ == 'CLASS'])
+            is_class = [any([ent for ent in doc.ents if ent.label_ == 'CLASS']) for _, _, doc in ret]
 
             for i in range(len(ret) - 1):
                 if is_class[i] and is_class[i + 1] and ret[i][1] != ret[i + 1][1]:
@@ -237,30 +207,27 @@ class SpiderProgram(SpiderANU):
 
         return convert_padding_to_rank(elements_with_padding)
 
-    def parse_table(self, elem: NavigableString) -> List[List[str]]:
-        soup_table = BeautifulSoup(str(elem))
-
+    def parse_table(self, elem: etree._Element) -> List[List[str]]:
         data = []
-        table_body = soup_table.find('tbody')
-        rows = table_body.find_all('tr')
+        table_body = elem.find('.//tbody')
+        rows = table_body.iter('tr')
         for row in rows:
-            cols = row.find_all('td')
-            cols = [ele.text.strip() for ele in cols]
+            cols = row.iter('td')
+            cols = [html_tree.text(ele).strip() for ele in cols]
             data += [ele for ele in cols if ele],  # Get rid of empty values
         return data
 
     def group_requirements(
             self,
-            data: List[Tuple[Union[str, List[str]], int]],
+            data: List[Tuple[str, int, Span]],
             current_indent_level: int = 0,
             is_specialisation: bool = False,
             specialisation_type: str = None
     ) -> List[Union[Course, Specialisation, Requirement]]:
         requirements = []
         while data:
-            line, indent = data.pop()
+            line, indent, doc = data.pop()
             lowercase_line = line.lower()
-            doc = self.nlp(line)
             classes = [ent.text for ent in doc.ents if ent.label_ == 'CLASS']
 
             # check if line is a description like "xx units from completion of classes from the following list"
@@ -274,7 +241,6 @@ class SpiderProgram(SpiderANU):
                 req = Requirement()
                 req['description'] = line
                 req['units'] = int(m.group(0).split()[0])
-                req['items'] = self.group_requirements(children[::-1], current_indent_level + 1)
 
                 if 'major' in lowercase_line and 'minor' not in lowercase_line:
                     req['items'] = self.group_requirements(children[::-1], current_indent_level + 1, True, 'MAJ')
@@ -283,6 +249,7 @@ class SpiderProgram(SpiderANU):
                 elif 'specialisation' in line:
                     req['items'] = self.group_requirements(children[::-1], current_indent_level + 1, True, 'SPC')
                 else:
+                    req['items'] = self.group_requirements(children[::-1], current_indent_level + 1)
                     # sometimes there will be lines like "6 units from completion of COMPxxxx"
                     if classes and not req['items']:
                         req['items'] = classes
@@ -343,7 +310,7 @@ class SpiderProgram(SpiderANU):
                         item['id'] = matched_record['SubPlanCode']
                         item['name'] = matched_record['Name']
                         item['type'] = matched_record['SubplanType']
-                        requirements += self.fix_specialisation_req(item, ALL_SPECIALISATIONS),
+                        requirements += self.fix_specialisation_req(item, SPECIALISATIONS),
                     else:
                         if 'major' in lowercase_line:
                             item['type'] = 'MAJ'
@@ -353,9 +320,9 @@ class SpiderProgram(SpiderANU):
                             item['type'] = 'SPC'
 
                         item['name'] = line.strip()
-                        requirements += self.fix_specialisation_req(item, ALL_SPECIALISATIONS),
+                        requirements += self.fix_specialisation_req(item, SPECIALISATIONS),
                 else:
-                    if 'Either' in doc.vocab and any([line.replace(":", "") == 'Or' for line, padding in data]):
+                    if 'Either' in doc.vocab and any([line.replace(":", "") == 'Or' for line, padding, _ in data]):
                         item = Requirement()
                         item['description'] = line
                         item['items'] = []
@@ -383,7 +350,7 @@ class SpiderProgram(SpiderANU):
                         item = Specialisation()
                         item['name'] = line.strip()
                         item['type'] = specialisation_type
-                        requirements += self.fix_specialisation_req(item, ALL_SPECIALISATIONS),
+                        requirements += self.fix_specialisation_req(item, SPECIALISATIONS),
                     # else:
                     #     item = Requirement()
                     #     item['description'] = line
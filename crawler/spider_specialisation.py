@@ -1,7 +1,6 @@
 import os
 import json
 
-import scrapy
 from scrapy.http.response.html import HtmlResponse
 
 from models import SpecialisationPage
@@ -24,8 +23,8 @@ class SpiderSpecialisation(SpiderProgram):
                     all_items[item[self.id_attribute_name]] = specialisation_type
         for key in sorted(all_items.keys()):
             specialisation_type = all_items[key]
-            url = f"https://{self.DOMAIN}/{specialisation_type}/{key}"
-            yield scrapy.Request(url, self.parse)
+            url = f"{self.site_url}/{specialisation_type}/{key}"
+            yield self.page_request(url, self.parse)
 
     def parse(self, response: HtmlResponse, **kwargs):
         if "Error" in response.url:
@@ -0,0 +1,130 @@
+import re
+from typing import Callable, Iterable, List, Sequence, Tuple, Union
+
+# joins the texts of a batch, no rule matches across it
+SEPARATOR = '\x00'
+
+Replacement = Union[str, Callable[[str], str]]
+
+
+class Rules:
+    """
+    Regex rules applied in one scan of the text: the patterns are compiled into one alternation,
+    tried in order at each position, and each match is replaced by its rule's string or
+    by what its function returns for the matched text.
+
+    One scan equals running the rules one after another only if no rule can match inside,
+    across or because of another rule's match, so only rules that are independent that way are put together.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, Replacement]]):
+        self.replacements = {f'r{i}': replacement for i, (_, replacement) in enumerate(rules)}
+        self.regex = re.compile('|'.join(f'(?P<r{i}>{pattern})' for i, (pattern, _) in enumerate(rules)))
+
+    def _replace(self, match: re.Match) -> str:
+        replacement = self.replacements[match.lastgroup]
+        return replacement if isinstance(replacement, str) else replacement(match.group())
+
+    def __call__(self, s: str) -> str:
+        return self.regex.sub(self._replace, s)
+
+
+class Replace:
+    """literal replacements, one str.replace after another"""
+
+    def __init__(self, replacements: Sequence[Tuple[str, str]]):
+        self.replacements = replacements
+
+    def __call__(self, s: str) -> str:
+        for old, new in self.replacements:
+            s = s.replace(old, new)
+        return s
+
+
+class Normaliser:
+    """
+    Passes run in order over a text, each one Rules, Replace or any function of the text.
+    batch() normalises a list of texts, running each Rules and Replace pass once over all of them
+    joined together, and the function passes per distinct text.
+    """
+
+    def __init__(self, *passes: Callable[[str], str], strip: bool = False):
+        self.passes = passes
+        self.strip = strip
+
+    def __call__(self, s: str) -> str:
+        for normalise in self.passes:
+            s = normalise(s)
+        return s.strip() if self.strip else s
+
+    def batch(self, texts: Iterable[str]) -> List[str]:
+        texts = list(texts)
+        distinct = list(dict.fromkeys(texts))
+        if any(SEPARATOR in text for text in distinct):
+            normalised = [self(text) for text in distinct]
+        else:
+            normalised = distinct
+            joined = None
+            for normalise in self.passes:
+                if isinstance(normalise, (Rules, Replace)):
+                    joined = normalise(SEPARATOR.join(normalised) if joined is None else joined)
+                else:
+                    if joined is not None:
+                        normalised, joined = joined.split(SEPARATOR), None
+                    normalised = [normalise(text) for text in normalised]
+            if joined is not None:
+                normalised = joined.split(SEPARATOR)
+            if self.strip:
+                normalised = [text.strip() for text in normalised]
+        by_text = dict(zip(distinct, normalised))
+        return [by_text[text] for text in texts]
+
+
+def _strip_type_suffix(s: str) -> str:
+    # rstrip strips characters, not the suffix: "Asian Studies Major" -> "Asian Studies", "Economics Minor" -> "Economics"
+    for keyword in ['Minor', 'minor', 'Major', 'major', 'Specialisation', 'specialisation']:
+        if s.endswith(keyword):
+            s = s.rstrip(keyword).strip()
+    return s
+
+
+# requisite text of a course page, before it is parsed
+REQUISITES = Normaliser(
+    Rules([
+        ('R&D', 'Research and Development'),
+        # if class code is not followed by a space, insert space
+        ('[A-Z]{4}[0-9]{4}[a-z]+', lambda s: f'{s[:8]} {s[8:]}'),
+        # remove everything in a pair of parenthesis if it only contains upper-case characters
+        # "Master of Laws (MLLM)" -> "Master of Laws"
+        (r'\([A-Z]+\)', ''),
+        ('&', 'and'),
+    ]),
+    # apply parenthesis to Advanced / Honours, if it doesn't come after "of"
+    Replace([(' Advanced ', ' (Advanced) '), (' Honours ', ' (Honours) '), ('of (Advanced)', 'of Advanced')]),
+    Rules([
+        # insert space if parenthesis and word are not space-separated
+        (r'(?<=[A-Za-z])(?=\()', ' '),
+        # remove empty parenthesis, also those only made empty by stripping the inner gap
+        (r'\(\s*\)', ''),
+        # strip inner gap between parenthesis and character
+        (r'\(\s+', '('),
+        (r'\s+\)', ')'),
+    ]),
+    Rules([(r'\s+', ' ')]),
+)
+
+# a line of a program's requirements: class codes padded with spaces, line breaks and nbsp dropped
+REQUIREMENT_LINE = Normaliser(
+    Rules([('[A-Z]{4}[0-9]{4}', lambda code: f' {code} '), ('[\n\xa0]', '')]),
+    Replace([('  ', ' ')]),
+    strip=True,
+)
+
+# name of a major, minor or specialisation as a program page lists it
+SPECIALISATION_NAME = Normaliser(
+    _strip_type_suffix,
+    Rules([('[A-Z]{3,5}-[A-Z]{3,4}', '')]),
+    str.strip,
+    Rules([(r'\([A-Z]+\)', '')]),
+    str.strip,
+)
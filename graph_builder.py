@@ -1,20 +1,26 @@
+import argparse
 import hashlib
 import json
 import os
-from collections import defaultdict
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
-from py2neo import Graph, Node, Relationship, Subgraph
-from typing import Dict, List
+from py2neo import Graph, Relationship
+from typing import Callable, Dict, List, Tuple
 
-from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from graph_export import CsvExportGraph
+from graph_sinks import BatchedGraph, GraphSink, InMemoryGraph, Neo4jGraph, NodeKey, NullGraph
+from graph_sqlite import SqliteGraph
+from graph_stats import LoadStats
+from graph_sync import build_manifest, delta_size, diff_manifests, load_manifest, node_properties, save_manifest
 
-CLASSES = defaultdict(lambda: Node('Course'))
-PROGRAMS = defaultdict(lambda: Node('Program'))
-SPECIAL = defaultdict(lambda: Node('Specialisation'))
+# id -> NodeKey of every node written or known to exist, used to resolve which label an id belongs to
+CLASSES = {}
+PROGRAMS = {}
+SPECIAL = {}
+REQUIREMENTS = set()  # ids of requirement subtrees already written in this run
 
-NOT_FOUND = []
-UNMERGED_EDGES = []
-MERGED_EDGES = []
+STATS = LoadStats()
 
 
 class PREREQUISITE(Relationship):
@@ -47,35 +53,24 @@ CONDITION_MAPPER = {
 }
 
 
-def update_node(node: Node, doc: Dict) -> Node:
-    for key in doc.keys():
-        if doc[key]:
-            if type(doc[key]) != list and type(doc[key]) != dict:
-                node[key] = doc[key]
-    return node
-
-
-def upsert_node(node: Node, doc: Dict, G: Graph, label: str, key: str) -> Node:
-    node = update_node(node, doc)
+def upsert_node(doc: Dict, G: GraphSink, label: str) -> NodeKey:
+    props = node_properties(doc)
     try:
-        G.merge(node, label, key)
-    except:
-        if 'id' in doc:
-            ret = G.nodes.match(label, id=doc['id'])
-            if len(ret) == 0:
-                G.create(ret)
-        else:
-            G.create(node)
-    return node
+        G.merge_node(label, props)
+        if not G.buffered:
+            STATS.node(label)
+    except Exception as e:
+        STATS.failure(label, props, repr(e))
+    return label, props['id']
 
 
-def create_node_if_not_exists(cache: defaultdict, doc: Dict, G: Graph, key: str, label: str) -> Node:
-    dest_node = cache[key]
-    dest_node = upsert_node(dest_node, doc, G, label, 'id')
-    return dest_node
+def create_node_if_not_exists(cache: Dict[str, NodeKey], doc: Dict, G: GraphSink, key: str, label: str) -> NodeKey:
+    # referenced entities such as program names in requisites carry no id of their own
+    cache[key] = upsert_node(dict(doc, id=key), G, label)
+    return cache[key]
 
 
-def create_edge(edge: Relationship, doc: Dict, G: Graph, label: str = None) -> Relationship:
+def create_edge(edge_type: type, start: NodeKey, end: NodeKey, doc: Dict, G: GraphSink) -> NodeKey:
     """
     program -- Req -> req
     req -- Req -> req
@@ -84,36 +79,25 @@ def create_edge(edge: Relationship, doc: Dict, G: Graph, label: str = None) -> R
     req -- Req -> class
     class -> class
     """
+    props = {}
     if doc:
-        if 'condition' in doc:
-            edge['condition'] = doc['condition']
-        if 'description' in doc:
-            edge['description'] = doc['description']
-        if 'negation' in doc:
-            edge['negation'] = doc['negation']
-
-    if label == 'Requirement':
-        labels = list(edge.end_node.labels)
-        label = labels[0]
-
-    if not label:
-        labels = list(edge.start_node.labels)
-        label = labels[0]
-
-    global UNMERGED_EDGES
-    global MERGED_EDGES
+        for key in ('condition', 'description', 'negation'):
+            if key in doc:
+                props[key] = doc[key]
+
+    rel_type = edge_type.__name__
     try:
-        G.merge(edge, label, 'id')
-        MERGED_EDGES += (edge, label),
+        G.merge_edge(rel_type, start, end, props)
+        if not G.buffered:
+            STATS.edge(rel_type)
     except Exception as e:
-        UNMERGED_EDGES += (edge, label),
-
-    return edge
+        STATS.failure(rel_type, {'start': start, 'end': end, 'props': props}, repr(e))
+    return end
 
 
 def create_nodes_and_edges_if_class_requisite(
-        doc: Dict, parent_node: Node, G: Graph, op: str = 'and'
-) -> List[Relationship]:
+        doc: Dict, parent_node: NodeKey, G: GraphSink, op: str = 'and'
+) -> List[NodeKey]:
     items = []
 
     if doc:
@@ -126,99 +110,305 @@ def create_nodes_and_edges_if_class_requisite(
             if 'programs' in doc:
                 for program_name in doc['programs']:
                     dest_node = create_node_if_not_exists(PROGRAMS, doc, G, program_name, 'Program')
-                    items += create_edge(EDGE_FACTORY(parent_node, dest_node), doc, G, 'Program'),
+                    items += create_edge(EDGE_FACTORY, parent_node, dest_node, doc, G),
             if 'classes' in doc:
                 for class_name in doc['classes']:
                     dest_node = create_node_if_not_exists(CLASSES, doc, G, class_name, 'Course')
-                    items += create_edge(EDGE_FACTORY(parent_node, dest_node), doc, G, 'Course'),
+                    items += create_edge(EDGE_FACTORY, parent_node, dest_node, doc, G),
             # DISREGARD class requisites that are not referring to classes
             # if not doc['programs'] and not doc['classes'] and doc['description']:
             #     items += create_requirement_node(doc, parent_node, G),
     return items
 
 
-def create_requirement_node(doc: Dict, parent_node: Node, G: Graph) -> Relationship:
-    req_node = Node("Requirement")
-    # doc['id'] = get_id_from_string(doc['description'].encode('utf-8'))
-    doc['id'] = str(id(doc))
-    req_node = update_node(req_node, doc)
-    G.create(req_node)
+def canonical_requirement(doc):
+    """requirement subtree without the ids assigned to requirement nodes"""
+    if type(doc) == list:
+        return [canonical_requirement(item) for item in doc]
+    if type(doc) == dict:
+        return {
+            key: canonical_requirement(val) for key, val in doc.items()
+            if not (key == 'id' and doc.get('description'))
+        }
+    return doc
 
-    labels = list(parent_node.labels)
-    if 'Program' in labels:
-        label = 'Program'
-    elif 'Specialisation' in labels:
-        label = 'Specialisation'
-    else:
-        label = 'Course'
-    return create_edge(REQUIREMENT(parent_node, req_node), doc, G, label)
+
+def requirement_id(doc: Dict) -> str:
+    """content-addressed id, identical requirement subtrees get the same id"""
+    s = json.dumps(canonical_requirement(doc), sort_keys=True, ensure_ascii=False)
+    return get_id_from_string(s)
+
+
+def create_requirement_node(doc: Dict, parent_node: NodeKey, G: GraphSink) -> NodeKey:
+    # the id goes on the node only, the document stays as it was loaded so manifests hash the same either way
+    req_node = upsert_node(dict(doc, id=requirement_id(doc)), G, 'Requirement')
+    return create_edge(REQUIREMENT, parent_node, req_node, doc, G)
 
 
-def create_nodes_and_edges_if_program(doc: Dict, parent_node: Node, G: Graph, op: str = 'and') -> List[Relationship]:
+def create_nodes_and_edges_if_program(doc: Dict, parent_node: NodeKey, G: GraphSink, op: str = 'and') -> List[NodeKey]:
     """create edges if document is a program or specialisation / major / minor"""
     # create new requirement node and connect to parent
-    global NOT_FOUND
     items = []
 
     if not doc:
         return items
 
     if 'description' in doc and doc['description']:
-        edge = create_requirement_node(doc, parent_node, G)
-        items += edge,
+        req_node = create_requirement_node(doc, parent_node, G)
+        items += req_node,
 
-        if 'items' in doc:
+        # a shared subtree only needs its children written once
+        _, req_id = req_node
+        if 'items' in doc and req_id not in REQUIREMENTS:
+            REQUIREMENTS.add(req_id)
             # create each child node and edges
             for child in doc['items']:
-                items.extend(create_nodes_and_edges_if_program(child, edge.end_node, G, op))
+                items.extend(create_nodes_and_edges_if_program(child, req_node, G, op))
     elif 'id' in doc and doc['id']:
         if doc['id'] in PROGRAMS:
-            label = 'Program'
-            dest_node = create_node_if_not_exists(PROGRAMS, doc, G, doc['id'], label)
+            dest_node = create_node_if_not_exists(PROGRAMS, doc, G, doc['id'], 'Program')
         elif doc['id'] in SPECIAL:
-            label = 'Specialisation'
-            dest_node = create_node_if_not_exists(SPECIAL, doc, G, doc['id'], label)
+            dest_node = create_node_if_not_exists(SPECIAL, doc, G, doc['id'], 'Specialisation')
         else:
-            label = 'Course'
-            dest_node = create_node_if_not_exists(CLASSES, doc, G, doc['id'], label)
-        items += create_edge(REQUIREMENT(parent_node, dest_node), doc, G, label),
+            dest_node = create_node_if_not_exists(CLASSES, doc, G, doc['id'], 'Course')
+        items += create_edge(REQUIREMENT, parent_node, dest_node, doc, G),
     elif type(doc) == list:
         for child in doc:
             items.extend(create_nodes_and_edges_if_program(child, parent_node, G, op))
     else:
-        NOT_FOUND += doc,
+        STATS.missing(doc)
     return items
 
 
-def get_id_from_string(s: str) -> str:
-    m = hashlib.md5()
-    m.update(s)
-    return str(int(m.hexdigest(), 16))[0:12]
+def create_edges_for_doc(doc: Dict, label: str, G: GraphSink):
+    """requisite edges of a course, or the requirement tree of a program / specialisation"""
+    if label == 'Course':
+        if 'prerequisites' in doc:
+            create_nodes_and_edges_if_class_requisite(doc['prerequisites'], CLASSES[doc['id']], G)
+    else:
+        src_node = PROGRAMS[doc['id']] if label == 'Program' else SPECIAL[doc['id']]
+        for requirement in doc['requirements']:
+            create_nodes_and_edges_if_program(requirement, src_node, G)
 
 
-def main():
-    G = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+def seed_caches(api_path: str = 'data/from_api'):
+    """
+    register every id the spiders will crawl, from the search API listings, so references to
+    pages that are not loaded yet still resolve to the right label
+    """
+    sources = [(api_path, 'CourseCode', 'Course', CLASSES),
+               (os.path.join(api_path, 'programs'), 'AcademicPlanCode', 'Program', PROGRAMS),
+               (os.path.join(api_path, 'specialisations'), 'SubPlanCode', 'Specialisation', SPECIAL)]
+    for path, id_attribute_name, label, cache in sources:
+        for file in os.listdir(path):
+            if file.endswith('json'):
+                with open(os.path.join(path, file)) as f:
+                    for item in json.load(f)['Items']:
+                        cache.setdefault(item[id_attribute_name], (label, item[id_attribute_name]))
+
+
+def referenced_ids(doc) -> List[str]:
+    """ids of the courses / programs / specialisations referenced in a requirement tree"""
+    if type(doc) == list:
+        return [key for item in doc for key in referenced_ids(item)]
+    if type(doc) == dict:
+        if doc.get('description'):
+            return referenced_ids(doc.get('items', []))
+        if doc.get('id'):
+            return [doc['id']]
+    return []
+
+
+def requisite_ids(doc) -> List[str]:
+    """class codes and program names in the requisite tree of a course"""
+    if not doc:
+        return []
+    if 'operator' in doc and type(doc['operator']) == dict:
+        return [key for requirements in doc['operator'].values() for requirement in requirements
+                for key in requisite_ids(requirement)]
+    return list(doc.get('programs') or []) + list(doc.get('classes') or [])
 
-    G.delete_all()
 
-    with open("data/scraped/classes.json") as f:
-        classes = json.load(f)
+def owner_references(doc: Dict, label: str) -> List[str]:
+    """what the edges of a course, program or specialisation point at"""
+    if label == 'Course':
+        return requisite_ids(doc.get('prerequisites'))
+    return referenced_ids(doc.get('requirements', []))
 
-    with open("data/scraped/programs.json") as f:
-        programs = json.load(f)
 
-    with open("data/scraped/specialisations.json") as f:
-        special = json.load(f)
+def touched_ids(delta: Dict) -> set:
+    """ids of the nodes added or removed since the manifest"""
+    return {key for changes in delta['nodes'].values() for key in changes['added'] + changes['removed']}
 
-    print(f"classes: {len(classes)}, programs: {len(programs)}, special: {len(special)}")
 
-    try:
-        G.schema.create_uniqueness_constraint('Course', 'id')
-        G.schema.create_uniqueness_constraint('Program', 'id')
-        G.schema.create_uniqueness_constraint('Specialisation', 'id')
-    except Exception as e:
-        pass
+def stale_owners(delta: Dict, sources: Dict[str, List[Dict]]) -> Dict[str, List[str]]:
+    """
+    owners with an unchanged subtree that references a node added or removed since the manifest:
+    their edges were resolved against the old set of nodes (or went with a deleted node) and are rebuilt too
+    """
+    touched = touched_ids(delta)
+    stale = {}
+    for label, docs in sources.items():
+        changes = delta['subtrees'].get(label, {})
+        rebuilt = set(changes.get('added', []) + changes.get('changed', []))
+        stale[label] = sorted(doc['id'] for doc in docs
+                              if doc['id'] not in rebuilt and touched.intersection(owner_references(doc, label)))
+    return stale
+
+
+def create_edges_parallel(
+        docs: List[Dict], label: str, connect: Callable[[], Graph], workers: int, batch_size: int
+) -> Tuple[int, float]:
+    """
+    split docs across workers, each loading its share through its own session and BatchedGraph.
+    the nodes must already exist. returns rows written and elapsed seconds
+    """
+    def work(partition: List[Dict]) -> int:
+        G = BatchedGraph(connect(), batch_size, stats=STATS)
+        for doc in partition:
+            create_edges_for_doc(doc, label, G)
+        G.flush()
+        return sum(G.written.values())
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        rows = sum(pool.map(work, [docs[i::workers] for i in range(workers)]))
+    return rows, time.perf_counter() - start
+
+
+def delete_subtrees(G: Neo4jGraph, label: str, ids: List[str]):
+    """
+    remove the requisite edges of courses, or the requirement edges hanging off programs / specialisations.
+    requirement nodes can be shared between owners, see delete_orphan_requirements
+    """
+    if not ids:
+        return
+    if label == 'Course':
+        rel_types = '|'.join(sorted({edge_type.__name__ for edge_type in CONDITION_MAPPER.values()}))
+    else:
+        rel_types = 'REQUIREMENT'
+    G.run(f"""
+        UNWIND $ids AS id
+        MATCH (n:`{label}` {{id: id}})-[r:{rel_types}]->()
+        DELETE r
+    """, ids=ids)
 
+
+def delete_edges_to(G: Neo4jGraph, ids: List[str]):
+    """
+    the requirement edges into these ids, whatever label they were resolved to. requirement nodes keep
+    their id when only what they reference changed, the rebuild merges their edges again
+    """
+    if not ids:
+        return
+    G.run("""
+        UNWIND $ids AS id
+        MATCH (:Requirement)-[r:REQUIREMENT]->(n {id: id})
+        DELETE r
+    """, ids=ids)
+
+
+def delete_orphan_requirements(G: Neo4jGraph) -> int:
+    """delete requirement nodes nothing points to any more, level by level down the trees"""
+    total = 0
+    while True:
+        deleted = G.run("""
+            MATCH (req:Requirement)
+            WHERE NOT ()-[:REQUIREMENT]->(req)
+            DETACH DELETE req
+            RETURN count(req)
+        """).evaluate()
+        if not deleted:
+            return total
+        total += deleted
+
+
+def delete_orphan_placeholders(G: Neo4jGraph, manifest: Dict) -> int:
+    """
+    delete the nodes created for references to pages that are not loaded, once nothing points to them
+    any more, as a full load would not create them
+    """
+    total = 0
+    for label, ids in manifest['nodes'].items():
+        total += G.run(f"""
+            MATCH (n:`{label}`)
+            WHERE NOT n.id IN $ids AND NOT ()-->(n)
+            DETACH DELETE n
+            RETURN count(n)
+        """, ids=list(ids)).evaluate() or 0
+    return total
+
+
+def sync_graph(G: BatchedGraph, classes: List[Dict], programs: List[Dict], special: List[Dict], manifest_path: str):
+    """
+    apply only what changed since the manifest at manifest_path was written:
+    deleted documents are removed, changed nodes are overwritten and changed requirement subtrees are rebuilt,
+    as are the subtrees that reference an added or removed node (see stale_owners)
+    """
+    docs = {'classes': classes, 'programs': programs, 'special': special}
+    new_manifest = build_manifest(docs)
+    delta = diff_manifests(load_manifest(manifest_path), new_manifest)
+    print('Changes:', {kind: {label: {k: len(v) for k, v in changes.items()} for label, changes in labels.items()}
+                       for kind, labels in delta.items()})
+
+    caches = {'Course': CLASSES, 'Program': PROGRAMS, 'Specialisation': SPECIAL}
+    sources = {'Course': classes, 'Program': programs, 'Specialisation': special}
+    stale = stale_owners(delta, sources)
+    print('Owners referencing added / removed nodes:', {label: len(ids) for label, ids in stale.items()})
+
+    for label, changes in delta['subtrees'].items():
+        delete_subtrees(G, label, changes['changed'] + changes['removed'] + stale.get(label, []))
+    delete_edges_to(G, sorted(touched_ids(delta)))
+    for label, changes in delta['nodes'].items():
+        if changes['removed']:
+            G.run(f"""
+                UNWIND $ids AS id
+                MATCH (n:`{label}` {{id: id}})
+                DETACH DELETE n
+            """, ids=changes['removed'])
+        if changes['changed'] or changes['added']:
+            # drop properties that disappeared from the document, or that a placeholder for an added one had,
+            # the new ones are merged below
+            G.run(f"""
+                UNWIND $ids AS id
+                MATCH (n:`{label}` {{id: id}})
+                SET n = {{id: id}}
+            """, ids=changes['changed'] + changes['added'])
+
+    # every node has to be in the caches for the traversal to resolve labels, only new / changed ones are written
+    for label, docs_for_label in sources.items():
+        changes = delta['nodes'][label]
+        written = set(changes['added'] + changes['changed'])
+        for doc in docs_for_label:
+            if doc['id'] in written:
+                create_node_if_not_exists(caches[label], doc, G, doc['id'], label)
+            else:
+                caches[label][doc['id']] = (label, doc['id'])
+    G.report('nodes')
+
+    for label, docs_for_label in sources.items():
+        changes = delta['subtrees'][label]
+        rebuild = set(changes['added'] + changes['changed'] + stale[label])
+        for doc in docs_for_label:
+            if doc['id'] in rebuild:
+                create_edges_for_doc(doc, label, G)
+        G.report(f'{label} subtrees')
+
+    print('Deleted orphaned requirements:', delete_orphan_requirements(G))
+    print('Deleted orphaned placeholders:', delete_orphan_placeholders(G, new_manifest))
+    save_manifest(new_manifest, manifest_path)
+    print('Synced entities:', delta_size(delta) + sum(len(ids) for ids in stale.values()))
+
+
+def get_id_from_string(s: str) -> str:
+    m = hashlib.md5()
+    m.update(s.encode('utf-8'))
+    return str(int(m.hexdigest(), 16))[0:16]
+
+
+def build_graph(G: GraphSink, classes: List[Dict], programs: List[Dict], special: List[Dict],
+                workers: int = 1, connect: Callable[[], Graph] = None):
+    """full load of all nodes, then the edges of every course, program and specialisation into G"""
     ####### create nodes #######
     for doc in classes:
         create_node_if_not_exists(CLASSES, doc, G, doc['id'], 'Course')
@@ -231,48 +421,116 @@ def main():
     for doc in special:
         create_node_if_not_exists(SPECIAL, doc, G, doc['id'], 'Specialisation')
     print('specialisations:', len(SPECIAL))
-
-    print('Nodes:', G.run("""
-        MATCH (n)
-        RETURN count(n)
-    """))
+    G.report('nodes')
 
     ####### create edges #######
-    for doc in classes:
-        if 'prerequisites' in doc:
-            create_nodes_and_edges_if_class_requisite(doc['prerequisites'], CLASSES[doc['id']], G)
-        # if 'co_taught' in doc:
-        #     if type(doc['co_taught']) == list:
-        #         for item in doc['co_taught']:
-        #             edge = Cotaught(CLASSES[doc['id']], CLASSES[item])
-        #             edge['id'] = CLASSES[doc['id']] + CLASSES[item]
-        #             create_edge(edge, None, G, 'class')
-        #     else:
-        #         edge = Cotaught(CLASSES[doc['id']], CLASSES[doc['co_taught']])
-        #         edge['id'] = CLASSES[doc['id']] + CLASSES[doc['co_taught']]
-        #         create_edge(edge, None, G, 'class')
-    print('Completed merging edges for classes')
+    # if 'co_taught' in doc:
+    #     if type(doc['co_taught']) == list:
+    #         for item in doc['co_taught']:
+    #             edge = Cotaught(CLASSES[doc['id']], CLASSES[item])
+    #             edge['id'] = CLASSES[doc['id']] + CLASSES[item]
+    #             create_edge(edge, None, G, 'class')
+    #     else:
+    #         edge = Cotaught(CLASSES[doc['id']], CLASSES[doc['co_taught']])
+    #         edge['id'] = CLASSES[doc['id']] + CLASSES[doc['co_taught']]
+    #         create_edge(edge, None, G, 'class')
+    for docs, label, phase in [(classes, 'Course', 'class edges'),
+                               (programs, 'Program', 'program edges'),
+                               (special, 'Specialisation', 'specialisation edges')]:
+        if workers > 1:
+            rows, secs = create_edges_parallel(docs, label, connect, workers, G.batch_size)
+            print(f'{phase}: {rows} rows in {secs:.2f}s ({rows / max(secs, 1e-9):.0f} rows/sec, {workers} workers)')
+        else:
+            for doc in docs:
+                create_edges_for_doc(doc, label, G)
+            G.report(phase)
+        print(f'Completed merging {phase}')
+    G.close()
 
-    for doc in programs:
-        src_node = PROGRAMS[doc['id']]
-        for requirement in doc['requirements']:
-            create_nodes_and_edges_if_program(requirement, src_node, G)
-    print('Completed merging edges for programs')
 
-    for doc in special:
-        src_node = SPECIAL[doc['id']]
-        for requirement in doc['requirements']:
-            create_nodes_and_edges_if_program(requirement, src_node, G)
-    print('Completed merging edges for specialisations')
+def main():
+    parser = argparse.ArgumentParser(description='Build the ANU programs and courses graph in Neo4j')
+    parser.add_argument('--sink', choices=['neo4j', 'memory', 'null'], default='neo4j',
+                        help='memory and null run the traversal without a database (default: %(default)s)')
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help='write nodes and edges in UNWIND batches of this many rows (default: one merge per entity)')
+    parser.add_argument('--export-csv', metavar='DIR',
+                        help='write neo4j-admin import CSVs to DIR instead of loading into Neo4j')
+    parser.add_argument('--sqlite', metavar='FILE',
+                        help='write the graph into a SQLite database instead of Neo4j, see graph_sqlite.py for queries')
+    parser.add_argument('--sync', action='store_true',
+                        help='only apply changes since the last load recorded in the manifest: changed nodes and '
+                             'requirement subtrees, and the subtrees of owners that reference an added or removed '
+                             'node. falls back to a full rebuild when there is no manifest')
+    parser.add_argument('--manifest', default='data/graph_manifest.json',
+                        help='content hashes of the last loaded state (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='load edges with this many parallel sessions, implies batched writes')
+    parser.add_argument('--failure-log', default=STATS.failure_log,
+                        help='JSON lines log of items that failed to load (default: %(default)s)')
+    args = parser.parse_args()
+    STATS.failure_log = args.failure_log
+
+    with open("data/scraped/classes.json") as f:
+        classes = json.load(f)
+
+    with open("data/scraped/programs.json") as f:
+        programs = json.load(f)
+
+    with open("data/scraped/specialisations.json") as f:
+        special = json.load(f)
+
+    print(f"classes: {len(classes)}, programs: {len(programs)}, special: {len(special)}")
+
+    connect = None
+    if args.export_csv:
+        G = CsvExportGraph(args.export_csv)
+    elif args.sqlite:
+        G = SqliteGraph(args.sqlite, args.batch_size or 5000)
+    elif args.sink == 'memory':
+        G = InMemoryGraph()
+    elif args.sink == 'null':
+        G = NullGraph()
+    else:
+        from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+        def connect() -> Graph:
+            return Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+
+        G = connect()
+
+        if args.sync and load_manifest(args.manifest):
+            G = BatchedGraph(G, args.batch_size or 5000, stats=STATS)
+            sync_graph(G, classes, programs, special, args.manifest)
+            STATS.report()
+            return
+
+        G.delete_all()
+
+        try:
+            G.schema.create_uniqueness_constraint('Course', 'id')
+            G.schema.create_uniqueness_constraint('Program', 'id')
+            G.schema.create_uniqueness_constraint('Specialisation', 'id')
+            G.schema.create_uniqueness_constraint('Requirement', 'id')
+        except Exception as e:
+            pass
+
+        if args.batch_size > 0 or args.workers > 1:
+            G = BatchedGraph(G, args.batch_size or 5000, stats=STATS)
+        else:
+            G = Neo4jGraph(G)
+
+    # hashed before the load, from the documents as they were read
+    manifest = build_manifest({'classes': classes, 'programs': programs, 'special': special})
+    start = time.perf_counter()
+    build_graph(G, classes, programs, special, args.workers if connect else 1, connect)
+    print(f'Loaded in {time.perf_counter() - start:.2f}s:', G.summary())
 
-    print('Edges', G.run("""
-        MATCH ()-[r]-()
-        RETURN count(r)
-    """))
+    if isinstance(G, CsvExportGraph):
+        print(G.import_command())
+    elif isinstance(G, (Neo4jGraph, BatchedGraph)):
+        save_manifest(manifest, args.manifest)
 
-    print('Failed to merge edges:', len(UNMERGED_EDGES))
-    print('Merged edges:', len(MERGED_EDGES))
-    print('Not found:', len(NOT_FOUND))
+    STATS.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+import csv
+import os
+from typing import Dict, List
+
+from graph_sinks import GraphSink, NodeKey
+
+# property columns written for each node label, with neo4j-admin type suffix where not a string
+NODE_COLUMNS = {
+    'Course': ['name', 'subject_code', 'course_number', 'units:int', 'description', 'prerequisites_raw', 'subject',
+               'college', 'offered_by', 'academic_career', 'co_taught', 'course_convener'],
+    'Program': ['name', 'units:int'],
+    'Specialisation': ['name', 'type', 'units:int'],
+    'Requirement': ['description', 'units:int'],
+}
+
+EDGE_COLUMNS = ['condition', 'description', 'negation:boolean']
+
+
+def _column_name(column: str) -> str:
+    return column.split(':')[0]
+
+
+class CsvExportGraph(GraphSink):
+    """
+    Streams every merged node and edge into CSV files
+    for `neo4j-admin database import full` instead of writing to a database.
+
+    One file per node label (nodes_<Label>.csv) and one per relationship type and
+    end point labels (edges_<TYPE>_<Start>_<End>.csv), each with its own header row.
+    Ids are scoped per label with neo4j-admin id spaces. A node is written the first
+    time it is seen, so the import gets the properties from the node's own document.
+    """
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        self.files = {}
+        self.writers = {}
+        self.node_ids = set()
+        self.edge_ids = set()
+        self.counts = {}
+
+    def _writer(self, filename: str, header: List[str]):
+        if filename not in self.writers:
+            f = open(os.path.join(self.out_dir, filename), 'w', newline='')
+            self.files[filename] = f
+            self.writers[filename] = csv.writer(f)
+            self.writers[filename].writerow(header)
+            self.counts[filename] = 0
+        self.counts[filename] += 1
+        return self.writers[filename]
+
+    def merge_node(self, label: str, props: Dict):
+        if (label, props['id']) in self.node_ids:
+            return
+        self.node_ids.add((label, props['id']))
+
+        columns = NODE_COLUMNS.get(label, ['name'])
+        header = [f'id:ID({label})'] + columns + [':LABEL']
+        row = [props['id']] + [props.get(_column_name(c), '') for c in columns] + [label]
+        self._writer(f'nodes_{label}.csv', header).writerow(row)
+
+    def merge_edge(self, rel_type: str, start: NodeKey, end: NodeKey, props: Dict):
+        (start_label, start_id), (end_label, end_id) = start, end
+        key = (rel_type, start_label, start_id, end_label, end_id)
+        if key in self.edge_ids:
+            return
+        self.edge_ids.add(key)
+
+        header = [f':START_ID({start_label})', f':END_ID({end_label})'] + EDGE_COLUMNS + [':TYPE']
+        row = [start_id, end_id] + [props.get(_column_name(c), '') for c in EDGE_COLUMNS] + [rel_type]
+        self._writer(f'edges_{rel_type}_{start_label}_{end_label}.csv', header).writerow(row)
+
+    def summary(self) -> Dict[str, int]:
+        return dict(self.counts)
+
+    def import_command(self, database: str = 'neo4j') -> str:
+        args = []
+        for filename in sorted(self.files):
+            flag = '--nodes' if filename.startswith('nodes_') else '--relationships'
+            args += f'{flag}={os.path.join(self.out_dir, filename)}',
+        return f"neo4j-admin database import full --multiline-fields=true {' '.join(args)} {database}"
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
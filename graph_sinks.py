@@ -0,0 +1,301 @@
+import random
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from py2neo import Graph
+from py2neo.errors import ClientError, TransientError
+
+from graph_stats import LoadStats
+
+NodeKey = Tuple[str, str]  # (label, id)
+
+
+class GraphSink(ABC):
+    """
+    Where graph_builder writes the graph. Nodes are merged on (label, id),
+    edges on (relationship type, start node, end node); merging again adds to the properties.
+    A buffered sink writes later than the merge, so it counts what it wrote and records what failed itself.
+    """
+
+    buffered = False
+
+    @abstractmethod
+    def merge_node(self, label: str, props: Dict):
+        pass
+
+    @abstractmethod
+    def merge_edge(self, rel_type: str, start: NodeKey, end: NodeKey, props: Dict):
+        pass
+
+    def flush(self):
+        """write anything still buffered"""
+
+    def report(self, phase: str):
+        """called at the end of each load phase"""
+        self.flush()
+
+    def summary(self) -> Dict[str, int]:
+        return {}
+
+    def close(self):
+        self.flush()
+
+
+class Neo4jGraph(GraphSink):
+    """
+    Writes every node and edge with its own MERGE query, one round trip per entity.
+    """
+
+    def __init__(self, G: Graph):
+        self.G = G
+
+    def merge_node(self, label: str, props: Dict):
+        self.G.run(f"""
+            MERGE (n:`{label}` {{id: $id}})
+            SET n += $props
+        """, id=props['id'], props=props)
+
+    def merge_edge(self, rel_type: str, start: NodeKey, end: NodeKey, props: Dict):
+        self.G.run(f"""
+            MATCH (a:`{start[0]}` {{id: $start}})
+            MATCH (b:`{end[0]}` {{id: $end}})
+            MERGE (a)-[r:`{rel_type}`]->(b)
+            SET r += $props
+        """, start=start[1], end=end[1], props=props)
+
+    def run(self, *args, **kwargs):
+        return self.G.run(*args, **kwargs)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            'nodes': self.run("MATCH (n) RETURN count(n)").evaluate(),
+            'edges': self.run("MATCH ()-[r]->() RETURN count(r)").evaluate(),
+        }
+
+
+class BatchedGraph(GraphSink):
+    """
+    Buffers merged nodes and edges, grouped by label and relationship type,
+    and flush() writes each group with one parameterised UNWIND query per batch_size rows.
+    Rows are counted in stats once their batch is committed. A batch the database rejects is split in halves
+    until the rows it rejects are found, those are recorded as failures in stats and dropped.
+    """
+
+    buffered = True
+
+    NODE_QUERY = """
+        UNWIND $rows AS row
+        MERGE (n:`{label}` {{id: row.id}})
+        SET n += row
+    """
+
+    EDGE_QUERY = """
+        UNWIND $rows AS row
+        MATCH (a:`{start_label}` {{id: row.start}})
+        MATCH (b:`{end_label}` {{id: row.end}})
+        MERGE (a)-[r:`{rel_type}`]->(b)
+        SET r += row.props
+    """
+
+    def __init__(self, G: Graph, batch_size: int = 5000, max_retries: int = 5, backoff: float = 0.1,
+                 stats: LoadStats = None):
+        self.G = G
+        self.stats = stats if stats is not None else LoadStats()
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.nodes = defaultdict(dict)  # label -> id -> properties
+        self.edges = defaultdict(dict)  # (type, start label, end label) -> (start id, end id) -> properties
+        self.pending = 0
+        self.written = defaultdict(int)  # label / relationship type -> rows written
+        self.elapsed = defaultdict(float)
+
+    def merge_node(self, label: str, props: Dict):
+        group = self.nodes[label]
+        if props['id'] not in group:
+            group[props['id']] = {}
+            self.pending += 1
+        group[props['id']].update(props)
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def merge_edge(self, rel_type: str, start: NodeKey, end: NodeKey, props: Dict):
+        group = self.edges[(rel_type, start[0], end[0])]
+        key = (start[1], end[1])
+        if key not in group:
+            group[key] = {}
+            self.pending += 1
+        group[key].update(props)
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def run(self, *args, **kwargs):
+        self.flush()
+        return self.G.run(*args, **kwargs)
+
+    def _write(self, query: str, rows: List[Dict], name: str, count: Callable[[str, int], None]):
+        start = time.perf_counter()
+        for i in range(0, len(rows), self.batch_size):
+            self._write_batch(query, rows[i:i + self.batch_size], name, count)
+        self.elapsed[name] += time.perf_counter() - start
+
+    def _write_batch(self, query: str, rows: List[Dict], name: str, count: Callable[[str, int], None]):
+        try:
+            self._commit(query, rows)
+        except Exception as e:
+            # only the database rejecting some rows is worth bisecting, not it being unavailable or overloaded
+            if len(rows) == 1 or not isinstance(e, ClientError):
+                for row in rows:
+                    self.stats.failure(name, row, repr(e))
+                return
+            self._write_batch(query, rows[:len(rows) // 2], name, count)
+            self._write_batch(query, rows[len(rows) // 2:], name, count)
+            return
+        self.written[name] += len(rows)
+        count(name, len(rows))
+
+    def _commit(self, query: str, rows: List[Dict]):
+        # concurrent writers merging into the same nodes can deadlock, neo4j reports that as a transient error
+        for attempt in range(self.max_retries + 1):
+            tx = self.G.begin()
+            try:
+                tx.run(query, rows=rows)
+                self.G.commit(tx)
+                return
+            except Exception as e:
+                try:
+                    self.G.rollback(tx)
+                except Exception:
+                    pass
+                if not isinstance(e, TransientError) or attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+
+    def flush(self):
+        """
+        writes the buffered rows and empties the buffers whatever happens to them,
+        failed rows are in stats and are not written again by the next flush
+        """
+        try:
+            # nodes first, the edge queries MATCH on them
+            for label, group in self.nodes.items():
+                self._write(self.NODE_QUERY.format(label=label), list(group.values()), label, self.stats.node)
+            for (rel_type, start_label, end_label), group in self.edges.items():
+                rows = [{'start': start, 'end': end, 'props': props} for (start, end), props in group.items()]
+                query = self.EDGE_QUERY.format(rel_type=rel_type, start_label=start_label, end_label=end_label)
+                self._write(query, rows, rel_type, self.stats.edge)
+        finally:
+            self.nodes.clear()
+            self.edges.clear()
+            self.pending = 0
+
+    def report(self, phase: str):
+        """flush buffered rows and print throughput of everything written since the last report"""
+        self.flush()
+        for name in sorted(self.written):
+            rows, secs = self.written[name], self.elapsed[name]
+            print(f'  {phase} / {name}: {rows} rows in {secs:.2f}s ({rows / max(secs, 1e-9):.0f} rows/sec)')
+        total_rows, total_secs = sum(self.written.values()), sum(self.elapsed.values())
+        print(f'{phase}: {total_rows} rows in {total_secs:.2f}s ({total_rows / max(total_secs, 1e-9):.0f} rows/sec)')
+        self.written.clear()
+        self.elapsed.clear()
+
+    def summary(self) -> Dict[str, int]:
+        return Neo4jGraph.summary(self)
+
+
+class InMemoryGraph(GraphSink):
+    """
+    Adjacency store kept in process memory. Nodes get compact integer ids in insertion order,
+    edges are parallel arrays of (type, start, end) node ids, so the whole catalogue takes a few MB
+    and can be handed to analytics code without a database.
+    """
+
+    def __init__(self):
+        self.index = {}  # NodeKey -> int
+        self.keys = []  # int -> NodeKey
+        self.props = []  # int -> properties
+        self.types = []  # relationship type code -> name
+        self.type_index = {}
+        self.edge_type = array('B')
+        self.edge_start = array('l')
+        self.edge_end = array('l')
+        self.edge_props = []
+        self.edge_index = {}  # (type code, start, end) -> edge number
+        self._offsets = None  # CSR over outgoing edges, built on demand
+        self._order = None
+
+    def node_id(self, key: NodeKey) -> int:
+        if key not in self.index:
+            self.index[key] = len(self.keys)
+            self.keys += key,
+            self.props += {'id': key[1]},
+        return self.index[key]
+
+    def merge_node(self, label: str, props: Dict):
+        self.props[self.node_id((label, props['id']))].update(props)
+
+    def merge_edge(self, rel_type: str, start: NodeKey, end: NodeKey, props: Dict):
+        if rel_type not in self.type_index:
+            self.type_index[rel_type] = len(self.types)
+            self.types += rel_type,
+        key = (self.type_index[rel_type], self.node_id(start), self.node_id(end))
+        if key in self.edge_index:
+            self.edge_props[self.edge_index[key]].update(props)
+            return
+        self.edge_index[key] = len(self.edge_props)
+        self.edge_type.append(key[0])
+        self.edge_start.append(key[1])
+        self.edge_end.append(key[2])
+        self.edge_props += dict(props),
+        self._offsets = None
+
+    def _build_adjacency(self):
+        order = sorted(range(len(self.edge_start)), key=self.edge_start.__getitem__)
+        offsets = array('l', [0] * (len(self.keys) + 1))
+        for start in self.edge_start:
+            offsets[start + 1] += 1
+        for i in range(len(self.keys)):
+            offsets[i + 1] += offsets[i]
+        self._order = array('l', order)
+        self._offsets = offsets
+
+    def out_edges(self, key: NodeKey, rel_type: str = None) -> Iterator[Tuple[str, NodeKey, Dict]]:
+        """(relationship type, end node, edge properties) for every edge leaving key"""
+        if key not in self.index:
+            return
+        if self._offsets is None or len(self._offsets) != len(self.keys) + 1:
+            self._build_adjacency()
+        node = self.index[key]
+        for edge in self._order[self._offsets[node]:self._offsets[node + 1]]:
+            name = self.types[self.edge_type[edge]]
+            if rel_type is None or name == rel_type:
+                yield name, self.keys[self.edge_end[edge]], self.edge_props[edge]
+
+    def nodes(self, label: str = None) -> Iterator[Tuple[NodeKey, Dict]]:
+        for key, props in zip(self.keys, self.props):
+            if label is None or key[0] == label:
+                yield key, props
+
+    def summary(self) -> Dict[str, int]:
+        return {'nodes': len(self.keys), 'edges': len(self.edge_props)}
+
+
+class NullGraph(GraphSink):
+    """Discards everything, for profiling the traversal on its own."""
+
+    def __init__(self):
+        self.nodes = 0
+        self.edges = 0
+
+    def merge_node(self, label: str, props: Dict):
+        self.nodes += 1
+
+    def merge_edge(self, rel_type: str, start: NodeKey, end: NodeKey, props: Dict):
+        self.edges += 1
+
+    def summary(self) -> Dict[str, int]:
+        return {'node merges': self.nodes, 'edge merges': self.edges}
@@ -0,0 +1,138 @@
+import json
+import sqlite3
+from typing import Dict, List, Tuple
+
+from graph_sinks import GraphSink, NodeKey
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    label TEXT NOT NULL,
+    id TEXT NOT NULL,
+    props TEXT NOT NULL,
+    PRIMARY KEY (label, id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS edges (
+    start_label TEXT NOT NULL,
+    start_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    end_label TEXT NOT NULL,
+    end_id TEXT NOT NULL,
+    props TEXT NOT NULL,
+    PRIMARY KEY (start_label, start_id, type, end_label, end_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS edges_by_end ON edges (end_label, end_id, type);
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SqliteGraph(GraphSink):
+    """
+    Writes the graph into a single SQLite file with a node and an edge table,
+    requirement trees included. Rows are buffered and upserted batch_size at a time.
+    Query it with the functions below.
+    """
+
+    def __init__(self, path: str, batch_size: int = 5000):
+        self.path = path
+        self.conn = connect(path)
+        self.batch_size = batch_size
+        self.nodes = {}  # NodeKey -> properties
+        self.edges = {}  # (start, type, end) -> properties
+
+    def merge_node(self, label: str, props: Dict):
+        self.nodes.setdefault((label, props['id']), {}).update(props)
+        if len(self.nodes) + len(self.edges) >= self.batch_size:
+            self.flush()
+
+    def merge_edge(self, rel_type: str, start: NodeKey, end: NodeKey, props: Dict):
+        self.edges.setdefault((start, rel_type, end), {}).update(props)
+        if len(self.nodes) + len(self.edges) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO nodes (label, id, props) VALUES (?, ?, ?)
+                ON CONFLICT (label, id) DO UPDATE SET props = json_patch(props, excluded.props)
+            """, [(label, key, json.dumps(props)) for (label, key), props in self.nodes.items()])
+            self.conn.executemany("""
+                INSERT INTO edges (start_label, start_id, type, end_label, end_id, props) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (start_label, start_id, type, end_label, end_id)
+                DO UPDATE SET props = json_patch(props, excluded.props)
+            """, [(start[0], start[1], rel_type, end[0], end[1], json.dumps(props))
+                  for (start, rel_type, end), props in self.edges.items()])
+        self.nodes.clear()
+        self.edges.clear()
+
+    def summary(self) -> Dict[str, int]:
+        self.flush()
+        return {
+            'nodes': self.conn.execute("SELECT count(*) FROM nodes").fetchone()[0],
+            'edges': self.conn.execute("SELECT count(*) FROM edges").fetchone()[0],
+        }
+
+    def close(self):
+        self.flush()
+        self.conn.execute("ANALYZE")
+
+
+def prerequisites(conn: sqlite3.Connection, course_id: str, max_depth: int = 20) -> List[Tuple[str, int]]:
+    """(course id, depth) of every course that has to be completed before course_id, directly or transitively"""
+    return conn.execute("""
+        WITH RECURSIVE prereq(id, depth) AS (
+            SELECT ?, 0
+            UNION
+            SELECT e.end_id, p.depth + 1
+            FROM prereq p
+            JOIN edges e ON e.start_label = 'Course' AND e.start_id = p.id AND e.type = 'PREREQUISITE'
+            WHERE e.end_label = 'Course' AND p.depth < ?
+        )
+        SELECT id, min(depth) FROM prereq WHERE depth > 0 GROUP BY id ORDER BY 2, 1
+    """, (course_id, max_depth)).fetchall()
+
+
+def required_by(conn: sqlite3.Connection, course_id: str, max_depth: int = 20) -> List[Tuple[str, int]]:
+    """(course id, depth) of every course that needs course_id completed, directly or transitively"""
+    return conn.execute("""
+        WITH RECURSIVE dependants(id, depth) AS (
+            SELECT ?, 0
+            UNION
+            SELECT e.start_id, d.depth + 1
+            FROM dependants d
+            JOIN edges e ON e.end_label = 'Course' AND e.end_id = d.id AND e.type = 'PREREQUISITE'
+            WHERE e.start_label = 'Course' AND d.depth < ?
+        )
+        SELECT id, min(depth) FROM dependants WHERE depth > 0 GROUP BY id ORDER BY 2, 1
+    """, (course_id, max_depth)).fetchall()
+
+
+def requirements(conn: sqlite3.Connection, node_id: str, label: str = 'Program') -> List[Tuple]:
+    """
+    requirement tree of a program or specialisation in depth first order, one row per edge:
+    (depth, parent id, label, id, name or description, units)
+    """
+    return conn.execute("""
+        WITH RECURSIVE tree(depth, path, parent_id, label, id) AS (
+            SELECT 1, e.end_id, e.start_id, e.end_label, e.end_id
+            FROM edges e
+            WHERE e.start_label = ? AND e.start_id = ? AND e.type = 'REQUIREMENT'
+            UNION ALL
+            SELECT t.depth + 1, t.path || '/' || e.end_id, e.start_id, e.end_label, e.end_id
+            FROM tree t
+            JOIN edges e ON e.start_label = 'Requirement' AND e.start_id = t.id AND e.type = 'REQUIREMENT'
+            WHERE t.label = 'Requirement'
+        )
+        SELECT t.depth, t.parent_id, t.label, t.id,
+               coalesce(json_extract(n.props, '$.name'), json_extract(n.props, '$.description')),
+               json_extract(n.props, '$.units')
+        FROM tree t
+        LEFT JOIN nodes n ON n.label = t.label AND n.id = t.id
+        ORDER BY t.path
+    """, (label, node_id)).fetchall()
@@ -0,0 +1,65 @@
+import json
+import threading
+from collections import Counter
+from typing import Any, Dict
+
+
+class LoadStats:
+    """
+    Counters for a graph load and a log of what could not be loaded.
+
+    Only the first max_samples failures are kept in memory for the summary,
+    every failure is appended to failure_log as one JSON object per line,
+    so memory stays the same however many items fail.
+    """
+
+    def __init__(self, failure_log: str = 'data/load_failures.jsonl', max_samples: int = 20):
+        self.nodes = Counter()  # label -> merged nodes
+        self.edges = Counter()  # relationship type -> merged edges
+        self.failed = Counter()  # label / relationship type -> failed merges
+        self.not_found = 0
+        self.failure_log = failure_log
+        self.max_samples = max_samples
+        self.samples = []
+        self._log = None
+        self._lock = threading.Lock()
+
+    def node(self, label: str, count: int = 1):
+        with self._lock:
+            self.nodes[label] += count
+
+    def edge(self, rel_type: str, count: int = 1):
+        with self._lock:
+            self.edges[rel_type] += count
+
+    def failure(self, name: str, item: Any, reason: str):
+        with self._lock:
+            self.failed[name] += 1
+            self._record({'name': name, 'reason': reason, 'item': item})
+
+    def missing(self, item: Any):
+        """a requirement item that resolves to no node"""
+        with self._lock:
+            self.not_found += 1
+            self._record({'name': 'not found', 'reason': 'no description or id', 'item': item})
+
+    def _record(self, entry: Dict):
+        if len(self.samples) < self.max_samples:
+            self.samples += entry,
+        if self._log is None:
+            self._log = open(self.failure_log, 'w')
+        self._log.write(json.dumps(entry, default=str) + '\n')
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def report(self):
+        self.close()
+        print('Merged nodes:', dict(self.nodes))
+        print('Merged edges:', dict(self.edges))
+        print('Failed to merge:', dict(self.failed))
+        print('Not found:', self.not_found)
+        if self.failed or self.not_found:
+            print(f'Failures logged to {self.failure_log}')
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List
+
+# document list -> (node label, field holding the requirement subtree of that node)
+SOURCES = {
+    'classes': ('Course', 'prerequisites'),
+    'programs': ('Program', 'requirements'),
+    'special': ('Specialisation', 'requirements'),
+}
+
+Manifest = Dict[str, Dict[str, Dict[str, str]]]
+
+
+def content_hash(obj: Any) -> str:
+    s = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.md5(s.encode('utf-8')).hexdigest()
+
+
+def node_properties(doc: Dict) -> Dict:
+    """the properties update_node would store on the node for this document"""
+    return {key: val for key, val in doc.items() if val and type(val) != list and type(val) != dict}
+
+
+def build_manifest(docs: Dict[str, List[Dict]]) -> Manifest:
+    """
+    hash every node and every requirement subtree, keyed by label and id
+    docs: {'classes': [...], 'programs': [...], 'special': [...]}
+    """
+    manifest = {'nodes': {}, 'subtrees': {}}
+    for source, (label, field) in SOURCES.items():
+        nodes = manifest['nodes'].setdefault(label, {})
+        subtrees = manifest['subtrees'].setdefault(label, {})
+        for doc in docs.get(source, []):
+            nodes[doc['id']] = content_hash(node_properties(doc))
+            if doc.get(field):
+                subtrees[doc['id']] = content_hash(doc[field])
+    return manifest
+
+
+def diff_manifests(old: Manifest, new: Manifest) -> Dict[str, Dict[str, Dict[str, List[str]]]]:
+    """
+    {'nodes' | 'subtrees': {label: {'added': [ids], 'changed': [ids], 'removed': [ids]}}}
+    """
+    delta = {}
+    for kind in ('nodes', 'subtrees'):
+        delta[kind] = {}
+        for label in set(old.get(kind, {})) | set(new.get(kind, {})):
+            before = old.get(kind, {}).get(label, {})
+            after = new.get(kind, {}).get(label, {})
+            delta[kind][label] = {
+                'added': sorted(key for key in after if key not in before),
+                'changed': sorted(key for key in after if key in before and before[key] != after[key]),
+                'removed': sorted(key for key in before if key not in after),
+            }
+    return delta
+
+
+def delta_size(delta: Dict) -> int:
+    return sum(len(ids) for kind in delta.values() for changes in kind.values() for ids in changes.values())
+
+
+def load_manifest(path: str) -> Manifest:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: Manifest, path: str):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, sort_keys=True)
+    os.replace(tmp_path, path)
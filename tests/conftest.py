@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the graph modules live at the top level, the crawler modules import each other by name as scrapy runspider has them
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'crawler')]
+
+# nlp_config and the loaders read data/ relative to the working directory
+os.chdir(ROOT)
@@ -0,0 +1,156 @@
+"""
+class_parser.parse_requisite_from_sent as it was before SentenceIndex, frozen: it walked the rest of
+the sentence again for every "and" / "or" it met. tests/test_class_parser.py checks the parser against it,
+benchmarks/requisite_parser.py times both.
+"""
+import json
+from collections import Counter
+from typing import Callable, Dict, List
+
+from nlp_config import CONDITION_MAPPING
+
+
+def reference_split(sent, token, start: int, end: int) -> Dict:
+    if end != token.i:
+        return {
+            'description': str(sent[start:end]),
+            'operator': {
+                token.text.upper(): [
+                    reference_parse(sent, start, token.i),
+                    reference_parse(sent, token.i + 1, end)
+                ]
+            }
+        }
+
+
+def reference_parse(sent, start: int = 0, end=None) -> Dict:
+    """parse_requisite_from_sent before SentenceIndex, as it was less its comments"""
+    counter = Counter()
+
+    raw_txt = sent[start:end].text
+    lemma_txt = " ".join([token.lemma_ for token in sent[start:end]])
+    negation = "not" in raw_txt
+    verb = None
+    classes = []
+    programs = []
+    semicolon = False
+
+    for idx in range(start, end):
+        token = sent[idx]
+
+        if token.ent_type_ == "CLASS":
+            classes += token.text,
+        if token.is_alpha and token.ent_type_ == "PROGRAM":
+            programs += token.text,
+        if token.pos_ == 'VERB':
+            verb = token
+        if token.text == ';':
+            semicolon = True
+
+        if token.lower_ in {"and", "or"} and semicolon and verb:
+            right_ent = sent[token.i + 1:].ents
+            right_verb = [t for t in sent[token.i + 1:] if t.pos_ == 'VERB']
+            if len(programs) + len(classes) > 0 and right_ent and right_verb:
+                return reference_split(sent, token, start, end)
+
+    verb = None
+    classes = []
+    programs = []
+
+    for idx in range(start, end):
+        token = sent[idx]
+
+        if token.ent_type_ == "CLASS":
+            classes += token.text,
+        elif token.ent_type_ == "PROGRAM":
+            programs += token.text,
+        elif token.pos_ == 'VERB':
+            verb = token
+        elif token.lower_ in {"and", "or"}:
+            counter[token.lower_] += 1
+
+            try:
+                left_token = sent[token.i - 1]
+                right_token = sent[token.i + 1]
+                if (left_token.is_punct and not left_token.ent_type_) or (
+                        right_token.is_punct and not right_token.ent_type_):
+                    return reference_split(sent, token, start, end)
+
+                right_ent = sent[token.i + 1:].ents
+                right_verb = [t for t in sent[token.i + 1:] if t.pos_ == 'VERB']
+                if verb and (len(programs) + len(classes) > 0) and right_ent and right_verb:
+                    return reference_split(sent, token, start, end)
+
+                if verb and (len(programs) + len(classes) == 0):
+                    right_counter = Counter()
+                    for t in sent[token.i + 1:]:
+                        if t.lower_ in {"and", "or"}:
+                            right_counter[t.lower_] += 1
+                    try:
+                        right_operator, _ = right_counter.most_common(1)[0]
+                    except IndexError:
+                        right_operator = ""
+                    return {
+                        'description': str(sent[start:end]),
+                        'operator': {
+                            token.text.upper(): [
+                                {
+                                    "condition": verb.text,
+                                    "operator": right_operator,
+                                    "programs": [ent.text for ent in sent[token.i + 1:].ents if
+                                                 ent.label_ == 'PROGRAM'],
+                                    "classes": [ent.text for ent in sent[token.i + 1:].ents if ent.label_ == 'CLASS'],
+                                    "description": raw_txt
+                                },
+                                reference_parse(sent, token.i + 1, end)
+                            ]
+                        }
+                    }
+            except IndexError:
+                pass
+
+    try:
+        operator, _ = counter.most_common(1)[0]
+    except IndexError:
+        operator = ""
+
+    if 'incompatible' in lemma_txt:
+        return {
+            "condition": "incompatible",
+            "programs": [ent.text for ent in sent[start:end].ents if ent.label_ == 'PROGRAM'],
+            "classes": [ent.text for ent in sent[start:end].ents if ent.label_ == 'CLASS'],
+            "description": raw_txt
+        }
+    elif verb:
+        return {
+            "condition": CONDITION_MAPPING[verb.text],
+            "operator": operator,
+            "negation": negation,
+            "programs": [ent.text for ent in sent[start:end].ents if ent.label_ == 'PROGRAM'],
+            "classes": [ent.text for ent in sent[start:end].ents if ent.label_ == 'CLASS'],
+            "description": raw_txt
+        }
+    else:
+        for i in range(start, -1, -1):
+            if sent[i].pos_ == 'VERB':
+                return {
+                    "condition": CONDITION_MAPPING[sent[i].text],
+                    "operator": operator,
+                    "programs": [ent.text for ent in sent[start:end].ents if ent.label_ == 'PROGRAM'],
+                    "classes": [ent.text for ent in sent[start:end].ents if ent.label_ == 'CLASS'],
+                    "description": raw_txt
+                }
+    return {
+        "condition": "Unknown",
+        "programs": [ent.text for ent in sent[start:end].ents if ent.label_ == 'PROGRAM'],
+        "classes": [ent.text for ent in sent[start:end].ents if ent.label_ == 'CLASS'],
+        "description": raw_txt
+    }
+
+
+def parse_all(parse: Callable, sents: List) -> str:
+    """the expressions of the sentences, or the exception the parser raised, as text to compare"""
+    try:
+        return json.dumps([parse(sent, 0, len(sent)) for sent in sents])
+    except Exception as e:
+        return f'{type(e).__name__}: {e}'
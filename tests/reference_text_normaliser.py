@@ -0,0 +1,38 @@
+"""
+The chains of replacements text_normaliser replaced, frozen as they were in the spiders:
+tests/test_text_normaliser.py checks the normalisers against them, benchmarks/text_normaliser.py times both.
+"""
+import re
+
+
+def reference_requisites(requisites_txt: str) -> str:
+    """SpiderClass.parse_class before text_normaliser"""
+    requisites_txt = requisites_txt.replace('R&D', 'Research and Development')
+    requisites_txt = re.sub('([A-Z]{4}[0-9]{4})([a-z]+)', '\\1 \\2', requisites_txt)
+    requisites_txt = re.sub('\\([A-Z]+\\)', '', requisites_txt)
+    requisites_txt = requisites_txt.replace(' Advanced ', ' (Advanced) ').replace(' Honours ', ' (Honours) ')
+    requisites_txt = requisites_txt.replace('of (Advanced)', 'of Advanced')
+    requisites_txt = requisites_txt.replace('&', 'and')
+    requisites_txt = re.sub('([A-Za-z])\\(', '\\1 (', requisites_txt)
+    requisites_txt = re.sub('\\(\\s+', '(', requisites_txt)
+    requisites_txt = re.sub('\\s+\\)', ')', requisites_txt)
+    requisites_txt = re.sub('\\(\\s?\\)', '', requisites_txt)
+    requisites_txt = re.sub('\\s+', ' ', requisites_txt)
+    return requisites_txt
+
+
+def reference_requirement_line(txt: str) -> str:
+    """SpiderProgram.convert_response_for_requirements_to_str before text_normaliser"""
+    p = re.compile(r"([A-Z]{4}[0-9]{4})")
+    txt = p.sub(r' \1 ', txt)
+    return txt.replace('\n', '').replace('\xa0', '').replace('  ', ' ').strip()
+
+
+def reference_specialisation_name(s: str) -> str:
+    """SpiderProgram.fix_specialisation_name before text_normaliser"""
+    for keyword in ['Minor', 'minor', 'Major', 'major', 'Specialisation', 'specialisation']:
+        if s.endswith(keyword):
+            s = s.rstrip(keyword).strip()
+    s = re.sub('[A-Z]{3,5}-[A-Z]{3,4}', '', s).strip()
+    s = re.sub('\\([A-Z]+\\)', '', s).strip()
+    return s
@@ -0,0 +1,80 @@
+import json
+import random
+
+import pytest
+import spacy
+
+from class_parser import SentenceIndex, parse_requisite_from_sent
+from nlp_config import PATTERNS
+from tests.reference_parser import parse_all, reference_parse
+
+VERBS = {'completed', 'complete', 'studying', 'enrolled', 'enrol', 'have', 'be', 'must', 'find', 'approved'}
+
+TEXTS = [
+    'To enrol in this course you must have completed COMP1100.',
+    'To enrol in this course you must be studying a Master of Engineering and have completed ENGN8100 and '
+    '(ENGN8160 or ENGN8260).',
+    'To enrol in this course you must have either: completed COMP6250 (Professional Practice 1) and be enrolled in '
+    'the Master of Computing; OR be enrolled in the Master of Computing (Advanced).',
+    'To enrol in this course you must have completed or be currently enrolled in COMP6710 OR COMP6730.',
+    'To enrol in this course you must: - be enrolled in the Master of Computing - have completed COMP8260 and '
+    'COMP6442 - find a project/supervisor; and - have an approved Independent Study Contract. '
+    'Incompatible with COMP8715 and COMP8830.',
+    'You are not able to enrol in this course if you have previously completed COMP1130 or COMP1140; and '
+    'have completed COMP1100 or COMP1730 with a mark of 60 or above.',
+    'Incompatible with COMP2100.',
+    'Permission of the convener is required.',
+]
+
+
+@pytest.fixture(scope='module')
+def nlp():
+    """tokenizer, sentences and the CLASS / PROGRAM entity ruler, with verbs and lemmas from a word list"""
+    nlp = spacy.blank('en')
+    nlp.add_pipe('sentencizer')
+    nlp.add_pipe('entity_ruler').add_patterns(PATTERNS)
+    return nlp
+
+
+def parse(nlp, text):
+    doc = nlp(text)
+    for token in doc:
+        token.lemma_ = token.lower_
+        token.pos_ = 'VERB' if token.lower_ in VERBS else 'NOUN'
+    return doc
+
+
+def joined(n: int, seed: int):
+    rng = random.Random(seed)
+    return ' and '.join(text.replace('.', ';').rstrip('; ') for text in rng.sample(TEXTS, n))
+
+
+@pytest.mark.parametrize('text', TEXTS + [joined(n, seed) for n in (2, 4, 8) for seed in range(3)])
+def test_parses_like_the_scan_it_replaced(nlp, text):
+    sents = list(parse(nlp, text).sents)
+    assert parse_all(parse_requisite_from_sent, sents) == parse_all(reference_parse, sents)
+
+
+def test_sentence_index(nlp):
+    doc = parse(nlp, 'Incompatible with COMP1100. You must have completed COMP1110 and COMP1130 or COMP1140.')
+    sent = list(doc.sents)[1]
+    index = SentenceIndex(sent)
+
+    # positions are relative to the sentence, entities clipped like slices of it
+    assert index.ent_texts('CLASS', 0) == ['COMP1110', 'COMP1130', 'COMP1140']
+    assert index.ent_texts('CLASS', 5, -3) == ['COMP1130']
+    assert [(start, end) for start, end, _, _ in index.ents_in(-4)] == [(6, 7), (8, 9)]
+    assert index.operator_after(0) == 'and' and index.operator_after(6) == 'or' and index.operator_after(-1) == ''
+    assert index.has_verb_after(0) and not index.has_verb_after(4)
+    assert index.incompatible(0) is False and SentenceIndex(list(doc.sents)[0]).incompatible(0, 1)
+    with pytest.raises(IndexError):
+        index.texts[len(sent)]
+
+
+def test_parse_of_a_split(nlp):
+    sent = next(parse(nlp, 'You must have completed COMP1100 and be studying a Master of Computing.').sents)
+    expression = json.loads(json.dumps(parse_requisite_from_sent(sent, 0, len(sent))))
+    assert list(expression['operator']) == ['AND']
+    left, right = expression['operator']['AND']
+    assert left['classes'] == ['COMP1100'] and left['condition'] == 'completed'
+    assert right['programs'] == ['Master of Computing'] and right['condition'] == 'studying'
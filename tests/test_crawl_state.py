@@ -0,0 +1,45 @@
+import spacy
+from scrapy.http import HtmlResponse, Request
+
+from crawl_state import CrawlState, parse_fingerprint
+from models import Specialisation
+import nlp_config
+
+URL = 'https://programsandcourses.anu.edu.au/2024/specialisation/ARTI-SPEC'
+BODY = b'<html><body>Artificial Intelligence</body></html>'
+
+
+def response(status=200, body=BODY):
+    return HtmlResponse(URL, status=status, body=body, headers={'ETag': '"1"'}, request=Request(URL))
+
+
+def test_fingerprint_follows_the_pipeline_and_the_api_listings(monkeypatch):
+    nlp = spacy.blank('en')
+    before = parse_fingerprint(nlp)
+    assert parse_fingerprint(nlp) == before
+    monkeypatch.setitem(nlp_config.ALL_PROGRAMS, 'Bachelor of Testing', 'ATEST')
+    programs = parse_fingerprint(nlp)
+    assert programs != before
+    monkeypatch.setitem(nlp_config.ALL_SPECIALISATIONS, 'Testing', 'TEST-SPEC')
+    assert parse_fingerprint(nlp) != programs
+    monkeypatch.undo()
+    assert parse_fingerprint(nlp) == before
+    nlp.add_pipe('sentencizer')
+    assert parse_fingerprint(nlp) != before
+
+
+def test_items_are_kept_for_the_same_fingerprint_only(tmp_path):
+    path = str(tmp_path / 'crawl_state.sqlite')
+    item = Specialisation(id='ARTI-SPEC', name='Artificial Intelligence', type='Specialisation', units=24)
+    state = CrawlState('one', path)
+    assert state.conditional_headers(URL) == {} and state.stored_items(response()) is None
+    state.save(response(), [item])
+    assert state.conditional_headers(URL) == {'If-None-Match': '"1"'}
+    assert state.stored_items(response(304)) == [item]
+    assert state.stored_items(response(body=BODY + b' ')) is None
+    state.close()
+
+    state = CrawlState('two', path)
+    assert state.conditional_headers(URL) == {}
+    assert state.stored_items(response(304)) is None
+    state.close()
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from frontier import Frontier
+from models import Course
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+CRAWLER = os.path.join(os.path.dirname(TESTS), 'crawler')
+
+PAGES = [(f'https://programsandcourses.anu.edu.au/2024/course/COMP{1000 + i}', 'parse_class') for i in range(10)]
+
+
+def items_of(url):
+    code = url.rsplit('/', 1)[-1]
+    return [Course(id=code, name=f'Course {code}'), Course(id=f'{code}-bis', name=f'Again {code}')]
+
+
+def crawl(frontier):
+    """what the spider does with a frontier: yields the checkpointed items, then crawls what is pending"""
+    if frontier.is_new():
+        frontier.add(PAGES)
+    yield from frontier.items()
+    for url, callback in frontier.pending():
+        assert callback == 'parse_class'
+        frontier.checkpoint(url, items_of(url))
+        yield from items_of(url)
+
+
+def test_resume_after_the_process_died(tmp_path):
+    path = str(tmp_path / 'classes.sqlite')
+    # the first run checkpoints four pages, then dies without closing anything
+    run = subprocess.run([sys.executable, '-c', f"""
+import os, sys
+sys.path[:0] = {[CRAWLER, TESTS]!r}
+from frontier import Frontier
+from test_frontier import PAGES, items_of
+frontier = Frontier({path!r})
+frontier.add(PAGES)
+for url, _ in frontier.pending()[:4]:
+    frontier.checkpoint(url, items_of(url))
+os._exit(1)
+"""])
+    assert run.returncode == 1
+
+    frontier = Frontier(path)
+    assert frontier.counts() == (4, 6)
+    items = list(crawl(frontier))
+    assert items == [item for url, _ in PAGES for item in items_of(url)]
+    assert frontier.counts() == (10, 0)
+    frontier.close()
+
+    # a third run requests nothing and yields every item once
+    frontier = Frontier(path)
+    assert frontier.pending() == []
+    assert list(crawl(frontier)) == items
+    frontier.close()
+
+
+def test_a_page_is_done_only_with_its_items(tmp_path):
+    path = str(tmp_path / 'classes.sqlite')
+    frontier = Frontier(path)
+    frontier.add(PAGES[:2])
+    frontier.checkpoint(PAGES[0][0], items_of(PAGES[0][0]))
+    # an item that can't be stored fails the whole checkpoint, the page stays pending with no items
+    with pytest.raises(TypeError):
+        frontier.checkpoint(PAGES[1][0], [Course(id='COMP1001'), Course(id='COMP1001-bis', units=object())])
+    frontier.close()
+
+    frontier = Frontier(path)
+    assert frontier.pending() == [PAGES[1]]
+    assert list(frontier.items()) == items_of(PAGES[0][0])
+    # a page checkpointed again replaces its items
+    frontier.checkpoint(PAGES[0][0], items_of(PAGES[0][0])[:1])
+    assert list(frontier.items()) == items_of(PAGES[0][0])[:1]
+    frontier.close()
+
+
+def test_pages_added_again_keep_their_state_and_order(tmp_path):
+    frontier = Frontier(str(tmp_path / 'classes.sqlite'))
+    frontier.add(PAGES[:3])
+    frontier.checkpoint(PAGES[1][0], [])
+    frontier.add(PAGES[::-1])
+    assert frontier.pending() == [PAGES[0], PAGES[2]] + PAGES[:2:-1]
+    assert frontier.counts() == (1, 9)
+    frontier.close()
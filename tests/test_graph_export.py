@@ -0,0 +1,52 @@
+import csv
+import os
+
+from graph_export import CsvExportGraph
+
+
+def rows(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_one_file_per_label_and_edge_type(tmp_path):
+    G = CsvExportGraph(str(tmp_path))
+    G.merge_node('Course', {'id': 'COMP1100', 'name': 'Programming as Problem Solving', 'units': 6})
+    G.merge_node('Course', {'id': 'COMP1110', 'name': 'Structured Programming', 'units': 6,
+                            'description': 'line one\nline two, "quoted"'})
+    # a node is written once, with the properties it was first seen with
+    G.merge_node('Course', {'id': 'COMP1100', 'name': 'placeholder'})
+    G.merge_node('Program', {'id': 'MCOMP', 'name': 'Master of Computing', 'units': 96})
+    G.merge_edge('PREREQUISITE', ('Course', 'COMP1110'), ('Course', 'COMP1100'),
+                 {'condition': 'completed', 'negation': False})
+    G.merge_edge('PREREQUISITE', ('Course', 'COMP1110'), ('Course', 'COMP1100'), {'condition': 'completed'})
+    G.merge_edge('PREREQUISITE', ('Course', 'COMP1110'), ('Program', 'MCOMP'), {'condition': 'studying'})
+    G.close()
+
+    assert G.summary() == {'nodes_Course.csv': 2, 'nodes_Program.csv': 1,
+                           'edges_PREREQUISITE_Course_Course.csv': 1, 'edges_PREREQUISITE_Course_Program.csv': 1}
+    courses = rows(tmp_path / 'nodes_Course.csv')
+    assert courses[0][:5] == ['id:ID(Course)', 'name', 'subject_code', 'course_number', 'units:int']
+    assert courses[0][-1] == ':LABEL'
+    assert [row[:2] for row in courses[1:]] == [['COMP1100', 'Programming as Problem Solving'],
+                                               ['COMP1110', 'Structured Programming']]
+    assert courses[2][5] == 'line one\nline two, "quoted"'
+    assert rows(tmp_path / 'nodes_Program.csv') == [['id:ID(Program)', 'name', 'units:int', ':LABEL'],
+                                                    ['MCOMP', 'Master of Computing', '96', 'Program']]
+    assert rows(tmp_path / 'edges_PREREQUISITE_Course_Course.csv') == [
+        [':START_ID(Course)', ':END_ID(Course)', 'condition', 'description', 'negation:boolean', ':TYPE'],
+        ['COMP1110', 'COMP1100', 'completed', '', 'False', 'PREREQUISITE'],
+    ]
+
+
+def test_import_command(tmp_path):
+    G = CsvExportGraph(str(tmp_path))
+    G.merge_node('Program', {'id': 'MCOMP'})
+    G.merge_edge('REQUIREMENT', ('Program', 'MCOMP'), ('Requirement', 'abc'), {})
+    G.close()
+
+    command = G.import_command('anu')
+    assert command.startswith('neo4j-admin database import full --multiline-fields=true ')
+    assert f"--nodes={os.path.join(str(tmp_path), 'nodes_Program.csv')}" in command
+    assert f"--relationships={os.path.join(str(tmp_path), 'edges_REQUIREMENT_Program_Requirement.csv')}" in command
+    assert command.endswith(' anu')
@@ -0,0 +1,90 @@
+from py2neo.errors import ClientError, TransientError
+
+from graph_sinks import BatchedGraph
+from graph_stats import LoadStats
+
+
+class Transaction:
+    def __init__(self, graph):
+        self.graph = graph
+        self.rows = []
+
+    def run(self, query, rows):
+        self.graph.attempts += 1
+        if self.graph.errors:
+            raise self.graph.errors.pop(0)
+        for row in rows:
+            if row.get('id', row.get('start')) == 'BAD':
+                raise ClientError('cannot merge BAD', 'Neo.ClientError.Statement.TypeError')
+        self.rows += rows
+
+
+class Graph:
+    """the part of a py2neo Graph BatchedGraph uses, committing rows unless they carry the id BAD"""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.attempts = 0
+        self.committed = []
+
+    def begin(self):
+        return Transaction(self)
+
+    def commit(self, tx):
+        self.committed += tx.rows
+
+    def rollback(self, tx):
+        pass
+
+
+def batched(graph, tmp_path, batch_size=4):
+    return BatchedGraph(graph, batch_size, backoff=0, stats=LoadStats(str(tmp_path / 'failures.jsonl')))
+
+
+def test_counts_rows_once_committed(tmp_path):
+    graph = Graph()
+    G = batched(graph, tmp_path)
+    for code in ('COMP1100', 'COMP1110', 'COMP1100'):
+        G.merge_node('Course', {'id': code})
+    G.merge_edge('PREREQUISITE', ('Course', 'COMP1110'), ('Course', 'COMP1100'), {})
+    assert (G.stats.nodes, G.stats.edges, graph.committed) == ({}, {}, [])
+
+    G.close()
+    assert G.stats.nodes == {'Course': 2} and G.stats.edges == {'PREREQUISITE': 1}
+    assert len(graph.committed) == 3 and not G.stats.failed
+
+
+def test_failed_rows_are_recorded_and_dropped(tmp_path):
+    graph = Graph()
+    G = batched(graph, tmp_path)
+    # the fourth merge fills the buffer and flushes
+    for code in ('COMP1100', 'BAD', 'COMP1110', 'COMP1130'):
+        G.merge_node('Course', {'id': code})
+    assert G.stats.failed == {'Course': 1}
+    assert G.stats.samples[0]['item'] == {'id': 'BAD'} and 'cannot merge BAD' in G.stats.samples[0]['reason']
+    assert G.stats.nodes == {'Course': 3}
+
+    # the bad row is not written again by later flushes
+    G.merge_node('Course', {'id': 'COMP2100'})
+    G.close()
+    G.stats.close()
+    assert G.stats.failed == {'Course': 1} and G.stats.nodes == {'Course': 4}
+    assert sorted(row['id'] for row in graph.committed) == ['COMP1100', 'COMP1110', 'COMP1130', 'COMP2100']
+    with open(tmp_path / 'failures.jsonl') as f:
+        assert len(f.readlines()) == 1
+
+
+def test_transient_errors_are_retried_then_recorded_for_the_batch(tmp_path):
+    graph = Graph(errors=[TransientError('deadlock', 'Neo.TransientError.Transaction.DeadlockDetected')])
+    G = batched(graph, tmp_path)
+    G.merge_node('Course', {'id': 'COMP1100'})
+    G.flush()
+    assert graph.attempts == 2 and G.stats.nodes == {'Course': 1}
+
+    graph.errors = [TransientError('deadlock', 'Neo.TransientError.Transaction.DeadlockDetected')] * 10
+    G.max_retries = 2
+    G.merge_node('Course', {'id': 'COMP1110'})
+    G.merge_node('Course', {'id': 'COMP1130'})
+    G.report('nodes')
+    # not bisected, each row of the batch is recorded once
+    assert graph.attempts == 5 and G.stats.failed == {'Course': 2} and G.stats.nodes == {'Course': 1}
@@ -0,0 +1,55 @@
+import pytest
+
+from graph_sqlite import SqliteGraph, connect, prerequisites, required_by, requirements
+
+
+@pytest.fixture
+def graph(tmp_path):
+    # a small batch size, so merges land in several flushes
+    G = SqliteGraph(str(tmp_path / 'graph.db'), batch_size=3)
+    for code in ('COMP1100', 'COMP1110', 'COMP2100', 'COMP2120', 'COMP3120'):
+        G.merge_node('Course', {'id': code, 'name': code.lower()})
+    for start, end in [('COMP1110', 'COMP1100'), ('COMP2100', 'COMP1110'), ('COMP2120', 'COMP1110'),
+                       ('COMP3120', 'COMP2100'), ('COMP3120', 'COMP2120')]:
+        G.merge_edge('PREREQUISITE', ('Course', start), ('Course', end), {'condition': 'completed'})
+
+    G.merge_node('Program', {'id': 'BIT', 'name': 'Bachelor of Information Technology', 'units': 144})
+    G.merge_node('Requirement', {'id': 'r1', 'description': 'Compulsory', 'units': 12})
+    G.merge_node('Requirement', {'id': 'r2', 'description': 'One of', 'units': 6})
+    G.merge_edge('REQUIREMENT', ('Program', 'BIT'), ('Requirement', 'r1'), {})
+    G.merge_edge('REQUIREMENT', ('Requirement', 'r1'), ('Course', 'COMP1100'), {})
+    G.merge_edge('REQUIREMENT', ('Requirement', 'r1'), ('Requirement', 'r2'), {})
+    G.merge_edge('REQUIREMENT', ('Requirement', 'r2'), ('Course', 'COMP2100'), {})
+    G.merge_edge('REQUIREMENT', ('Requirement', 'r2'), ('Course', 'COMP2120'), {})
+    G.close()
+    return G
+
+
+def test_merges_are_upserts(graph):
+    assert graph.summary() == {'nodes': 8, 'edges': 10}
+    graph.merge_node('Course', {'id': 'COMP1100', 'units': 6})
+    graph.merge_edge('PREREQUISITE', ('Course', 'COMP1110'), ('Course', 'COMP1100'), {'negation': False})
+    assert graph.summary() == {'nodes': 8, 'edges': 10}
+
+    props = graph.conn.execute("SELECT props FROM nodes WHERE label = 'Course' AND id = 'COMP1100'").fetchone()[0]
+    assert props == '{"id":"COMP1100","name":"comp1100","units":6}'
+    props = graph.conn.execute("SELECT props FROM edges WHERE start_id = 'COMP1110'").fetchone()[0]
+    assert props == '{"condition":"completed","negation":false}'
+
+
+def test_prerequisites_and_required_by(graph):
+    conn = connect(graph.path)
+    assert prerequisites(conn, 'COMP3120') == [('COMP2100', 1), ('COMP2120', 1), ('COMP1110', 2), ('COMP1100', 3)]
+    assert prerequisites(conn, 'COMP3120', max_depth=1) == [('COMP2100', 1), ('COMP2120', 1)]
+    assert required_by(conn, 'COMP1110') == [('COMP2100', 1), ('COMP2120', 1), ('COMP3120', 2)]
+    assert prerequisites(conn, 'COMP1100') == []
+
+
+def test_requirement_tree(graph):
+    assert requirements(connect(graph.path), 'BIT') == [
+        (1, 'BIT', 'Requirement', 'r1', 'Compulsory', 12),
+        (2, 'r1', 'Course', 'COMP1100', 'comp1100', None),
+        (2, 'r1', 'Requirement', 'r2', 'One of', 6),
+        (3, 'r2', 'Course', 'COMP2100', 'comp2100', None),
+        (3, 'r2', 'Course', 'COMP2120', 'comp2120', None),
+    ]
@@ -0,0 +1,113 @@
+import copy
+
+import pytest
+
+import graph_builder as gb
+from graph_sinks import InMemoryGraph
+from graph_sync import build_manifest, delta_size, diff_manifests
+
+CLASSES = [
+    {'id': 'COMP1100', 'name': 'Programming as Problem Solving', 'units': 6},
+    {'id': 'COMP1110', 'name': 'Structured Programming', 'units': 6,
+     'prerequisites': {'condition': 'completed', 'operator': '', 'programs': [], 'classes': ['COMP1100'],
+                       'description': 'you must have completed COMP1100'}},
+    {'id': 'COMP6710', 'name': 'Structured Programming', 'units': 6,
+     'prerequisites': {'description': 'studying a Master of Computing and not COMP1110', 'operator': {'AND': [
+         {'condition': 'studying', 'operator': '', 'programs': ['MCOMP'], 'classes': [],
+          'description': 'studying a Master of Computing'},
+         {'condition': 'incompatible', 'programs': [], 'classes': ['COMP1110'], 'description': 'not COMP1110'},
+     ]}}},
+]
+
+PROGRAMS = [
+    {'id': 'MCOMP', 'name': 'Master of Computing', 'units': 96, 'specialisations': [],
+     'requirements': [{'description': 'Compulsory courses', 'items': [
+         {'id': 'COMP6710', 'name': 'Structured Programming'},
+         {'description': 'One of', 'items': [{'id': 'COMP1100'}, {'id': 'COMP1110'}]},
+     ]}]},
+    {'id': 'BIT', 'name': 'Bachelor of Information Technology', 'units': 144, 'specialisations': [],
+     'requirements': [{'description': 'A major', 'items': [{'id': 'ARIN-MAJ', 'name': 'Artificial Intelligence'}]},
+                      {'description': 'One of', 'items': [{'id': 'COMP1100'}, {'id': 'COMP1110'}]}]},
+]
+
+SPECIAL = [
+    {'id': 'ARIN-MAJ', 'name': 'Artificial Intelligence', 'type': 'major', 'units': 48,
+     'requirements': [{'description': 'Compulsory', 'items': [{'id': 'COMP1110'}]}]},
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    for cache in (gb.CLASSES, gb.PROGRAMS, gb.SPECIAL, gb.REQUIREMENTS):
+        cache.clear()
+    yield
+
+
+def load():
+    """the documents as graph_builder.main reads them"""
+    return {'classes': copy.deepcopy(CLASSES), 'programs': copy.deepcopy(PROGRAMS), 'special': copy.deepcopy(SPECIAL)}
+
+
+def test_full_load_leaves_documents_untouched():
+    docs = load()
+    gb.build_graph(InMemoryGraph(), docs['classes'], docs['programs'], docs['special'])
+    assert docs == load()
+
+
+def test_sync_after_full_load_finds_no_changes():
+    docs = load()
+    manifest = build_manifest(docs)
+    gb.build_graph(InMemoryGraph(), docs['classes'], docs['programs'], docs['special'])
+
+    assert delta_size(diff_manifests(manifest, build_manifest(load()))) == 0
+    assert delta_size(diff_manifests(build_manifest(docs), build_manifest(load()))) == 0
+
+
+def test_requirement_nodes_get_content_addressed_ids():
+    docs = load()
+    G = InMemoryGraph()
+    gb.build_graph(G, docs['classes'], docs['programs'], docs['special'])
+
+    requirements = [key for key, _ in G.nodes('Requirement')]
+    # "One of COMP1100 / COMP1110" is shared by both programs
+    assert len(requirements) == len(set(requirements)) == 4
+    assert ('Course', 'COMP1100') in [end for _, end, _ in G.out_edges(('Requirement', gb.requirement_id(
+        PROGRAMS[1]['requirements'][1])))]
+
+
+def test_diff_manifests():
+    docs = load()
+    old = build_manifest(docs)
+    docs['classes'][0]['units'] = 12
+    docs['programs'][0]['requirements'][0]['items'].pop()
+    del docs['special'][0]
+    docs['classes'] += {'id': 'COMP2100', 'name': 'Software Design Methodologies'},
+    delta = diff_manifests(old, build_manifest(docs))
+
+    assert delta['nodes']['Course'] == {'added': ['COMP2100'], 'changed': ['COMP1100'], 'removed': []}
+    assert delta['nodes']['Specialisation'] == {'added': [], 'changed': [], 'removed': ['ARIN-MAJ']}
+    assert delta['subtrees']['Program'] == {'added': [], 'changed': ['MCOMP'], 'removed': []}
+    assert delta['subtrees']['Course'] == {'added': [], 'changed': [], 'removed': []}
+
+
+def test_owners_of_added_and_removed_nodes_are_rebuilt():
+    docs = load()
+    old = build_manifest(docs)
+    # the course MCOMP requires goes, a program requisites refer to and the major BIT refers to come back
+    del docs['classes'][0]
+    del docs['special'][0]
+    docs['programs'] = [docs['programs'][1]]
+    docs['classes'][1]['prerequisites']['operator']['AND'][0]['programs'] = ['BIT']
+    delta = diff_manifests(old, build_manifest(docs))
+    sources = {'Course': docs['classes'], 'Program': docs['programs'], 'Specialisation': docs['special']}
+
+    assert gb.touched_ids(delta) == {'COMP1100', 'ARIN-MAJ', 'MCOMP'}
+    # COMP6710's requisites changed and are rebuilt anyway, COMP1110 referred to the removed COMP1100,
+    # BIT to the removed major and to COMP1100
+    assert gb.stale_owners(delta, sources) == {'Course': ['COMP1110'], 'Program': ['BIT'], 'Specialisation': []}
+
+
+def test_owner_references():
+    assert sorted(gb.owner_references(CLASSES[2], 'Course')) == ['COMP1110', 'MCOMP']
+    assert gb.owner_references(PROGRAMS[0], 'Program') == ['COMP6710', 'COMP1100', 'COMP1110']
+    assert gb.owner_references(CLASSES[0], 'Course') == []
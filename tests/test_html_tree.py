@@ -0,0 +1,77 @@
+from typing import List, Optional, Tuple
+
+import pytest
+from scrapy.http import HtmlResponse
+
+import html_tree
+
+bs4 = pytest.importorskip('bs4')
+
+# the shapes of markup on programsandcourses pages that text extraction has to get right
+PAGE = b"""<!DOCTYPE html>
+<html><head><title>COMP1100</title></head>
+<body>
+<div class="introduction">
+  <!-- intro written by the college -->
+  <p>An introduction&nbsp;to programming,&nbsp; with <b>Haskell</b> &amp; friends.</p>
+
+  <p>   </p>
+  Loose text &lt;between&gt; paragraphs &#8211; and &eacute;l&egrave;ves.
+  <ul><li>one</li>
+      <li>two<!-- hidden --> and&nbsp;a half</li></ul>
+</div>
+<div class="requisite">
+  To enrol in this course you must have completed <a href="/course/COMP1730">COMP1730</a>
+  <!-- or COMP1040 -->or <a href="/course/COMP1040">COMP1040</a>.&nbsp;Incompatible with
+  <a href="/course/COMP1130">COMP1130</a>.
+	  
+</div>
+<div id="body">
+<h2>Requirements</h2>
+<p>This program requires completion of 144 units, of which:</p>
+<table class="table"><tbody>
+<tr><td>&nbsp;COMP1100</td><td>Programming as Problem Solving<!-- 6 units --></td><td> 6 </td></tr>
+<tr><td>   </td><td>Either</td></tr>
+</tbody></table>
+<p>&nbsp;</p>
+<h2>Specialisations</h2>
+<div>
+<a href="/specialisation/ARTI-SPEC">Artificial Intelligence</a>
+</div>
+</div>
+</body></html>
+"""
+
+def page() -> HtmlResponse:
+    return HtmlResponse('https://programsandcourses.anu.edu.au/2024/course/COMP1100', body=PAGE, encoding='utf-8')
+
+
+QUERIES = ['div.introduction', 'div.requisite', 'div#body', 'div#body table', 'div.introduction ul']
+
+
+def extracted_by_beautifulsoup(html: str) -> Tuple[List[Tuple[Optional[str], str]], str]:
+    """what the extractors did before html_tree: reparse the selected html and walk its first element"""
+    elem = next(iter(bs4.BeautifulSoup(html, 'html.parser').children))
+    return [(child.name, child.text) for child in elem.contents], elem.text
+
+
+def extracted_by_html_tree(elem) -> Tuple[List[Tuple[Optional[str], str]], str]:
+    return [(html_tree.tag(child), html_tree.text(child)) for child in html_tree.contents(elem)], html_tree.text(elem)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_same_text_as_beautifulsoup(query):
+    response = page()
+    elem = html_tree.find(response, query, css=True)
+    assert extracted_by_html_tree(elem) == extracted_by_beautifulsoup(response.css(query).get())
+
+
+def test_the_page_has_what_the_comparison_is_about():
+    response = page()
+    intro = html_tree.find(response, 'div.introduction', css=True)
+    nodes = html_tree.contents(intro)
+    assert any(not isinstance(node, str) and html_tree.tag(node) is None for node in nodes)  # a comment
+    # whitespace-only text, with a newline and without
+    assert intro.text.strip() == '' and '\n' in nodes and html_tree.text(intro[2]) == ' '
+    text = html_tree.text(intro)
+    assert '\xa0' in text and '& friends' in text and '<between>' in text and '–' in text and 'é' in text
@@ -0,0 +1,48 @@
+from name_index import PROGRAMS, SPECIALISATIONS, NameIndex, fuzzy_key, name_key, trigrams
+
+RECORDS = [
+    ('Asian and Pacific Archaeology', 'MIN', 'ASPA-MIN'),
+    ('Asian and Pacific Archaeology', 'SPC', 'ASPA-SPC'),
+    ('Computer Science', 'MAJ', 'COSC-MAJ'),
+    ('Computer Science', 'MIN', 'COSC-MIN'),
+    ('Master of Strategic Studies', None, 'MSTST'),
+    ('Master of Strategic Studies (Advanced)', None, 'VSTST'),
+]
+
+
+def test_keys():
+    assert name_key('Computer  Science') == name_key('computer science') == 'computerscience'
+    assert fuzzy_key('Science & Technology (Honours)') == 'scienceandtechnologyhonours'
+    assert trigrams('ab') == {'  a', ' ab', 'ab '}
+
+
+def test_get_prefers_the_type_then_the_first_record():
+    index = NameIndex(RECORDS)
+    assert len(index) == len(RECORDS)
+    assert index.get('computer science', 'MIN') == 'COSC-MIN'
+    assert index.get('ComputerScience', 'SPC') == 'COSC-MAJ'
+    assert index.get('Computer Science') == 'COSC-MAJ'
+    assert index.get('Computing') is None
+
+
+def test_closest_resolves_near_misses_only():
+    index = NameIndex(RECORDS)
+    assert index.get('Asia and Pacific Archaeology', 'SPC') is None
+    assert index.resolve('Asia and Pacific Archaeology', 'SPC') == 'ASPA-SPC'
+    # no major of that name, and the minor and the specialisation are as close
+    assert index.resolve('Asia and Pacific Archaeology', 'MAJ') is None
+    # as close to both programs
+    assert index.resolve('Master of Strategic Studies (Adv)') is None
+    assert index.resolve('Bachelor of Arts') is None
+
+
+def test_programs_from_the_api_data():
+    assert len(PROGRAMS) > 0
+    assert PROGRAMS.get('Master of Computing') == '7706XMCOMP'
+    assert PROGRAMS.resolve('Master of Computing Advanced') == 'VCOMP'
+    assert PROGRAMS.resolve('Master of Military and Defense Studies') == '7829XMMDS'
+
+
+def test_specialisations_from_the_api_data():
+    assert len(SPECIALISATIONS) > 0
+    assert SPECIALISATIONS.resolve('Asia and Pacific Archaeology', 'MIN') is not None
@@ -0,0 +1,109 @@
+import itertools
+
+import pytest
+import spacy
+
+import nlp_cache
+from nlp_cache import ParseCache
+
+TEXTS = ['Incompatible with COMP1100.', 'Requires COMP1110 and MATH1013.', '6 units from the list below',
+         'Bachelor of Advanced Computing', 'Students must complete 48 units.']
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """one tick per call, entries used in the same test never tie on their last use"""
+    ticks = itertools.count()
+    monkeypatch.setattr(nlp_cache.time, 'time', lambda: next(ticks))
+
+
+def nlp():
+    nlp = spacy.blank('en')
+    pattern = [{'TEXT': {'REGEX': '^[A-Z]{4}[0-9]{4}$'}}]
+    nlp.add_pipe('entity_ruler').add_patterns([{'label': 'CLASS', 'pattern': pattern}])
+    return nlp
+
+
+def cached_keys(cache):
+    return {key for key, in cache.conn.execute("SELECT key FROM docs")}
+
+
+def test_hits_and_misses(tmp_path):
+    path = str(tmp_path / 'nlp.sqlite')
+    cache = ParseCache(nlp(), path)
+    docs = list(cache.pipe(TEXTS[:2] + TEXTS[:1]))
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert [doc.text for doc in docs] == TEXTS[:2] + TEXTS[:1]
+    assert [[ent.text for ent in doc.ents] for doc in cache.pipe(TEXTS[:2])] == [['COMP1100'], ['COMP1110', 'MATH1013']]
+    assert (cache.hits, cache.misses) == (3, 2)
+    cache.close()
+
+    # a later crawl reads the same file back
+    cache = ParseCache(nlp(), path)
+    assert [ent.label_ for ent in cache(TEXTS[1]).ents] == ['CLASS', 'CLASS']
+    assert (cache.hits, cache.misses) == (1, 0)
+    cache.close()
+
+
+def test_without_a_path_every_text_is_parsed():
+    cache = ParseCache(nlp(), None)
+    assert [doc.text for doc in cache.pipe(TEXTS)] == TEXTS
+    assert (cache.hits, cache.misses) == (0, 0) and cache.conn is None
+
+
+def test_least_recently_used_are_evicted_at_the_cap(tmp_path, clock):
+    sizes = []
+    cache = ParseCache(nlp(), str(tmp_path / 'sizes.sqlite'))
+    for text in TEXTS:
+        before = cache.size
+        cache(text)
+        sizes += cache.size - before,
+    cache.close()
+    first, second, third, fourth, fifth = [ParseCache.key(text) for text in TEXTS]
+
+    # room for the first three, a miss past the cap evicts down to 90% of it
+    cache = ParseCache(nlp(), str(tmp_path / 'nlp.sqlite'), max_bytes=sum(sizes[:3]))
+    for text in TEXTS[:3]:
+        cache(text)
+    assert cached_keys(cache) == {first, second, third}
+    cache(TEXTS[0])  # the hit makes the first the most recently used
+    cache(TEXTS[3])
+    assert cached_keys(cache) == {first, fourth}
+    assert cache.size == sizes[0] + sizes[3] <= cache.max_bytes * 0.9
+    cache(TEXTS[4])
+    assert cached_keys(cache) == {first, fourth, fifth}
+    assert cache.size == cache.conn.execute("SELECT sum(size) FROM docs").fetchone()[0]
+    cache.close()
+
+
+def test_dropped_when_the_fingerprint_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'nlp.sqlite')
+    cache = ParseCache(nlp(), path)
+    list(cache.pipe(TEXTS))
+    cache.close()
+
+    cache = ParseCache(nlp(), path)
+    assert cache.size > 0 and len(cached_keys(cache)) == len(TEXTS)
+    cache.close()
+
+    # another pipeline
+    other = nlp()
+    other.add_pipe('sentencizer')
+    cache = ParseCache(other, path)
+    assert cached_keys(cache) == set() and cache.size == 0
+    list(cache.pipe(TEXTS))
+    assert cache.misses == len(TEXTS)
+    cache.close()
+
+    # another model version
+    other.meta['version'] = '9.9.9'
+    cache = ParseCache(other, path)
+    assert cached_keys(cache) == set()
+    list(cache.pipe(TEXTS))
+    cache.close()
+
+    # other entity patterns
+    monkeypatch.setattr(nlp_cache, 'PATTERNS', nlp_cache.PATTERNS + [{'label': 'CLASS', 'pattern': 'TEST1000'}])
+    cache = ParseCache(other, path)
+    assert cached_keys(cache) == set()
+    cache.close()
@@ -0,0 +1,33 @@
+import threading
+
+from scrapy import Spider
+
+from graph_sinks import InMemoryGraph
+from pipelines import GraphPipeline
+
+
+class ClosingGraph(InMemoryGraph):
+    closed = False
+
+    def close(self):
+        super().close()
+        self.closed = True
+
+
+def test_graph_is_closed_when_the_writer_failed(caplog):
+    def fail(label, doc):
+        raise RuntimeError('database went away')
+
+    pipeline = GraphPipeline('memory', 10)
+    pipeline.G = ClosingGraph()
+    pipeline._merge = fail
+    pipeline.deferred += ('Program', {'id': 'ATEST', 'requirements': []}),
+    pipeline.thread = threading.Thread(target=pipeline._run)
+    pipeline.thread.start()
+    pipeline.queue.put(('Course', {'id': 'COMP1100'}))
+    pipeline.queue.put(('Course', {'id': 'COMP1110'}))
+
+    pipeline.close_spider(Spider('test'))
+    assert pipeline.G.closed
+    assert isinstance(pipeline.error, RuntimeError)
+    assert 'graph writer failed' in caplog.text
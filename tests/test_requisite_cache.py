@@ -0,0 +1,41 @@
+from requisite_cache import RequisiteCache
+
+TEXT = 'Incompatible with COMP1100.'
+
+
+class Parser:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls += text,
+        return {'condition': 'incompatible', 'classes': ['COMP1100'], 'programs': [], 'description': text}
+
+
+def test_parses_a_text_once_and_hands_out_copies():
+    cache, parse = RequisiteCache('fingerprint', path=None), Parser()
+    first = cache.get(TEXT, parse)
+    first['classes'].append('COMP1110')
+    second, third = cache.get(TEXT, parse), cache.get(TEXT, parse)
+
+    assert parse.calls == [TEXT]
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert second == third == parse(TEXT) and second is not third
+    assert cache.get('Incompatible with COMP1110.', parse)['description'] == 'Incompatible with COMP1110.'
+
+
+def test_kept_across_crawls_until_the_fingerprint_changes(tmp_path):
+    path = str(tmp_path / 'requisites.sqlite')
+    cache = RequisiteCache('one', path)
+    cache.get(TEXT, Parser())
+    cache.close()
+
+    parse = Parser()
+    cache = RequisiteCache('one', path)
+    assert cache.get(TEXT, parse) == Parser()(TEXT) and parse.calls == []
+    cache.close()
+
+    cache = RequisiteCache('two', path)
+    cache.get(TEXT, parse)
+    assert parse.calls == [TEXT] and cache.misses == 1
+    cache.close()
@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+
+import pytest
+
+from shards import ShardQueue
+
+CODES = [f'COMP{1000 + i}' for i in range(40)]
+
+# stands in for scrapy runspider: writes the items of its shard, or fails once when told to
+SPIDER = """
+import json, os, sys
+sys.path.insert(0, {crawler!r})
+from shards import shard_of
+items, shard, shards, fail_once = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), sys.argv[4:]
+if fail_once and os.path.exists(fail_once[0]):
+    os.remove(fail_once[0])
+    sys.exit(1)
+with open(items, 'w') as f:
+    json.dump([{{'id': code}} for code in {codes!r} if shard_of(code, shards) == shard], f)
+""".format(crawler=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'crawler'), codes=CODES)
+
+
+class StubQueue(ShardQueue):
+    def command(self, name, task):
+        return [sys.executable, '-c', SPIDER, self.items_path(name), str(task['shard']), str(task['shards']),
+                *task['settings']]
+
+
+def merged_ids(tmp_path):
+    with open(tmp_path / 'scraped' / 'classes.json') as f:
+        return [item['id'] for item in json.load(f)]
+
+
+def test_requeued_tasks_neither_repeat_nor_lose_items(tmp_path):
+    os.makedirs(tmp_path / 'scraped')
+    queue = StubQueue(str(tmp_path / 'shards'))
+    marker = str(tmp_path / 'fail-once')
+    open(marker, 'w').close()
+    queue.plan(4, ['classes'], [marker])
+
+    # a worker that died holding a task leaves it running
+    died = queue.claim()
+    # the first task run fails, the others are done
+    queue.work(1)
+    assert queue.status() == {'pending': 0, 'running': 1, 'done': 2, 'failed': 1}
+    with pytest.raises(SystemExit):
+        queue.merge(str(tmp_path / 'scraped'))
+
+    assert queue.requeue() == 1 and queue.requeue('failed') == 1
+    assert died in queue.tasks('pending') and len(queue.tasks('pending')) == 2
+    queue.work(2)
+    assert queue.status() == {'pending': 0, 'running': 0, 'done': 4, 'failed': 0}
+    assert queue.merge(str(tmp_path / 'scraped')) == {'classes': len(CODES)}
+    assert merged_ids(tmp_path) == sorted(CODES)
+    assert os.listdir(tmp_path / 'shards' / 'tasks' / 'running') == []
+
+
+def test_worker_errors_are_raised(tmp_path, capsys):
+    class BrokenQueue(StubQueue):
+        def run(self, name):
+            if name.startswith('classes-001') or name.startswith('classes-002'):
+                raise OSError(f'no space left for {name}')
+            return super().run(name)
+
+    queue = BrokenQueue(str(tmp_path / 'shards'))
+    queue.plan(4, ['classes'], [])
+    with pytest.raises(OSError, match='no space left'):
+        queue.work(2)
+    # each broken worker stops after its task, whatever the other workers left is still pending
+    status = queue.status()
+    assert status['failed'] == 2 and status['running'] == 0
+    assert set(queue.tasks('failed')) == {'classes-001-of-004.json', 'classes-002-of-004.json'}
+    assert status['done'] + status['pending'] == 2
+    assert 'worker failed: OSError' in capsys.readouterr().err
@@ -0,0 +1,34 @@
+import pytest
+from scrapy import Request
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import HtmlResponse
+
+from crawl_state import page_url
+from snapshots import SnapshotMiddleware, SnapshotStore
+
+PAGE = b'<html><body>COMP1100</body></html>'
+
+
+def record(store, request_url, url, status=200):
+    recorder = SnapshotMiddleware(store, record=True, replay=None)
+    request = Request(url)
+    if request_url != url:
+        request.meta['redirect_urls'] = [request_url]
+    recorder.process_response(request, HtmlResponse(url, status=status, body=PAGE, encoding='utf-8'), None)
+    store.close()
+
+
+def test_replay_keeps_the_url_asked_for(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    record(store, 'https://site/course/COMP1100', 'https://site/course/COMP1100')
+    record(store, 'https://site/course/COMP9999', 'https://site/error?code=404', status=404)
+
+    replay = SnapshotMiddleware(SnapshotStore(str(tmp_path)), record=False, replay='latest')
+    same = replay.process_request(Request('https://site/course/COMP1100'), None)
+    redirected = replay.process_request(Request('https://site/course/COMP9999'), None)
+
+    assert same.body == PAGE and page_url(same) == 'https://site/course/COMP1100'
+    assert redirected.url == 'https://site/error?code=404' and redirected.status == 404
+    assert page_url(redirected) == 'https://site/course/COMP9999'
+    with pytest.raises(IgnoreRequest):
+        replay.process_request(Request('https://site/course/COMP2100'), None)
@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+import spacy
+
+from nlp_config import PATTERNS
+from span_tagger import SpanTagger
+
+
+def requirement_texts(value):
+    """descriptions and "CODE name" lines of the requirement trees in a json value"""
+    if isinstance(value, list):
+        return [text for v in value for text in requirement_texts(v)]
+    if not isinstance(value, dict):
+        return []
+    texts = [value['description']] if isinstance(value.get('description'), str) else []
+    if 'id' in value and 'name' in value:
+        texts += f"{value['id']} {value['name']}",
+    return texts + requirement_texts(value.get('requirements')) + requirement_texts(value.get('items'))
+
+
+def corpus():
+    texts = ['COMP1100', 'COMP1100 and COMP1110 or MATH1013', 'completed COMP1100 or studying a Master of Computing',
+             'the Bachelor of Advanced Computing (Honours) and the Master of Computing (Advanced)', '']
+    for filename in ('programs.json', 'specialisations.json'):
+        path = os.path.join('data/scraped', filename)
+        if os.path.exists(path):
+            with open(path) as f:
+                docs = json.load(f)
+            texts += requirement_texts(docs)
+            texts += [f"you must be studying the {doc['name']} and have completed COMP1100." for doc in docs]
+    return list(dict.fromkeys(texts))
+
+
+@pytest.fixture(scope='module')
+def pipelines():
+    ruler = spacy.blank('en')
+    ruler.add_pipe('entity_ruler', config={"validate": True}).add_patterns(PATTERNS)
+    tagger = spacy.blank('en')
+    tagger.add_pipe('span_tagger')
+    return ruler, tagger
+
+
+def spans(doc):
+    return [(ent.start, ent.end, ent.label_, ent.id_) for ent in doc.ents]
+
+
+def test_same_spans_as_the_entity_ruler(pipelines):
+    ruler, tagger = pipelines
+    texts = corpus()
+    different = [text for text, a, b in zip(texts, ruler.pipe(texts), tagger.pipe(texts)) if spans(a) != spans(b)]
+    assert not different[:5]
+    assert sum(len(doc.ents) for doc in tagger.pipe(texts[:5])) > 0
+
+
+def test_keeps_entities_already_set(pipelines):
+    _, tagger = pipelines
+    doc = tagger.make_doc('COMP1100 and COMP1110')
+    doc.ents = [spacy.tokens.Span(doc, 0, 1, label='ORG')]
+    assert [(ent.text, ent.label_) for ent in tagger.get_pipe('span_tagger')(doc).ents] == \
+        [('COMP1100', 'ORG'), ('COMP1110', 'CLASS')]
+
+
+def test_entities_of_a_string():
+    assert SpanTagger().entities('COMP1100 or the Master of Computing') == \
+        [('CLASS', 'COMP1100'), ('PROGRAM', 'Master of Computing')]
@@ -0,0 +1,96 @@
+import json
+import os
+import random
+
+import pytest
+
+from tests.reference_text_normaliser import (reference_requirement_line, reference_requisites,
+                                             reference_specialisation_name)
+from text_normaliser import REQUIREMENT_LINE, REQUISITES, SEPARATOR, SPECIALISATION_NAME
+
+NORMALISERS = {
+    'requisites': (REQUISITES, reference_requisites),
+    'requirement lines': (REQUIREMENT_LINE, reference_requirement_line),
+    'specialisation names': (SPECIALISATION_NAME, reference_specialisation_name),
+}
+
+# what the rules look for: class codes, parenthesis, whitespace, "&", "Advanced", "Minor", ...
+PIECES = [
+    ' ', ' ', ' ', '  ', '\n', '\t', '\xa0', '(', '(', ')', ')', '( ', ' )', '()', '( )', '&', 'R&D', 'R', 'D',
+    'COMP1100', 'ENGN8100', 'COMP', '1100', 'ABC', 'MLLM', '(MLLM)', 'ABC-DEF', 'ASIA-MIN', 'Advanced', ' Advanced ',
+    'Honours', ' Honours ', 'of', 'of (Advanced)', 'and', 'or', 'a', 'x', 'Master of Computing', 'Minor', 'minor',
+    'Major', 'Specialisation', 'specialisation', '-', ';', '.', ',', '1',
+]
+
+CASES = [
+    '',
+    'To enrol in this course you must have completed COMP1100and COMP1110.',
+    'Incompatible with ENGN8100 ( ) and a Master of Laws (MLLM)',
+    'studying a Master of Computing Advanced or Bachelor of Science Honours (  Advanced )',
+    'Master of R&D Management(Honours)',
+    'COMP6710 Structured Programming\n\xa0 6 units',
+    'Asian Studies Major',
+    'ASIA-MIN Asian Studies (ASIA) Minor',
+    'Economics minor',
+]
+
+
+def random_texts(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 24))) for _ in range(n)]
+
+
+def strings(value):
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [s for v in value.values() for s in strings(v)]
+    if isinstance(value, list):
+        return [s for v in value for s in strings(v)]
+    return []
+
+
+def scraped():
+    """every distinct string of data/scraped"""
+    texts = []
+    for name in ('classes.json', 'programs.json', 'specialisations.json'):
+        path = os.path.join('data/scraped', name)
+        if os.path.exists(path):
+            with open(path) as f:
+                texts += strings(json.load(f))
+    return list(dict.fromkeys(texts))
+
+
+@pytest.mark.parametrize('name', NORMALISERS)
+def test_same_as_the_chains_they_replaced(name):
+    normaliser, reference = NORMALISERS[name]
+    texts = CASES + scraped() + random_texts(20000)
+    wrong = [(text, reference(text), normaliser(text)) for text in texts if normaliser(text) != reference(text)]
+    assert not wrong[:5]
+
+
+@pytest.mark.parametrize('name', NORMALISERS)
+def test_batch_same_as_the_chains_they_replaced(name):
+    normaliser, reference = NORMALISERS[name]
+    # repeated texts, texts with the batch separator in them, and batches of random sizes,
+    # so texts meet their neighbours at the separator
+    texts = CASES + scraped() + random_texts(20000) + CASES + [f'COMP1100{SEPARATOR}and (MLLM)', SEPARATOR]
+    rng = random.Random(1)
+    start, wrong = 0, []
+    while start < len(texts):
+        size = rng.randint(1, 2000)
+        chunk = texts[start:start + size]
+        wrong += [(text, found) for text, found in zip(chunk, normaliser.batch(chunk)) if found != reference(text)]
+        start += size
+    assert not wrong[:5]
+    assert normaliser.batch([]) == []
+    assert normaliser.batch(iter(CASES[:3])) == [reference(text) for text in CASES[:3]]
+
+
+def test_examples():
+    requisites, requirement_line, specialisation_name = (normaliser for normaliser, _ in NORMALISERS.values())
+    assert requisites('you must have completed COMP1100and a Master of Laws (MLLM) ( )') == \
+        'you must have completed COMP1100 and a Master of Laws '
+    assert requisites('Master of R&D Management(Honours)') == 'Master of Research and Development Management (Honours)'
+    assert requirement_line('COMP6710Structured Programming\n\xa0') == 'COMP6710 Structured Programming'
+    assert specialisation_name('ASIA-MIN Asian Studies (ASIA) Minor') == 'Asian Studies'